@@ -29,6 +29,12 @@ def create_app(config_name=None):
     if application_root != '/':
         app.config['APPLICATION_ROOT'] = application_root
     
+    from app import asset_registry
+    asset_registry.configure(
+        app.config.get('ASSET_REGISTRY_ENABLED', True),
+        app.config.get('ASSET_CACHE_DIR') or os.path.join(app.instance_path, 'asset_cache'),
+    )
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
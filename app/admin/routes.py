@@ -342,7 +342,11 @@ def get_default_template_config(tool_name):
             'layout': {
                 'canvas_width': 1000,
                 'canvas_height': 1250,
-                'text_placements': ['Top Left', 'Bottom Left', 'Top Center', 'Bottom Center']
+                'text_placements': ['Top Left', 'Bottom Left', 'Top Center', 'Bottom Center'],
+                # Off by default: downloads keep their fixed quality until an admin sets budgets
+                'byte_budgets': {},
+                'budget_formats': ['webp', 'avif', 'jpeg'],
+                'budget_min_quality': 50
             },
             'colors': {
                 'subtitle_default': '#FFFFFF',
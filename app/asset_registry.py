@@ -0,0 +1,254 @@
+"""Decoded brand assets shared between processes through a memory-mapped file.
+
+Every gunicorn worker, job worker and render pool process needs the same
+decoded logos. Instead of each decoding (and holding) its own RGBA copies,
+the first process to need them decodes every asset in ``ASSET_SIZES`` once,
+at full size and at each size the layouts draw it, and writes the raw pixels
+to ``<cache dir>/assets-<digest>.bin``. All processes then map that file
+read-only, so the pixels live once in the page cache and ``Image.frombuffer``
+wraps them without copying.
+
+The digest covers the SHA-256 of every source file, so editing an asset
+produces a new registry file. A running process notices the change when a
+file's size or mtime moves and its hash no longer matches, then rebuilds or
+maps the new registry.
+
+Settings come from ``ASSET_REGISTRY_ENABLED`` and ``ASSET_CACHE_DIR`` in the
+app config: ``create_app`` calls ``configure()``, and render pool processes
+(which run without the Flask app) get the same values through the pool
+initializer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import PIL
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MAGIC = b"ICASSET1"
+ALIGN = 64
+
+# (width, height) pairs each layout draws an asset at; None keeps the aspect
+# ratio. Originals are always included (asset_height() and odd sizes use them).
+ASSET_SIZES: dict[str, list[tuple[int | None, int | None]]] = {
+    "logo.png": [(800, None)],  # bulk watermark centre logo, MAX_CENTER_LOGO_WIDTH
+    "mlinfo_lm.png": [(None, 60), (None, 49)],
+    "mlinfo.png": [(100, None)],
+    "turf_logo.png": [(100, None), (None, 100)],
+    "weekend_tag.png": [(100, None), (None, 49)],
+    "budget_logo.png": [(300, None)],
+    "budget_speech_bg.png": [(1000, None)],
+    "hand_swipe.png": [(None, 55)],
+}
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "instance" / "asset_cache"
+# After a failed build/map, decode per process and try again after this long
+RETRY_SECONDS = 60.0
+
+
+def scale_asset(base: Image.Image, width: int | None, height: int | None) -> Image.Image:
+    """Resize ``base`` to ``width`` and/or ``height``, keeping the aspect ratio."""
+    if not height:
+        height = max(1, round(base.height * width / base.width))
+    elif not width:
+        width = max(1, round(base.width * height / base.height))
+    return base.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def decode_asset(path: Path) -> Image.Image:
+    with Image.open(path) as src:
+        img = src.convert("RGBA")
+    img.load()
+    return img
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_key(name: str, width: int | None, height: int | None) -> str:
+    return f"{name}|{width or 0}|{height or 0}"
+
+
+class AssetRegistry:
+    """Read-only view of one registry file."""
+
+    def __init__(self, path: Path, header: dict, buffer: mmap.mmap, data_start: int) -> None:
+        self.path = path
+        self.digest = header["digest"]
+        self.sources: dict[str, dict] = header["sources"]
+        self.entries: dict[str, dict] = header["entries"]
+        self._view = memoryview(buffer)
+        self._data_start = data_start
+        self._images: dict[str, Image.Image] = {}
+        # name -> (size, mtime_ns) checked against the recorded hash, starting
+        # from the stat recorded at build time; each new stat is hashed once
+        self._verified: dict[str, tuple[int, int]] = {
+            name: (src["size"], src["mtime_ns"]) for name, src in self.sources.items()
+        }
+        self._changed: dict[str, tuple[int, int]] = {}
+        self.stale = False
+
+    def fresh(self, name: str, stat: os.stat_result) -> bool:
+        """True if the asset file still has the content the registry was built from."""
+        key = (stat.st_size, stat.st_mtime_ns)
+        if self._verified.get(name) == key:
+            return True
+        source = self.sources.get(name)
+        if source is None or self._changed.get(name) == key:
+            return False
+        if source["sha256"] == _sha256(Path(source["path"])):
+            self._verified[name] = key  # touched, not changed
+            return True
+        self._changed[name] = key
+        self.stale = True
+        return False
+
+    def get(self, name: str, width: int | None = None, height: int | None = None) -> Image.Image | None:
+        key = _entry_key(name, width, height)
+        img = self._images.get(key)
+        if img is not None:
+            return img
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        start = self._data_start + entry["offset"]
+        size = (entry["width"], entry["height"])
+        img = Image.frombuffer("RGBA", size, self._view[start:start + size[0] * size[1] * 4], "raw", "RGBA", 0, 1)
+        self._images[key] = img
+        return img
+
+
+def registry_digest(assets_dir: Path) -> tuple[str, dict[str, dict]]:
+    """Digest of the asset files and size table, plus per-file source records."""
+    sources = {}
+    digest = hashlib.sha256(f"{FORMAT_VERSION}:{PIL.__version__}:".encode())
+    for name in sorted(ASSET_SIZES):
+        path = assets_dir / name
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        sha = _sha256(path)
+        sources[name] = {"path": str(path), "sha256": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        digest.update(f"{name}:{sha}:{ASSET_SIZES[name]};".encode())
+    return digest.hexdigest(), sources
+
+
+def build_registry(assets_dir: Path, cache_dir: Path, digest: str, sources: dict[str, dict]) -> Path:
+    """Decode and pre-scale every asset into ``assets-<digest>.bin`` (atomic)."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"assets-{digest[:24]}.bin"
+    entries: dict[str, dict] = {}
+    blobs: list[bytes] = []
+    offset = 0
+    for name in sources:
+        base = decode_asset(assets_dir / name)
+        for width, height in [(None, None), *ASSET_SIZES[name]]:
+            img = base if not (width or height) else scale_asset(base, width, height)
+            data = img.tobytes()
+            entries[_entry_key(name, width, height)] = {"offset": offset, "width": img.width, "height": img.height}
+            padding = -len(data) % ALIGN
+            blobs.append(data + b"\0" * padding)
+            offset += len(data) + padding
+
+    header = json.dumps({"digest": digest, "sources": sources, "entries": entries}).encode()
+    data_start = len(MAGIC) + 8 + len(header)
+    data_start += -data_start % ALIGN
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        fh.write(b"\0" * (data_start - fh.tell()))
+        for blob in blobs:
+            fh.write(blob)
+    os.replace(tmp, path)
+
+    for old in cache_dir.glob("assets-*.bin"):
+        if old != path:
+            try:
+                old.unlink()  # processes still mapping it keep their pages
+            except OSError:
+                pass
+    return path
+
+
+def open_registry(path: Path) -> AssetRegistry:
+    with open(path, "rb") as fh:
+        buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an asset registry")
+    (header_len,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+    header_end = len(MAGIC) + 8 + header_len
+    header = json.loads(bytes(buffer[len(MAGIC) + 8:header_end]))
+    return AssetRegistry(path, header, buffer, header_end + (-header_end % ALIGN))
+
+
+def load_registry(assets_dir: Path, cache_dir: Path | None = None) -> AssetRegistry | None:
+    """Map the registry for the current asset files, building it if needed.
+
+    Returns None (callers decode per process) if the cache directory cannot
+    be written.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    digest, sources = registry_digest(assets_dir)
+    path = cache_dir / f"assets-{digest[:24]}.bin"
+    try:
+        if not path.exists():
+            build_registry(assets_dir, cache_dir, digest, sources)
+        return open_registry(path)
+    except (OSError, ValueError) as exc:
+        logger.warning("Asset registry unavailable (%s); decoding assets per process", exc)
+        return None
+
+
+_lock = threading.Lock()
+_registry: AssetRegistry | None = None
+_retry_at = 0.0
+_enabled = True
+_cache_dir: str | None = None
+
+
+def configure(enabled: bool = True, cache_dir: str | None = None) -> None:
+    """Apply ASSET_REGISTRY_ENABLED / ASSET_CACHE_DIR (also the pool initializer)."""
+    global _enabled, _cache_dir
+    _enabled, _cache_dir = bool(enabled), cache_dir or None
+
+
+def settings() -> tuple[bool, str | None]:
+    """Current ``configure()`` arguments, for passing on to child processes."""
+    return _enabled, _cache_dir
+
+
+def get_registry(assets_dir: Path) -> AssetRegistry | None:
+    """This process's registry (mapped lazily, remapped after an asset changes).
+
+    None while disabled, or for RETRY_SECONDS after a failed build or map.
+    """
+    global _registry, _retry_at
+    if not _enabled:
+        return None
+    with _lock:
+        if (_registry is None or _registry.stale) and time.monotonic() >= _retry_at:
+            registry = load_registry(assets_dir, Path(_cache_dir) if _cache_dir else None)
+            if registry is None:
+                _retry_at = time.monotonic() + RETRY_SECONDS
+                logger.warning("Retrying the asset registry in %.0f s", RETRY_SECONDS)
+            _registry = registry
+        return _registry
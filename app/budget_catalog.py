@@ -2,12 +2,27 @@
 
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator
 
 BUDGET_ROOT = Path(__file__).resolve().parent.parent / "budget 2026-2027"
 API_EXPORT = BUDGET_ROOT / "data" / "api-export.json"
+DB_PATH = BUDGET_ROOT / "database" / "budget_2026_2027.db"
+SPRITE_MAP = BUDGET_ROOT / "data" / "picker-sprite.json"
 STANDARDIZED_PREFIX = "images/standardized/"
+STANDARDIZED_DIR = BUDGET_ROOT / "images" / "standardized"
+ALTERNATES_DIR = STANDARDIZED_DIR / "alternates"
+PLATES_DIR = STANDARDIZED_DIR / "plates"
+MEDIA_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 
 
 def _alternate_label(filename: str) -> str:
@@ -18,58 +33,562 @@ def _alternate_label(filename: str) -> str:
     return stem
 
 
-def load_budget_catalog() -> list[dict]:
-    """Return themes with primary image paths and discovered alternates."""
-    if not API_EXPORT.exists():
-        return []
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class BudgetMediaEntry:
+    """A servable file under images/standardized/ with its validators."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @property
+    def version(self) -> str:
+        """Short content hash used as the ``v`` cache-busting URL parameter."""
+        return self.sha256[:16]
+
+
+@dataclass
+class BudgetMediaIndex:
+    """Allow-list of servable budget media keyed by normalized subpath."""
+
+    entries: dict[str, BudgetMediaEntry] = field(default_factory=dict)
+    signature: tuple = ()
+
+
+_media_index: BudgetMediaIndex | None = None
+_media_index_lock = threading.Lock()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _media_signature() -> tuple:
+    """Change marker for the standardized tree (setup rewrites the export)."""
+    return (
+        _mtime_ns(API_EXPORT),
+        _mtime_ns(STANDARDIZED_DIR),
+        _mtime_ns(ALTERNATES_DIR),
+        _mtime_ns(PLATES_DIR),
+    )
+
+
+def build_budget_media_index(previous: BudgetMediaIndex | None = None) -> BudgetMediaIndex:
+    """Scan images/standardized/ and hash every servable file.
+
+    Hashes from ``previous`` are reused for files whose size and mtime are
+    unchanged, so a rebuild only reads files that actually changed.
+    """
+    signature = _media_signature()
+    entries: dict[str, BudgetMediaEntry] = {}
+    if not STANDARDIZED_DIR.is_dir():
+        return BudgetMediaIndex(signature=signature)
+
+    old = previous.entries if previous else {}
+    root = BUDGET_ROOT.resolve()
+    for path in STANDARDIZED_DIR.rglob("*"):
+        if path.suffix.lower() not in MEDIA_EXTENSIONS or not path.is_file():
+            continue
+        try:
+            path.resolve().relative_to(root)
+        except ValueError:
+            continue
+        subpath = path.relative_to(BUDGET_ROOT).as_posix()
+        stat = path.stat()
+        cached = old.get(subpath)
+        if cached and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+            entries[subpath] = cached
+            continue
+        entries[subpath] = BudgetMediaEntry(
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=_file_sha256(path),
+        )
+    return BudgetMediaIndex(entries=entries, signature=signature)
+
+
+def get_budget_media_index() -> BudgetMediaIndex:
+    """Return the cached media index, rebuilding it when the tree changed."""
+    global _media_index
+    signature = _media_signature()
+    index = _media_index
+    if index is not None and index.signature == signature:
+        return index
+    with _media_index_lock:
+        if _media_index is None or _media_index.signature != signature:
+            _media_index = build_budget_media_index(_media_index)
+        return _media_index
+
+
+def _normalize_media_path(subpath: str) -> str:
+    return subpath.replace("\\", "/").lstrip("/")
+
+
+def get_budget_media_entry(subpath: str) -> BudgetMediaEntry | None:
+    """Return the index entry for a request subpath, or None if not servable."""
+    return get_budget_media_index().entries.get(_normalize_media_path(subpath))
+
+
+class ReadOnlyConnectionPool:
+    """Small pool of read-only SQLite connections shared across requests.
+
+    Idle connections are dropped when the database file is replaced
+    (setup_database.py can recreate it), so readers never keep a stale
+    handle to an unlinked file.
+    """
+
+    def __init__(self, path: Path, size: int = 4) -> None:
+        self.path = path
+        self.size = size
+        self._idle: list[sqlite3.Connection] = []
+        self._file_id: tuple | None = None
+        self._lock = threading.Lock()
+
+    def _current_file_id(self) -> tuple | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.path.as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        file_id = self._current_file_id()
+        if file_id is None:
+            raise FileNotFoundError(self.path)
+        with self._lock:
+            if file_id != self._file_id:
+                self._close_idle()
+                self._file_id = file_id
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if len(self._idle) < self.size and self._file_id == file_id:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def _close_idle(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_idle()
+            self._file_id = None
+
+
+_db_pool = ReadOnlyConnectionPool(DB_PATH)
+
+
+def _has_database() -> bool:
+    return DB_PATH.is_file()
+
+
+@dataclass
+class BudgetCatalogIndex:
+    """Per-process snapshot of the catalog with id/slug lookups."""
+
+    themes: list[dict] = field(default_factory=list)
+    by_id: dict[int, dict] = field(default_factory=dict)
+    by_slug: dict[str, dict] = field(default_factory=dict)
+    sprite: dict | None = None
+    signature: tuple = ()
+    source: str = "json"
+
+
+_indexes: dict[str, BudgetCatalogIndex] = {}
+_index_lock = threading.Lock()
+
+
+def _resolve_source(source: str) -> str:
+    """Use SQLite only when asked for and the database has been built."""
+    return "sqlite" if source == "sqlite" and _has_database() else "json"
+
+
+def _catalog_signature(source: str) -> tuple:
+    """Change marker for the catalog source and the standardized tree."""
+    signature = _media_signature() + (_mtime_ns(SPRITE_MAP),)
+    if source == "sqlite":
+        return signature + (_mtime_ns(DB_PATH),)
+    return signature
+
+
+def _scan_alternates() -> dict[str, list[Path]]:
+    """List the alternates directory once, grouped by ``NN_slug`` prefix."""
+    grouped: dict[str, list[Path]] = {}
+    if not ALTERNATES_DIR.is_dir():
+        return grouped
+    for path in ALTERNATES_DIR.iterdir():
+        if path.suffix != ".jpg" or "_alt_" not in path.name:
+            continue
+        grouped.setdefault(path.name.split("_alt_", 1)[0], []).append(path)
+    for paths in grouped.values():
+        paths.sort()
+    return grouped
+
+
+def _load_sprite(media: dict) -> tuple[dict | None, dict[str, dict]]:
+    """Read the picker contact sheet map written by setup_database.py."""
+    if not SPRITE_MAP.exists():
+        return None, {}
+    try:
+        with SPRITE_MAP.open(encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None, {}
+    entry = media.get(data.get("sheet", ""))
+    if entry is None:
+        return None, {}
+    tile_w, tile_h = data.get("tile_size", (0, 0))
+    sprite = {
+        "path": data["sheet"],
+        "version": entry.version,
+        "width": data.get("width", 0),
+        "height": data.get("height", 0),
+        "tile_width": tile_w,
+        "tile_height": tile_h,
+    }
+    tiles = {
+        path.replace("\\", "/"): {"x": tile["x"], "y": tile["y"]}
+        for path, tile in data.get("tiles", {}).items()
+    }
+    return sprite, tiles
 
+
+def _current_plates(image_path: str, plates: dict[str, dict], media: dict) -> dict[str, dict]:
+    """Base plates (setup_database.py --plates) rendered from the current primary image.
+
+    Plates whose recorded source hash no longer matches the image are left
+    out, so a stale plate is never drawn under a new photo.
+    """
+    image = media.get(image_path)
+    current = {}
+    for fmt, plate in plates.items():
+        path = (plate.get("plate_path") or "").replace("\\", "/")
+        entry = media.get(path)
+        if image is None or entry is None or plate.get("image_sha256") != image.sha256:
+            continue
+        current[fmt] = {
+            "path": path,
+            "version": entry.version,
+            "width": plate.get("width") or 0,
+            "height": plate.get("height") or 0,
+        }
+    return current
+
+
+def _catalog_entry(
+    theme: dict,
+    image_path: str,
+    alt_paths: list[str],
+    media: dict,
+    previews: dict[str, dict],
+    tiles: dict[str, dict],
+    plates: dict[str, dict] | None = None,
+) -> dict:
+    def version_of(path: str) -> str:
+        entry = media.get(path)
+        return entry.version if entry else ""
+
+    def image(path: str, label: str) -> dict:
+        preview = previews.get(path, {})
+        return {
+            "path": path,
+            "label": label,
+            "version": version_of(path),
+            "placeholder": preview.get("placeholder") or "",
+            "dominant_color": preview.get("dominant_color") or "",
+            "sprite": tiles.get(path),
+        }
+
+    return {
+        "id": theme["id"],
+        "slug": theme["slug"],
+        "title_fr": theme.get("title_fr") or "",
+        "title_en": theme.get("title_en") or "",
+        "status": theme.get("status") or "ready",
+        "primary": {
+            **image(image_path, "Image principale"),
+            "plates": _current_plates(image_path, plates or {}, media),
+        },
+        "alternates": [image(path, _alternate_label(path)) for path in alt_paths],
+    }
+
+
+def _load_export_themes() -> list[dict] | None:
+    if not API_EXPORT.exists():
+        return None
     with API_EXPORT.open(encoding="utf-8") as f:
         data = json.load(f)
+    return sorted(data.get("themes", []), key=lambda t: t.get("sort_order", t.get("id", 0)))
 
-    themes = sorted(data.get("themes", []), key=lambda t: t.get("sort_order", t.get("id", 0)))
-    catalog: list[dict] = []
 
+def _build_from_export(media: dict, tiles: dict[str, dict]) -> list[dict]:
+    themes = _load_export_themes()
+    if themes is None:
+        return []
+    # Exports list each theme's alternates; older ones predate that field
+    alternates = None if all("alternates" in theme for theme in themes) else _scan_alternates()
+    # LQIP placeholders and dominant colors precomputed by setup_database.py
+    previews: dict[str, dict] = {}
     for theme in themes:
-        theme_id = theme["id"]
-        slug = theme["slug"]
-        image_path = theme.get("image_path") or ""
-
-        alternates_dir = BUDGET_ROOT / "images" / "standardized" / "alternates"
-        alt_pattern = f"{theme_id:02d}_{slug}_alt_*.jpg"
-        alt_paths = sorted(alternates_dir.glob(alt_pattern)) if alternates_dir.exists() else []
+        for image in [theme, *theme.get("alternates", [])]:
+            if image.get("image_path"):
+                previews[image["image_path"]] = image
 
+    catalog: list[dict] = []
+    for theme in themes:
+        if alternates is None:
+            alt_paths = [
+                alt["image_path"].replace("\\", "/") for alt in theme["alternates"] if alt.get("image_path")
+            ]
+        else:
+            alt_paths = [
+                p.relative_to(BUDGET_ROOT).as_posix()
+                for p in alternates.get(f"{theme['id']:02d}_{theme['slug']}", [])
+            ]
         catalog.append(
-            {
-                "id": theme_id,
-                "slug": slug,
-                "title_fr": theme.get("title_fr", ""),
-                "title_en": theme.get("title_en", ""),
-                "status": theme.get("status", "ready"),
-                "primary": {
-                    "path": image_path,
-                    "label": "Image principale",
-                },
-                "alternates": [
-                    {
-                        "path": str(p.relative_to(BUDGET_ROOT)).replace("\\", "/"),
-                        "label": _alternate_label(p.name),
-                    }
-                    for p in alt_paths
-                ],
-            }
+            _catalog_entry(
+                theme,
+                theme.get("image_path") or "",
+                alt_paths,
+                media,
+                previews,
+                tiles,
+                theme.get("plates"),
+            )
         )
-
     return catalog
 
 
+def _build_from_database(media: dict, tiles: dict[str, dict]) -> list[dict]:
+    with _db_pool.connection() as conn:
+        themes = conn.execute(
+            """
+            SELECT id, slug, title_fr, title_en, status
+            FROM themes ORDER BY sort_order, id
+            """
+        ).fetchall()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+        preview_columns = (
+            "placeholder, dominant_color"
+            if {"placeholder", "dominant_color"} <= columns
+            else "NULL AS placeholder, NULL AS dominant_color"
+        )
+        images = conn.execute(
+            f"""
+            SELECT theme_id, role, standardized_path, {preview_columns}
+            FROM images WHERE standardized_path IS NOT NULL
+            ORDER BY standardized_path
+            """
+        ).fetchall()
+        has_plates = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'plates'"
+        ).fetchone()
+        plate_rows = conn.execute(
+            "SELECT theme_id, format, plate_path, image_sha256, width, height FROM plates"
+        ).fetchall() if has_plates else []
+
+    plates: dict[int, dict[str, dict]] = {}
+    for row in plate_rows:
+        plates.setdefault(row["theme_id"], {})[row["format"]] = dict(row)
+    primary: dict[int, str] = {}
+    alternates: dict[int, list[str]] = {}
+    previews: dict[str, dict] = {}
+    for row in images:
+        path = row["standardized_path"].replace("\\", "/")
+        previews[path] = {"placeholder": row["placeholder"], "dominant_color": row["dominant_color"]}
+        if row["role"] == "primary":
+            primary.setdefault(row["theme_id"], path)
+        else:
+            alternates.setdefault(row["theme_id"], []).append(path)
+
+    return [
+        _catalog_entry(
+            dict(theme),
+            primary.get(theme["id"], ""),
+            alternates.get(theme["id"], []),
+            media,
+            previews,
+            tiles,
+            plates.get(theme["id"]),
+        )
+        for theme in themes
+    ]
+
+
+def build_budget_catalog_index(source: str = "json") -> BudgetCatalogIndex:
+    """Build a fresh index from the API export or the SQLite database.
+
+    ``source="sqlite"`` reads ``database/budget_2026_2027.db`` through the
+    read-only pool; it falls back to the JSON export when the database has
+    not been built.
+    """
+    source = _resolve_source(source)
+    signature = _catalog_signature(source)
+    media = get_budget_media_index().entries
+    sprite, tiles = _load_sprite(media)
+    if source == "sqlite":
+        catalog = _build_from_database(media, tiles)
+    else:
+        catalog = _build_from_export(media, tiles)
+
+    return BudgetCatalogIndex(
+        themes=catalog,
+        by_id={t["id"]: t for t in catalog},
+        by_slug={t["slug"]: t for t in catalog},
+        sprite=sprite,
+        signature=signature,
+        source=source,
+    )
+
+
+def get_budget_catalog_index(source: str = "json") -> BudgetCatalogIndex:
+    """Return the cached index, rebuilding it when its sources changed on disk."""
+    source = _resolve_source(source)
+    signature = _catalog_signature(source)
+    index = _indexes.get(source)
+    if index is not None and index.signature == signature:
+        return index
+    with _index_lock:
+        index = _indexes.get(source)
+        if index is None or index.signature != signature:
+            index = _indexes[source] = build_budget_catalog_index(source)
+        return index
+
+
+def invalidate_budget_catalog(media: bool = False) -> None:
+    """Drop the cached indexes so the next lookup rebuilds them.
+
+    With ``media=True`` the media index (and its file hashes) is dropped too,
+    so the next build rehashes every file.
+    """
+    global _media_index
+    with _index_lock:
+        _indexes.clear()
+    if media:
+        with _media_index_lock:
+            _media_index = None
+    _db_pool.close()
+
+
+# The getters below hand out deep copies: the index is shared by every
+# request in the process, so a caller editing its result must not change it.
+
+def load_budget_catalog(source: str = "json") -> list[dict]:
+    """Return themes with primary image paths and discovered alternates."""
+    return copy.deepcopy(get_budget_catalog_index(source).themes)
+
+
+def load_budget_sprite(source: str = "json") -> dict | None:
+    """Return the picker contact sheet (path, version, sizes) if it has been built."""
+    return copy.deepcopy(get_budget_catalog_index(source).sprite)
+
+
+def get_budget_theme(theme_id: int, source: str = "json") -> dict | None:
+    """Look up a catalog theme by numeric id."""
+    return copy.deepcopy(get_budget_catalog_index(source).by_id.get(theme_id))
+
+
+def get_budget_theme_by_slug(slug: str, source: str = "json") -> dict | None:
+    """Look up a catalog theme by slug."""
+    return copy.deepcopy(get_budget_catalog_index(source).by_slug.get(slug))
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so 'economie' matches 'Économie'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", _fold(query))[:8]
+
+
+def _search_database(terms: list[str], limit: int) -> list[int] | None:
+    """Theme ids matching every term as a prefix, best match first (FTS5)."""
+    match = " ".join(f'"{term}"*' for term in terms)
+    try:
+        with _db_pool.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT rowid FROM themes_fts
+                WHERE themes_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+    except (sqlite3.Error, OSError):
+        return None
+    return [row[0] for row in rows]
+
+
+def _search_catalog(themes: list[dict], terms: list[str], limit: int) -> list[int]:
+    matches = []
+    for theme in themes:
+        words = re.findall(r"\w+", _fold(f"{theme['title_fr']} {theme['title_en']} {theme['slug']}"))
+        if all(any(word.startswith(term) for word in words) for term in terms):
+            matches.append(theme["id"])
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def search_budget_themes(query: str, limit: int = 20, source: str = "json") -> list[dict]:
+    """Prefix search over French/English titles and slugs.
+
+    Uses the ``themes_fts`` FTS5 index when the SQLite database is in use,
+    and an accent-insensitive scan of the cached catalog otherwise.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    index = get_budget_catalog_index(source)
+    ids = _search_database(terms, limit) if index.source == "sqlite" else None
+    if ids is None:
+        ids = _search_catalog(index.themes, terms, limit)
+    return [
+        {
+            key: index.by_id[theme_id][key]
+            for key in ("id", "slug", "title_fr", "title_en", "status")
+        }
+        for theme_id in ids
+        if theme_id in index.by_id
+    ]
+
+
 def is_allowed_budget_media_path(subpath: str) -> bool:
-    """Only serve files under images/standardized/."""
-    normalized = subpath.replace("\\", "/").lstrip("/")
+    """Only serve files under images/standardized/ that are in the media index."""
+    normalized = _normalize_media_path(subpath)
     if not normalized.startswith(STANDARDIZED_PREFIX):
         return False
-    full = (BUDGET_ROOT / normalized).resolve()
-    try:
-        full.relative_to(BUDGET_ROOT.resolve())
-    except ValueError:
-        return False
-    return full.is_file()
+    return normalized in get_budget_media_index().entries
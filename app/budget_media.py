@@ -0,0 +1,138 @@
+"""Responsive derivatives of budget images, cached on disk."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from PIL import Image
+
+from app.budget_catalog import BudgetMediaEntry
+
+# Widths the picker may ask for; requests snap up to the nearest one so the
+# cache holds a bounded number of variants per image.
+DERIVATIVE_WIDTHS = (160, 320, 480, 640, 960, 1280)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+DERIVATIVE_QUALITY = 80
+
+_cache_lock = threading.Lock()
+_cache_bytes: dict[str, int] = {}
+
+
+def normalize_derivative_request(width: str | None, fmt: str | None) -> tuple[int, str] | None:
+    """Return ``(width, format)`` for a derivative, or None for the original.
+
+    Raises ValueError for an unsupported ``fmt`` or a ``w`` that is not a
+    positive integer, so bad URLs are rejected rather than cached as valid.
+    """
+    fmt = (fmt or "").lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if width in (None, "") and not fmt:
+        return None
+    if fmt and fmt not in DERIVATIVE_FORMATS:
+        raise ValueError(f"Unsupported fmt {fmt!r}; expected one of {', '.join(DERIVATIVE_FORMATS)}")
+    if not fmt:
+        fmt = "jpeg"
+    if width in (None, ""):
+        width = DERIVATIVE_WIDTHS[-1]
+    else:
+        try:
+            width = int(width)
+        except ValueError:
+            width = 0
+        if width <= 0:
+            raise ValueError("w must be a positive integer")
+    snapped = next((w for w in DERIVATIVE_WIDTHS if w >= width), DERIVATIVE_WIDTHS[-1])
+    return snapped, fmt
+
+
+def derivative_key(source: BudgetMediaEntry, width: int, fmt: str) -> str:
+    """Content address of a derivative: source hash plus output spec."""
+    token = f"{source.sha256}|{width}|{fmt}|{DERIVATIVE_QUALITY}"
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _render_derivative(source: Path, dest: Path, width: int, fmt: str) -> None:
+    pil_format = DERIVATIVE_FORMATS[fmt][0]
+    with Image.open(source) as img:
+        img.draft("RGB", (width, width))
+        img = img.convert("RGB")
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.tmp")
+        img.save(tmp, pil_format, quality=DERIVATIVE_QUALITY, optimize=True)
+        os.replace(tmp, dest)
+
+
+def _scan_cache(cache_dir: Path) -> int:
+    total = 0
+    for path in cache_dir.rglob("*"):
+        if path.is_file() and not path.name.endswith(".tmp"):
+            total += path.stat().st_size
+    return total
+
+
+def _evict(cache_dir: Path, max_bytes: int, keep: Path) -> int:
+    """Delete least recently used derivatives until the cache fits ``max_bytes``."""
+    entries = []
+    for path in cache_dir.rglob("*"):
+        if path.is_file() and not path.name.endswith(".tmp") and path != keep:
+            st = path.stat()
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries) + keep.stat().st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def get_derivative(
+    source: BudgetMediaEntry,
+    width: int,
+    fmt: str,
+    cache_dir: Path,
+    max_bytes: int,
+) -> tuple[Path, str, str]:
+    """Return ``(path, mimetype, key)`` for a cached derivative, generating it once.
+
+    Cache entries are named by a hash of the source content and output spec.
+    Their mtime doubles as the LRU clock: hits touch it, eviction removes the
+    oldest files first once the cache exceeds ``max_bytes``.
+    """
+    key = derivative_key(source, width, fmt)
+    _, mimetype, ext = DERIVATIVE_FORMATS[fmt]
+    dest = cache_dir / key[:2] / f"{key}{ext}"
+
+    if dest.is_file():
+        try:
+            os.utime(dest)
+        except OSError:
+            pass
+        return dest, mimetype, key
+
+    _render_derivative(source.path, dest, width, fmt)
+
+    cache_id = str(cache_dir)
+    with _cache_lock:
+        if cache_id not in _cache_bytes:
+            _cache_bytes[cache_id] = _scan_cache(cache_dir)
+        else:
+            _cache_bytes[cache_id] += dest.stat().st_size
+        if _cache_bytes[cache_id] > max_bytes:
+            _cache_bytes[cache_id] = _evict(cache_dir, max_bytes, dest)
+    return dest, mimetype, key
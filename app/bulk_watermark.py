@@ -0,0 +1,331 @@
+"""Server-side bulk watermarking (the image_creator bulk mode recipe).
+
+Each upload is written to ``<batches dir>/<batch id>/inputs`` and handed to a
+process pool, either in the background job worker (``run_batch_job``) or, when
+jobs are disabled, in the web process itself (``submit_batch``). Pool
+processes write ``outputs/<index>.webp`` (or ``.error``) atomically, so a
+batch's state is just its directory: any web worker can report progress and
+serve an output as soon as its file exists.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageFilter, ImageOps
+
+from app.render import get_pool, load_asset
+
+CENTER_LOGO = "logo.png"
+BOTTOM_LOGO = "mlinfo_lm.png"
+CENTER_LOGO_WIDTH_RATIO = 0.5
+MAX_CENTER_LOGO_WIDTH = 800
+CENTER_LOGO_OPACITY = 0.04
+BOTTOM_LOGO_HEIGHT = 60
+BOTTOM_LOGO_PADDING = 50
+DARKEN_ALPHA = 26  # rgba(0,0,0,0.1)
+BLUR_RADIUS = 30
+
+OUTPUT_SETTINGS = ("original", "compressed")
+
+
+@dataclass(frozen=True)
+class WatermarkSettings:
+    max_dimension: int
+    quality: int
+
+
+def settings_from_config(bulk_config: dict | None, output: str) -> WatermarkSettings:
+    """Resolve max dimension and WebP quality from the ``bulk`` TemplateConfig.
+
+    Mirrors processImage(): "original" keeps full quality, "compressed" uses
+    the smaller bound and ``compression_quality``.
+    """
+    layout = (bulk_config or {}).get("layout") or {}
+    if output == "compressed":
+        max_dimension = int(layout.get("max_dimension_compressed") or 1920)
+        quality = round(float(layout.get("compression_quality") or 0.7) * 100)
+    else:
+        max_dimension = int(layout.get("max_dimension_original") or 2000)
+        quality = 100
+    return WatermarkSettings(max(1, max_dimension), max(1, min(100, quality)))
+
+
+def watermark_image(source: Path, dest: Path, settings: WatermarkSettings) -> tuple[int, int]:
+    """Apply the four-layer watermark to ``source`` and write WebP to ``dest``.
+
+    Layers: blurred background, main image darkened by 10%, the centre logo
+    at 4% opacity, and mlinfo_lm.png bottom-left. Returns the output size.
+    """
+    bound = settings.max_dimension
+    with Image.open(source) as src:
+        src.draft("RGB", (bound, bound))
+        img = ImageOps.exif_transpose(src)
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    width, height = img.size
+    if width > bound or height > bound:
+        scale = min(bound / width, bound / height)
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+        img = img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    if img.mode == "RGBA":
+        # The blurred copy is only visible through transparent pixels of the
+        # main image; opaque photos skip it. Blur at quarter size, as a 30px
+        # radius hides the difference.
+        small = img.resize((max(1, width // 4), max(1, height // 4)), Image.Resampling.BILINEAR)
+        small = small.filter(ImageFilter.GaussianBlur(BLUR_RADIUS / 4))
+        canvas.alpha_composite(small.resize((width, height), Image.Resampling.BILINEAR))
+        canvas.alpha_composite(img)
+    else:
+        canvas.paste(img)
+    canvas.alpha_composite(Image.new("RGBA", (width, height), (0, 0, 0, DARKEN_ALPHA)))
+
+    logo_width = min(round(width * CENTER_LOGO_WIDTH_RATIO), MAX_CENTER_LOGO_WIDTH)
+    center_logo = load_asset(CENTER_LOGO, max(1, logo_width))
+    if center_logo is not None:
+        faded = center_logo.copy()
+        faded.putalpha(faded.getchannel("A").point(lambda v: round(v * CENTER_LOGO_OPACITY)))
+        _composite(canvas, faded, (width - faded.width) // 2, (height - faded.height) // 2)
+
+    bottom_logo = load_asset(BOTTOM_LOGO, None, BOTTOM_LOGO_HEIGHT)
+    if bottom_logo is not None:
+        _composite(canvas, bottom_logo, BOTTOM_LOGO_PADDING, height - BOTTOM_LOGO_HEIGHT - BOTTOM_LOGO_PADDING)
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.tmp")
+    canvas.save(tmp, "WEBP", quality=settings.quality, method=4)
+    os.replace(tmp, dest)
+    return width, height
+
+
+def _composite(canvas: Image.Image, img: Image.Image, x: int, y: int) -> None:
+    if x >= 0 and y >= 0 and x + img.width <= canvas.width and y + img.height <= canvas.height:
+        canvas.alpha_composite(img, (x, y))
+    else:
+        layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        layer.paste(img, (x, y))
+        canvas.alpha_composite(layer)
+
+
+def _process_item(source: str, dest: str, settings: WatermarkSettings) -> bool:
+    """Pool entry point: write the output, or ``<dest>.error`` on failure."""
+    dest_path = Path(dest)
+    try:
+        watermark_image(Path(source), dest_path, settings)
+        return True
+    except (OSError, Image.DecompressionBombError):
+        _write_error(dest_path, "Unsupported or corrupt image")
+    except Exception as exc:  # noqa: BLE001 - reported per item, batch continues
+        _write_error(dest_path, type(exc).__name__)
+    finally:
+        try:
+            os.unlink(source)
+        except OSError:
+            pass
+    return False
+
+
+# --- Batches ---------------------------------------------------------------------
+
+def _write_error(dest: Path, message: str) -> None:
+    # Written atomically like the outputs, so a poll never reads an empty marker
+    marker = dest.with_suffix(".error")
+    tmp = marker.with_name(f"{marker.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(message, encoding="utf-8")
+    os.replace(tmp, marker)
+
+
+def _output_name(index: int) -> str:
+    return f"{index:04d}.webp"
+
+
+def download_name(original: str) -> str:
+    """``watermarked_<stem>.webp``, as the browser bulk mode names files."""
+    stem = Path(original).stem or "image"
+    return f"watermarked_{stem}.webp"
+
+
+def create_batch(root: Path, user_id: int, files, settings: WatermarkSettings) -> dict:
+    """Save uploaded ``files`` as a new batch and return its metadata."""
+    batch_id = uuid.uuid4().hex
+    batch_dir = root / batch_id
+    (batch_dir / "inputs").mkdir(parents=True)
+    (batch_dir / "outputs").mkdir()
+
+    items = []
+    for index, upload in enumerate(files):
+        suffix = Path(upload.filename or "").suffix.lower()[:8]
+        upload.save(batch_dir / "inputs" / f"{index:04d}{suffix}")
+        items.append({"index": index, "name": upload.filename or f"image-{index + 1}"})
+
+    meta = {
+        "id": batch_id,
+        "user_id": user_id,
+        "created": time.time(),
+        "settings": {"max_dimension": settings.max_dimension, "quality": settings.quality},
+        "items": items,
+    }
+    _write_meta(batch_dir, meta)
+    return meta
+
+
+def _write_meta(batch_dir: Path, meta: dict) -> None:
+    tmp = batch_dir / f"batch.json.{uuid.uuid4().hex}.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, batch_dir / "batch.json")
+
+
+def set_batch_job(root: Path, batch_id: str, job_id: str) -> None:
+    """Record the background job that processes a batch."""
+    meta = load_batch(root, batch_id)
+    meta["job_id"] = job_id
+    _write_meta(root / batch_id, meta)
+
+
+def _pending_items(root: Path, batch_id: str) -> list[tuple[Path, Path]]:
+    """(input, output) pairs still waiting to be watermarked."""
+    pending = []
+    for source in sorted((root / batch_id / "inputs").iterdir()):
+        if source.name.endswith(".tmp"):
+            continue
+        index = int(source.name[:4])
+        pending.append((source, root / batch_id / "outputs" / _output_name(index)))
+    return pending
+
+
+def _batch_settings(meta: dict) -> WatermarkSettings:
+    return WatermarkSettings(**meta["settings"])
+
+
+def _fail_item(source: Path, dest: Path, exc: BaseException) -> None:
+    """Mark an item whose pool task died (e.g. a killed child) as failed."""
+    _write_error(dest, "Worker process crashed" if isinstance(exc, BrokenProcessPool) else type(exc).__name__)
+    try:
+        source.unlink()
+    except OSError:
+        pass
+
+
+def _check_item(source: Path, dest: Path, future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        _fail_item(source, dest, future.exception())
+
+
+def submit_batch(root: Path, batch_id: str, max_workers: int) -> None:
+    """Process a batch on this process's pool (used when no job worker runs)."""
+    settings = _batch_settings(load_batch(root, batch_id))
+    pool = get_pool(max_workers)
+    for source, dest in _pending_items(root, batch_id):
+        try:
+            future = pool.submit(_process_item, str(source), str(dest), settings)
+        except BrokenProcessPool as exc:
+            _fail_item(source, dest, exc)
+            continue
+        future.add_done_callback(partial(_check_item, source, dest))
+
+
+def run_batch_job(job: dict, progress, config) -> dict:
+    """Job handler: watermark a saved batch on the worker's process pool."""
+    root, batch_id = Path(job["payload"]["root"]), job["payload"]["batch_id"]
+    meta = load_batch(root, batch_id)
+    if meta is None:
+        raise FileNotFoundError(f"Batch {batch_id} no longer exists")
+    settings = _batch_settings(meta)
+
+    # Items finished before a worker restart are kept
+    status = batch_status(root, batch_id)
+    done, failed = status["done"], status["failed"]
+    progress(done, failed, total=status["total"])
+
+    pool = get_pool(int(config.get("BULK_WORKERS", 2)))
+    futures = {}
+    for source, dest in _pending_items(root, batch_id):
+        try:
+            futures[pool.submit(_process_item, str(source), str(dest), settings)] = (source, dest)
+        except BrokenProcessPool as exc:
+            _fail_item(source, dest, exc)
+            failed += 1
+    for future in as_completed(futures):
+        try:
+            ok = future.result()
+        except BrokenProcessPool as exc:
+            _fail_item(*futures[future], exc)
+            ok = False
+        if ok:
+            done += 1
+        else:
+            failed += 1
+        progress(done, failed)
+    status = batch_status(root, batch_id)
+    progress(status["done"], status["failed"], total=status["total"])
+    return {
+        "batch_id": batch_id,
+        "outputs": [f"{batch_id}/outputs/{_output_name(item['index'])}"
+                    for item in status["items"] if item["status"] == "done"],
+    }
+
+
+def load_batch(root: Path, batch_id: str) -> dict | None:
+    if not batch_id.isalnum():
+        return None
+    try:
+        return json.loads((root / batch_id / "batch.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def batch_status(root: Path, batch_id: str) -> dict | None:
+    """Batch metadata with each item's state: queued, done or failed."""
+    meta = load_batch(root, batch_id)
+    if meta is None:
+        return None
+    outputs = root / batch_id / "outputs"
+    done = failed = 0
+    for item in meta["items"]:
+        output = outputs / _output_name(item["index"])
+        if output.exists():
+            item["status"] = "done"
+            item["size"] = output.stat().st_size
+            done += 1
+        elif output.with_suffix(".error").exists():
+            item["status"] = "failed"
+            item["error"] = output.with_suffix(".error").read_text(encoding="utf-8")
+            failed += 1
+        else:
+            item["status"] = "queued"
+        item["download_name"] = download_name(item["name"])
+    meta.update(total=len(meta["items"]), done=done, failed=failed,
+                complete=done + failed == len(meta["items"]))
+    return meta
+
+
+def batch_output(root: Path, batch_id: str, index: int) -> Path | None:
+    """Path of a finished output, or None if it is not (yet) available."""
+    if load_batch(root, batch_id) is None:
+        return None
+    output = root / batch_id / "outputs" / _output_name(index)
+    return output if output.exists() else None
+
+
+def cleanup_batches(root: Path, max_age_hours: float = 24) -> None:
+    """Delete batch directories older than ``max_age_hours``."""
+    if not root.is_dir():
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for batch_dir in root.iterdir():
+        try:
+            if batch_dir.is_dir() and batch_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(batch_dir, ignore_errors=True)
+        except OSError:
+            continue
@@ -0,0 +1,496 @@
+"""Server-side rendering of carousel_creator slides.
+
+Reproduces ``renderActive`` in ``templates/tools/carousel_creator.html`` with
+the Pillow helpers from ``app.render``: background and photo, the text block
+with its gradient, the "N Actus du ..." series header, logos, the swipe hint
+and the slide indicators. Slides arrive as the editor stores them (camelCase
+keys, see ``slideTemplate``), without the decoded image.
+
+The page-wide overlay image is still browser-only.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from app.render import (
+    BLEND_MODES,
+    OUTPUT_FORMATS,
+    RenderError,
+    _cover_contain,
+    _draw_image,
+    _draw_text,
+    _fill,
+    _gradient,
+    _paste_asset,
+    _Shadow,
+    _text_width,
+    encode_image,
+    french_date_stamp,
+    load_asset,
+    load_font,
+    load_source_image,
+    parse_color,
+    parse_output,
+)
+
+CANVAS_SIZE = (1000, 1250)
+EXPORTS = ("zip", "pdf")
+DEFAULT_SLIDE_COUNT = (2, 20)
+DEFAULT_NUMBER_BADGE = {"radius": 26}
+PDF_JPEG_QUALITY = 92
+
+BOTTOM_LOGO_HEIGHT = 60
+BOTTOM_PADDING = 50
+
+
+@dataclass
+class CarouselSlide:
+    type: str = "content"
+    title: str = ""
+    excerpt: str = ""
+    subtitle: str = ""
+    title_size: int = 70
+    subtitle_size: int = 40
+    excerpt_size: int = 32
+    font_family: str = "Inter"
+    title_weight: str = "900"
+    title_color: str = "#FFFFFF"
+    subtitle_color: str = "#FFFFFF"
+    align: str = "left"
+    gradient_position: str = "bottom"
+    gradient_color: str = "#000000"
+    blend_mode: str = "source-over"
+    vertical_position: float = 180
+    kerning: float = -2.0
+    subtitle_all_caps: bool = False
+    subtitle_bg: str | None = None
+    title_bg: str | None = None
+    image_bg: str | None = "#FFFFFF"
+    cover: bool = True
+    zoom: float = 100
+    offset_x: float = 0
+    offset_y: float = 0
+    title_style: str = ""
+    subtitle_style: str = "600"
+    excerpt_style: str = ""
+    show_date: bool = False
+    show_logo: bool = True
+    show_turf: bool = False
+
+
+@dataclass
+class CarouselSpec:
+    slides: list[CarouselSlide] = field(default_factory=list)
+    series_actus: str = "Actus"
+    series_du: str = "du"
+    series_date: str = ""
+    series_date_enabled: bool = True
+    date_text: str | None = None
+    badge_radius: int = 26
+    export: str = "zip"
+    output: str = "webp"
+    quality: int = 100
+
+
+def _num(value, default, lo, hi, cast=float):
+    try:
+        value = cast(float(value))
+    except (TypeError, ValueError):
+        return default
+    return max(lo, min(hi, value))
+
+
+def _color(data: dict, key: str, default: str, allow_transparent: bool = False) -> str:
+    """A slide colour field, checked with parse_color so bad values fail before streaming."""
+    value = data.get(key) or default
+    if not isinstance(value, str):
+        raise RenderError(f"{key} must be a colour string")
+    if not (allow_transparent and value.strip().lower() == "transparent"):
+        try:
+            parse_color(value)
+        except RenderError as exc:
+            raise RenderError(f"Invalid {key} {value!r}") from exc
+    return value
+
+
+def _slide_from_dict(data: dict, is_last: bool, families) -> CarouselSlide:
+    if not isinstance(data, dict):
+        raise RenderError("Each slide must be a JSON object")
+    family = str(data.get("fontFamily") or "Inter")
+    if families and family not in families:
+        raise RenderError(f"Font family {family!r} is not enabled for carousel_creator")
+    align = str(data.get("textAlign") or "left").lower()
+    if align not in ("left", "center", "right"):
+        raise RenderError(f"Unknown textAlign {align!r}")
+    gradient_position = str(data.get("gradientPosition") or "bottom").lower()
+    if gradient_position not in ("top", "bottom", "off"):
+        raise RenderError(f"Unknown gradientPosition {gradient_position!r}")
+    blend_mode = str(data.get("backgroundBlendMode") or "source-over").lower()
+    if blend_mode not in BLEND_MODES:
+        raise RenderError(f"Unknown backgroundBlendMode {blend_mode!r}")
+    image_bg = None
+    if data.get("imageBgEnabled", True) and data.get("imageBgColor"):
+        image_bg = _color(data, "imageBgColor", "#FFFFFF")
+
+    return CarouselSlide(
+        # The editor always turns the last slide into the call to action
+        type="cta" if is_last or data.get("type") == "cta" else "content",
+        title=str(data.get("title") or "")[:400],
+        excerpt=str(data.get("excerpt") or "")[:600],
+        subtitle=str(data.get("subtitle") or "")[:200],
+        title_size=_num(data.get("titleSize"), 70, 20, 140, int),
+        subtitle_size=_num(data.get("subtitleSize"), 40, 16, 80, int),
+        excerpt_size=_num(data.get("excerptSize"), 32, 20, 80, int),
+        font_family=family,
+        title_weight=str(data.get("titleWeight") or "600"),
+        title_color=_color(data, "titleColor", "#FFFFFF"),
+        subtitle_color=_color(data, "subtitleColor", "#FFFFFF"),
+        align=align,
+        gradient_position=gradient_position,
+        gradient_color=_color(data, "gradientBgColor", "#000000", allow_transparent=True),
+        blend_mode=blend_mode,
+        vertical_position=_num(data.get("verticalPosition"), 180, 15, 180),
+        kerning=_num(data.get("kerning"), -2.0, -10.0, 10.0),
+        subtitle_all_caps=bool(data.get("subtitleAllCaps")),
+        subtitle_bg=_color(data, "subtitleBgColor", "#d41c1c") if data.get("subtitleBgEnabled") else None,
+        title_bg=_color(data, "titleBgColor", "#d41c1c") if data.get("titleBgEnabled") else None,
+        image_bg=image_bg,
+        cover=bool(data.get("coverMode", True)),
+        zoom=_num(data.get("zoom"), 100, 10, 500),
+        offset_x=_num(data.get("offsetX"), 0, -5000, 5000),
+        offset_y=_num(data.get("offsetY"), 0, -5000, 5000),
+        title_style=str(data.get("titleFontStyleOverride") or ""),
+        subtitle_style=str(data.get("subtitleFontStyleOverride") or ""),
+        excerpt_style=str(data.get("excerptFontStyleOverride") or ""),
+        show_date=bool(data.get("showDate")),
+        show_logo=bool(data.get("showLogo", True)),
+        show_turf=bool(data.get("showTurf")),
+    )
+
+
+def normalize_carousel_spec(spec: dict, template_config: dict | None = None) -> CarouselSpec:
+    """Validate a carousel export request against the carousel_creator TemplateConfig.
+
+    ``spec`` holds ``slides`` (the editor's slide objects), an optional
+    ``series`` object (``actus``, ``du``, ``date``, ``date_enabled``),
+    ``export`` (``zip`` or ``pdf``) and, for ZIP exports, ``output``
+    (``webp``/``jpeg``/``avif``) and ``quality``.
+    """
+    if not isinstance(spec, dict):
+        raise RenderError("Carousel spec must be a JSON object")
+    config = template_config or {}
+    carousel = config.get("carousel") or {}
+    families = (config.get("fonts") or {}).get("available_families")
+
+    slides = spec.get("slides")
+    if not isinstance(slides, list):
+        raise RenderError("slides must be a list")
+    lo = _num(carousel.get("slide_count_min"), DEFAULT_SLIDE_COUNT[0], 1, 100, int)
+    hi = _num(carousel.get("slide_count_max"), DEFAULT_SLIDE_COUNT[1], lo, 100, int)
+    if not lo <= len(slides) <= hi:
+        raise RenderError(f"A carousel has {lo} to {hi} slides, got {len(slides)}")
+
+    export = str(spec.get("export") or "zip").lower()
+    if export not in EXPORTS:
+        raise RenderError(f"Unknown export {export!r}; expected zip or pdf")
+    output = parse_output(spec.get("output"))
+
+    series = spec.get("series") or {}
+    badge = carousel.get("number_badge") or DEFAULT_NUMBER_BADGE
+    return CarouselSpec(
+        slides=[_slide_from_dict(s, i == len(slides) - 1, families) for i, s in enumerate(slides)],
+        series_actus=str(series.get("actus", "Actus") or "")[:40],
+        series_du=str(series.get("du", "du") or "")[:20],
+        series_date=str(series.get("date") or "")[:40],
+        series_date_enabled=bool(series.get("date_enabled", True)),
+        date_text=spec.get("date_text") or None,
+        badge_radius=_num(badge.get("radius"), 26, 8, 80, int),
+        export=export,
+        output=output,
+        quality=_num(spec.get("quality"), 100, 1, 100, int),
+    )
+
+
+# --- Drawing -----------------------------------------------------------------------
+
+def _style(override: str, weight: str) -> tuple[str, bool]:
+    """``"600-italic"`` style overrides -> (weight, italic)."""
+    if not override.strip():
+        return weight, False
+    parts = override.split("-")
+    return parts[0] or weight, len(parts) > 1 and parts[1] == "italic"
+
+
+def _split_lines(text: str, font, max_width: float) -> list[str]:
+    """Port of ``splitLinesWithCtx``: words split on any whitespace, empty -> []."""
+    lines: list[str] = []
+    line = ""
+    for word in text.split():
+        test = f"{line} {word}" if line else word
+        if _text_width(font, test) > max_width and line:
+            lines.append(line)
+            line = word
+        else:
+            line = test
+    if line:
+        lines.append(line)
+    return lines
+
+
+@lru_cache(maxsize=4)
+def _radial_mask(radius: int) -> Image.Image:
+    """Quarter disc fading from opaque at (0, 0) to clear at ``radius``."""
+    # radial_gradient() reaches 255 at the corners (128 * sqrt(2) from the
+    # centre); rescale so it does at 128px instead
+    quarter = Image.radial_gradient("L").crop((128, 128, 256, 256))
+    quarter = quarter.point(lambda v: 255 - min(255, round(v * math.sqrt(2))))
+    return quarter.resize((radius, radius), Image.Resampling.BILINEAR)
+
+
+def _draw_series_title(canvas: Image.Image, carousel: CarouselSpec, font_dir) -> None:
+    n = max(1, max(2, len(carousel.slides)) - 1)
+    actus, du = carousel.series_actus.strip(), carousel.series_du.strip()
+    date_part = f" {carousel.series_date.strip()}" if carousel.series_date_enabled and carousel.series_date.strip() else ""
+    line2 = (f"{du}{date_part}" if carousel.series_date_enabled else du) if du else ""
+
+    # Red glow under the number, centred on the top-left corner
+    mask = _radial_mask(600)
+    glow = Image.new("RGBA", mask.size, (212, 28, 28, 0))
+    glow.putalpha(mask)
+    _paste_asset(canvas, glow, 0, 0)
+
+    x, y = 50, 44
+    number_font = load_font("Inter", 900, 300, False, font_dir)
+    label_font = load_font("Inter", 900, 54, False, font_dir)
+    label_x = x + _text_width(number_font, str(n)) + 18
+    label_y = y + 34
+    label_line_height = round(54 * 1.08)
+
+    texts = [((x, y), str(n), number_font)]
+    if actus:
+        texts.append(((label_x, label_y), actus, label_font))
+    if line2:
+        texts.append(((label_x, label_y + label_line_height), line2, label_font))
+
+    shadow = _Shadow(canvas.size, "rgba(0,0,0,0.35)", 4, (1, 2))
+    for xy, text, font in texts:
+        shadow.text(xy, text, font, "la")
+    shadow.apply(canvas)
+    draw = ImageDraw.Draw(canvas)
+    for xy, text, font in texts:
+        _draw_text(draw, xy, text, font, (255, 255, 255, 242), "la")
+
+
+def _draw_number_badges(canvas: Image.Image, carousel: CarouselSpec, slide_number: int, font_dir) -> None:
+    radius = carousel.badge_radius
+    width, height = canvas.size
+    y = height - BOTTOM_PADDING - BOTTOM_LOGO_HEIGHT - 20 - radius
+    count = max(1, len(carousel.slides) - 1)
+    gap, d = 20, radius * 2
+    start_x = width / 2 - (count * d + (count - 1) * gap) / 2 + radius
+    active = slide_number - 1 if 0 <= slide_number - 1 < count else -1
+    font = load_font("Inter", 900, round(radius * 1.05), False, font_dir)
+
+    layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+    for i in range(count):
+        cx = start_x + i * (d + gap)
+        square = Image.new("RGBA", (d, d), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(square)
+        draw.rounded_rectangle((0, 0, d - 1, d - 1), radius=10, fill=(255, 255, 255, 255))
+        draw.text((radius, radius + 1), str(i + 1), font=font, fill=(0, 0, 0, 255), anchor="mm")
+        if i != active:
+            square.putalpha(square.getchannel("A").point(lambda v: round(v * 0.3)))
+        layer.alpha_composite(square, (round(cx - radius), round(y - radius)))
+    canvas.alpha_composite(layer)
+
+
+def _draw_swipe_hint(canvas: Image.Image) -> None:
+    icon_h = round(72 * 0.77)
+    icon = load_asset("hand_swipe.png", None, icon_h)
+    if icon is None:
+        return
+    width, height = canvas.size
+    logo_center_y = height - BOTTOM_PADDING - BOTTOM_LOGO_HEIGHT / 2
+    x, y = width - 50 - icon.width, logo_center_y - icon_h / 2
+    shadow = _Shadow(canvas.size, "rgba(0,0,0,0.35)", 10, (2, 4))
+    shadow.image(icon, (x, y))
+    shadow.apply(canvas)
+    _paste_asset(canvas, icon, x, y)
+
+
+def _draw_text_block(canvas: Image.Image, slide: CarouselSlide, carousel: CarouselSpec, font_dir) -> None:
+    """Port of ``computeTextLayout`` + ``drawTextBlock``."""
+    width, height = canvas.size
+    max_text_width = width - 100
+    if slide.align == "center":
+        pos_x, anchor = width / 2, "ma"
+    elif slide.align == "right":
+        pos_x, anchor = width - 50, "ra"
+    else:
+        pos_x, anchor = 50, "la"
+
+    family = slide.font_family
+    title_weight = slide.title_weight
+    title_italic = _style(slide.title_style, title_weight)[1]
+    subtitle_weight, subtitle_italic = _style(slide.subtitle_style, "700")
+    excerpt_weight, excerpt_italic = _style(slide.excerpt_style, "600")
+    title_font = load_font(family, title_weight, slide.title_size, title_italic, font_dir)
+    subtitle_font = load_font(family, subtitle_weight, slide.subtitle_size, subtitle_italic, font_dir)
+    excerpt_font = load_font(family, excerpt_weight, slide.excerpt_size, excerpt_italic, font_dir)
+
+    subtitle_text = slide.subtitle.upper() if slide.subtitle_all_caps else slide.subtitle
+    title_lines = _split_lines(slide.title, title_font, max_text_width)
+    excerpt_lines = _split_lines(slide.excerpt, excerpt_font, max_text_width)
+    subtitle_lines = _split_lines(subtitle_text, subtitle_font, max_text_width)
+    title_lh = slide.title_size * 1.12
+    excerpt_lh = slide.excerpt_size * 1.2
+    subtitle_lh = slide.subtitle_size * 1.18
+
+    block_height = 50.0
+    if subtitle_lines:
+        block_height += len(subtitle_lines) * subtitle_lh + 10
+    block_height += len(title_lines) * title_lh
+    if excerpt_lines:
+        block_height += 15 + len(excerpt_lines) * excerpt_lh
+
+    if slide.show_turf and load_asset("turf_logo.png") is not None:
+        top_right_bottom = (170 if slide.show_date else 120) + 100
+    else:
+        top_right_bottom = 50 + 80
+    min_y = top_right_bottom + 45
+    max_y = height - (60 + 50 + 50) - 5 - block_height
+    if slide.type != "cta":
+        # Keep 10px clear of the slide indicators
+        indicators_top = height - BOTTOM_PADDING - BOTTOM_LOGO_HEIGHT - 20 - carousel.badge_radius * 2 - 10
+        max_y = min(max_y, indicators_top - block_height)
+    t = (slide.vertical_position - 15) / (180 - 15)
+    pos_y = max(min_y, min(max_y, min_y + max(0, max_y - min_y) * t))
+
+    if slide.gradient_color.lower() != "transparent" and slide.gradient_position != "off":
+        rgb = parse_color(slide.gradient_color)[:3] if slide.gradient_color.startswith("#") else (0, 0, 0)
+        if slide.gradient_position == "top":
+            _gradient(canvas, 0, pos_y + block_height * 0.6, rgb, [(0, 0.8), (0.55, 0.4), (1, 0)], slide.blend_mode)
+        else:
+            _gradient(canvas, max(0, pos_y - 150), height, rgb, [(0, 0), (0.4, 0.4), (1, 0.8)], slide.blend_mode)
+
+    draw = ImageDraw.Draw(canvas)
+    pad_l, pad_r, pad_t, pad_b = 20, 20, 15, 8
+    y = pos_y
+    if subtitle_lines:
+        if slide.subtitle_bg:
+            max_line = max(_text_width(subtitle_font, ln) for ln in subtitle_lines)
+            block_w = max_line + pad_l + (pad_l if slide.align == "right" else pad_r)
+            block_h = len(subtitle_lines) * subtitle_lh + pad_t + pad_b
+            bg_x = (width - block_w) / 2 if slide.align == "center" else (
+                width - 50 - block_w if slide.align == "right" else 50)
+            draw.rounded_rectangle((bg_x, y - pad_t, bg_x + block_w, y - pad_t + block_h),
+                                   radius=4, fill=parse_color(slide.subtitle_bg))
+        text_x = pos_x
+        if slide.subtitle_bg and slide.align == "left":
+            text_x += pad_l
+        elif slide.subtitle_bg and slide.align == "right":
+            text_x -= pad_l
+        for line in subtitle_lines:
+            _draw_text(draw, (text_x, y), line, subtitle_font, parse_color(slide.subtitle_color), anchor)
+            y += subtitle_lh
+        if slide.subtitle_bg:
+            y += pad_t + pad_b
+        y += 12
+
+    if title_lines:
+        if slide.title_bg:
+            bg_pad_right = pad_l if slide.align == "right" else 8
+            for i, line in enumerate(title_lines):
+                bg_w = _text_width(title_font, line) + pad_l + bg_pad_right
+                bg_x = pos_x - (bg_w / 2 if slide.align == "center" else bg_w if slide.align == "right" else 0)
+                bg_y = y + i * title_lh - pad_t
+                draw.rectangle((bg_x, bg_y, bg_x + bg_w, bg_y + title_lh + pad_t + pad_b),
+                               fill=parse_color(slide.title_bg))
+        title_x = pos_x
+        if slide.title_bg and slide.align == "left":
+            title_x += pad_l
+        elif slide.title_bg and slide.align == "right":
+            title_x -= pad_l
+        # The editor only applies kerning to left-aligned titles
+        kerning = slide.kerning if slide.align == "left" else 0.0
+        for line in title_lines:
+            _draw_text(draw, (title_x, y), line, title_font, parse_color(slide.title_color), anchor, kerning)
+            y += title_lh
+
+    if excerpt_lines:
+        y += 35 if slide.type == "cta" else 15
+        for line in excerpt_lines:
+            _draw_text(draw, (pos_x, y), line, excerpt_font, parse_color(slide.title_color), anchor)
+            y += excerpt_lh
+
+
+def render_slide(carousel: CarouselSpec, index: int, image: Image.Image | None = None,
+                 font_dir: str | None = None) -> Image.Image:
+    """Render slide ``index`` (0-based) of ``carousel`` and return an RGBA canvas."""
+    slide = carousel.slides[index]
+    width, height = CANVAS_SIZE
+    canvas = Image.new("RGBA", CANVAS_SIZE, (0, 0, 0, 0))
+    _fill(canvas, (0, 0, width, height), slide.image_bg or "#ffffff")
+
+    if image is not None:
+        w, h = _cover_contain(image.width, image.height, width, height, "cover" if slide.cover else "contain")
+        w, h = w * slide.zoom / 100, h * slide.zoom / 100
+        _draw_image(canvas, image, (width - w) / 2 + slide.offset_x, (height - h) / 2 + slide.offset_y, w, h)
+    else:
+        _gradient(canvas, 0, height, (0, 0, 0), [(0, 0), (1, 0.06)], "source-over")
+
+    _draw_text_block(canvas, slide, carousel, font_dir)
+    _draw_series_title(canvas, carousel, font_dir)
+
+    if slide.show_logo:
+        top_right = load_asset("mlinfo.png", 100)
+        if top_right is not None:
+            _paste_asset(canvas, top_right, width - 100 - 50, 50)
+    if slide.show_date:
+        font = load_font("Inter", 400, 24, False, font_dir)
+        text = carousel.date_text or french_date_stamp()
+        shadow = _Shadow(canvas.size, "rgba(0,0,0,0.3)", 2, (1, 1))
+        shadow.text((50, 50), text, font, "la")
+        shadow.apply(canvas)
+        _draw_text(ImageDraw.Draw(canvas), (50, 50), text, font, (255, 255, 255, 178), "la")
+    logo = load_asset("mlinfo_lm.png", None, BOTTOM_LOGO_HEIGHT)
+    if logo is not None:
+        _paste_asset(canvas, logo, (width - logo.width) / 2, height - BOTTOM_LOGO_HEIGHT - BOTTOM_PADDING)
+    if slide.show_turf:
+        turf = load_asset("turf_logo.png", None, 100)
+        if turf is not None:
+            _paste_asset(canvas, turf, width - turf.width - 50, 170 if slide.show_date else 120)
+
+    if index < len(carousel.slides) - 1 and slide.type != "cta":
+        _draw_swipe_hint(canvas)
+        _draw_number_badges(canvas, carousel, index + 1, font_dir)
+    return canvas
+
+
+def render_slide_bytes(carousel: CarouselSpec, index: int, image_data: bytes | None,
+                       font_dir: str | None = None) -> bytes:
+    """Pool entry point: decode the slide photo, render and encode.
+
+    PDF pages are baseline JPEGs (embedded in the PDF as is); ZIP entries use
+    the requested ``output`` and ``quality``.
+    """
+    image = load_source_image(image_data, CANVAS_SIZE) if image_data else None
+    canvas = render_slide(carousel, index, image, font_dir)
+    if carousel.export == "pdf":
+        flat = Image.new("RGB", canvas.size, (255, 255, 255))
+        flat.paste(canvas, mask=canvas.getchannel("A"))
+        buf = io.BytesIO()
+        flat.save(buf, "JPEG", quality=PDF_JPEG_QUALITY, optimize=True)
+        return buf.getvalue()
+    return encode_image(canvas, carousel.output, carousel.quality)
+
+
+def slide_filename(carousel: CarouselSpec, index: int) -> str:
+    """``carousel_01.webp``, as ``downloadAll`` names files."""
+    return f"carousel_{index + 1:02d}.{OUTPUT_FORMATS[carousel.output][2]}"
@@ -33,6 +33,51 @@ class Config:
     # Application settings
     BASE_URL = os.environ.get('BASE_URL') or 'http://localhost:5000'
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'admin@example.com'
+    
+    # Budget catalog source: 'json' (data/api-export.json) or 'sqlite'
+    # (database/budget_2026_2027.db, falls back to JSON until it is built)
+    BUDGET_CATALOG_SOURCE = os.environ.get('BUDGET_CATALOG_SOURCE', 'json')
+    
+    # Budget media derivatives (resized/re-encoded previews), cached on disk
+    # Defaults to <instance>/budget_media_cache when unset
+    BUDGET_MEDIA_CACHE_DIR = os.environ.get('BUDGET_MEDIA_CACHE_DIR')
+    BUDGET_MEDIA_CACHE_MAX_MB = int(os.environ.get('BUDGET_MEDIA_CACHE_MAX_MB', '200'))
+    # Let nginx send budget media bytes via X-Accel-Redirect (requires the
+    # internal locations from nginx.conf); off by default so Flask serves them
+    BUDGET_MEDIA_X_ACCEL = os.environ.get('BUDGET_MEDIA_X_ACCEL', 'False').lower() == 'true'
+    BUDGET_MEDIA_X_ACCEL_PREFIX = os.environ.get('BUDGET_MEDIA_X_ACCEL_PREFIX', '/_budget_media/')
+    BUDGET_MEDIA_CACHE_X_ACCEL_PREFIX = os.environ.get('BUDGET_MEDIA_CACHE_X_ACCEL_PREFIX', '/_budget_media_cache/')
+    
+    # Server-side rendering (/render/image_creator)
+    # Directory of static TTF/OTF fonts (e.g. FiraSans-ExtraBold.ttf); defaults to app/static/fonts
+    RENDER_FONT_DIR = os.environ.get('RENDER_FONT_DIR')
+    RENDER_MAX_UPLOAD_MB = int(os.environ.get('RENDER_MAX_UPLOAD_MB', '25'))
+    # Brand assets decoded once into a memory-mapped file shared by every process
+    # Defaults to <instance>/asset_cache when unset
+    ASSET_REGISTRY_ENABLED = os.environ.get('ASSET_REGISTRY_ENABLED', 'True').lower() == 'true'
+    ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR')
+    
+    # Server-side bulk watermarking (/bulk/watermark)
+    # Batches live in <instance>/bulk_batches when unset and are deleted after BULK_BATCH_TTL_HOURS
+    BULK_BATCH_DIR = os.environ.get('BULK_BATCH_DIR')
+    BULK_WORKERS = int(os.environ.get('BULK_WORKERS', '2'))
+    BULK_MAX_FILES = int(os.environ.get('BULK_MAX_FILES', '200'))
+    BULK_BATCH_TTL_HOURS = float(os.environ.get('BULK_BATCH_TTL_HOURS', '24'))
+
+    # Background jobs: rows live in a separate SQLite file; `python worker.py`
+    # runs them next to gunicorn. Off = bulk batches run on a pool in the web process
+    JOBS_ENABLED = os.environ.get('JOBS_ENABLED', 'False').lower() == 'true'
+    JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH') or None  # None = instance/jobs.db
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', '1.0'))
+    JOBS_RETENTION_HOURS = float(os.environ.get('JOBS_RETENTION_HOURS', '24'))
+    # Running jobs of a worker silent for 3 intervals are requeued
+    JOBS_HEARTBEAT_INTERVAL = float(os.environ.get('JOBS_HEARTBEAT_INTERVAL', '10'))
+    # Keep each SSE connection well under the gunicorn timeout (60s); only
+    # JOBS_SSE_MAX_STREAMS per process stay open (each holds a gunicorn thread),
+    # further clients get one update per connection and reconnect
+    JOBS_SSE_MAX_SECONDS = int(os.environ.get('JOBS_SSE_MAX_SECONDS', '20'))
+    JOBS_SSE_MAX_STREAMS = int(os.environ.get('JOBS_SSE_MAX_STREAMS', '2'))
+    JOBS_SSE_POLL_INTERVAL = float(os.environ.get('JOBS_SSE_POLL_INTERVAL', '0.5'))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
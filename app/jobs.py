@@ -0,0 +1,303 @@
+"""SQLite-backed background jobs, run by ``worker.py`` outside gunicorn.
+
+Web requests only insert a row (``enqueue``) and return. The worker process
+claims queued rows one at a time, runs the handler registered for the job's
+``kind`` and records progress counters and result paths on the row, which the
+``/jobs/<id>`` endpoints read back (JSON or Server-Sent Events).
+
+Job states: queued -> running -> done | failed.
+
+Each worker start registers a fresh id (host, pid and a random token) and
+refreshes its heartbeat from a background thread, even while a job runs.
+Running jobs whose worker stopped heartbeating are requeued, so a reused PID
+can never make a dead worker's jobs look alive.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("queued", "running", "done", "failed")
+FINISHED = ("done", "failed")
+
+# kind -> "module:function"; handlers are imported lazily by the worker so the
+# web process never loads them. A handler is called as
+# handler(job, progress, config) and returns a JSON-serialisable result.
+JOB_HANDLERS = {
+    "bulk_watermark": "app.bulk_watermark:run_batch_job",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT NOT NULL DEFAULT '{}',
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+_initialized: set[str] = set()
+
+
+@contextmanager
+def connect(db_path: str | Path):
+    """Short-lived connection in WAL mode (readers never block the worker)."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if str(db_path) not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialized.add(str(db_path))
+        yield conn
+    finally:
+        conn.close()
+
+
+def db_path_for(app) -> str:
+    """JOBS_DB_PATH, or ``jobs.db`` in the app's instance folder."""
+    return app.config.get("JOBS_DB_PATH") or os.path.join(app.instance_path, "jobs.db")
+
+
+def _row_to_job(row: sqlite3.Row | None) -> dict | None:
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"] or "{}")
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def enqueue(db_path, kind: str, payload: dict, user_id: int | None = None, total: int = 0) -> str:
+    """Insert a queued job and return its id."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, user_id, payload, total, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, json.dumps(payload), total, now, now),
+        )
+    return job_id
+
+
+def get_job(db_path, job_id: str) -> dict | None:
+    with connect(db_path) as conn:
+        return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def public_job(job: dict) -> dict:
+    """Fields exposed to the browser (no payload internals or worker ids)."""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "failed": job["failed"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+def claim_next(db_path, worker: str) -> dict | None:
+    """Atomically move the oldest queued job to running and return it."""
+    with connect(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return _row_to_job(job)
+
+
+def update_progress(db_path, job_id: str, done: int, failed: int = 0, total: int | None = None) -> None:
+    with connect(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET done = ?, failed = ?, total = COALESCE(?, total), updated_at = ? WHERE id = ?",
+            (done, failed, total, time.time(), job_id),
+        )
+
+
+def finish(db_path, job_id: str, result=None, error: str | None = None) -> None:
+    """Mark a job done (or failed when ``error`` is given)."""
+    now = time.time()
+    with connect(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+            ("failed" if error else "done", json.dumps(result) if result is not None else None,
+             error, now, now, job_id),
+        )
+
+
+def heartbeat(db_path, worker: str) -> None:
+    """Record that ``worker`` is alive."""
+    with connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO workers (id, heartbeat_at) VALUES (?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (worker, time.time()),
+        )
+
+
+def unregister_worker(db_path, worker: str) -> None:
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM workers WHERE id = ?", (worker,))
+
+
+def requeue_orphans(db_path, worker: str, stale_after: float) -> int:
+    """Put back running jobs owned by any other worker not seen for ``stale_after`` seconds."""
+    cutoff = time.time() - stale_after
+    with connect(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ? AND id != ?", (cutoff, worker))
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ?"
+                " WHERE status = 'running' AND (worker IS NULL OR worker != ?)"
+                " AND (worker IS NULL OR worker NOT IN (SELECT id FROM workers))",
+                (time.time(), worker),
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return requeued
+
+
+def purge_finished(db_path, max_age_hours: float) -> int:
+    cutoff = time.time() - max_age_hours * 3600
+    with connect(db_path) as conn:
+        return conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+        ).rowcount
+
+
+def _load_handler(kind: str) -> Callable:
+    module_name, func_name = JOB_HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def run_job(db_path, job: dict, config) -> None:
+    """Run one claimed job, recording progress and the final state."""
+    last_write = 0.0
+
+    def progress(done: int, failed: int = 0, total: int | None = None) -> None:
+        # Throttle writes; the SSE endpoint polls about twice a second anyway
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= 0.25 or (total is not None) or done + failed == (total or job["total"]):
+            update_progress(db_path, job["id"], done, failed, total)
+            last_write = now
+
+    try:
+        result = _load_handler(job["kind"])(job, progress, config)
+    except Exception as exc:  # noqa: BLE001 - the job fails, the worker keeps going
+        logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+        finish(db_path, job["id"], error=f"{type(exc).__name__}: {exc}")
+        return
+    finish(db_path, job["id"], result=result)
+
+
+def run_worker(db_path, config, once: bool = False) -> None:
+    """Poll for queued jobs until SIGTERM/SIGINT (or the queue is empty with ``once``)."""
+    poll = float(config.get("JOBS_POLL_INTERVAL", 1.0))
+    beat = float(config.get("JOBS_HEARTBEAT_INTERVAL", 10.0))
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Beats come from a thread so a long job does not look like a dead worker
+    heartbeat(db_path, worker)
+    beating = threading.Event()
+
+    def beat_loop():
+        while not beating.wait(beat):
+            try:
+                heartbeat(db_path, worker)
+            except sqlite3.Error:
+                logger.exception("Heartbeat failed for worker %s", worker)
+
+    threading.Thread(target=beat_loop, name="jobs-heartbeat", daemon=True).start()
+    logger.info("Job worker %s polling %s", worker, db_path)
+
+    last_purge = last_requeue = 0.0
+    try:
+        while not stopping:
+            if time.monotonic() - last_requeue > beat:
+                # A few missed beats (not one slow write) before a worker counts as gone
+                requeued = requeue_orphans(db_path, worker, stale_after=beat * 3)
+                if requeued:
+                    logger.warning("Requeued %d job(s) interrupted by a stopped worker", requeued)
+                last_requeue = time.monotonic()
+            if time.monotonic() - last_purge > 3600:
+                purge_finished(db_path, float(config.get("JOBS_RETENTION_HOURS", 24)))
+                last_purge = time.monotonic()
+            job = claim_next(db_path, worker)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+            logger.info("Running job %s (%s)", job["id"], job["kind"])
+            run_job(db_path, job, config)
+    finally:
+        beating.set()
+        unregister_worker(db_path, worker)
@@ -1,10 +1,28 @@
-from flask import render_template, redirect, url_for, request, send_from_directory, abort
+from flask import render_template, redirect, url_for, request, send_file, abort, current_app, jsonify
 from flask_login import login_required, current_user
 from app.main import bp
 from app.models import UsageLog
 from app import db
-from app.budget_catalog import BUDGET_ROOT, load_budget_catalog, is_allowed_budget_media_path
+from app.budget_catalog import load_budget_catalog, load_budget_sprite, get_budget_media_entry, search_budget_themes
+from app.budget_media import normalize_derivative_request, get_derivative
+from app.render import RenderError, normalize_render_spec, load_source_image, render_to_bytes, get_pool
+from app.carousel_render import CANVAS_SIZE as CAROUSEL_SIZE, normalize_carousel_spec, render_slide_bytes, slide_filename
+from app import bulk_watermark, jobs
+from app.zipstream import stream_zip, unique_names
+from app.pdfstream import stream_pdf
+from app.text_layout import layout_blocks
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+from PIL import Image
+import io
+import json
+import mimetypes
+import os
+import threading
+import time
+
+LAYOUT_TOOLS = ('image_creator', 'carousel_creator', 'quote_creator')
 
 @bp.route('/')
 def index():
@@ -52,16 +70,443 @@ def budget_creator():
         'tools/image_creator.html',
         template_config=config_dict,
         budget_mode=True,
-        budget_themes=load_budget_catalog(),
+        budget_themes=load_budget_catalog(current_app.config['BUDGET_CATALOG_SOURCE']),
+        budget_sprite=load_budget_sprite(current_app.config['BUDGET_CATALOG_SOURCE']),
     )
 
+@bp.route('/budget-themes/search')
+@login_required
+def budget_theme_search():
+    """Search budget themes by French/English title or slug (JSON)."""
+    query = request.args.get('q', '', type=str)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    results = search_budget_themes(query, limit=limit, source=current_app.config['BUDGET_CATALOG_SOURCE'])
+    return jsonify({'query': query, 'results': results})
+
+BUDGET_MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def _budget_media_cache_dir():
+    return Path(current_app.config.get('BUDGET_MEDIA_CACHE_DIR') or os.path.join(
+        current_app.instance_path, 'budget_media_cache'
+    ))
+
+def _apply_budget_media_cache_headers(response, immutable):
+    response.cache_control.private = True
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = BUDGET_MEDIA_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = 0
+        response.cache_control.no_cache = True
+    return response
+
 @bp.route('/budget-media/<path:subpath>')
 @login_required
 def budget_media(subpath):
-    """Serve standardized budget speech images (login required)."""
-    if not is_allowed_budget_media_path(subpath):
+    """Serve standardized budget speech images (login required).
+
+    Optional ``w`` (width in px) and ``fmt`` (webp/jpeg) query parameters
+    return a smaller cached derivative instead of the full 1920x1080 JPEG.
+    Responses carry a strong content-hash ETag and honour If-None-Match and
+    Range. URLs whose ``v`` parameter matches the current content hash are
+    cached as immutable; others must revalidate.
+
+    With BUDGET_MEDIA_X_ACCEL enabled the bytes are handed off to nginx via
+    X-Accel-Redirect (see the internal locations in nginx.conf) so the sync
+    worker is free as soon as the checks above have run.
+    """
+    entry = get_budget_media_entry(subpath)
+    if entry is None:
         abort(404)
-    return send_from_directory(BUDGET_ROOT, subpath)
+
+    path, mimetype, etag = entry.path, None, entry.sha256
+    accel_uri = current_app.config['BUDGET_MEDIA_X_ACCEL_PREFIX'] + quote(subpath.lstrip('/'))
+    try:
+        derivative = normalize_derivative_request(request.args.get('w'), request.args.get('fmt'))
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    if derivative is not None:
+        width, fmt = derivative
+        cache_dir = _budget_media_cache_dir()
+        max_bytes = current_app.config.get('BUDGET_MEDIA_CACHE_MAX_MB', 200) * 1024 * 1024
+        try:
+            path, mimetype, etag = get_derivative(entry, width, fmt, cache_dir, max_bytes)
+            accel_uri = current_app.config['BUDGET_MEDIA_CACHE_X_ACCEL_PREFIX'] + quote(
+                path.relative_to(cache_dir).as_posix()
+            )
+        except OSError:
+            current_app.logger.exception('Budget media derivative failed for %s', subpath)
+
+    immutable = request.args.get('v') == entry.version
+    if not current_app.config.get('BUDGET_MEDIA_X_ACCEL'):
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True)
+        response.accept_ranges = 'bytes'
+        return _apply_budget_media_cache_headers(response, immutable)
+
+    # Validators are answered here; nginx handles the body and Range requests
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = accel_uri
+        response.mimetype = mimetype or mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+    response.set_etag(etag)
+    return _apply_budget_media_cache_headers(response, immutable)
+
+def _tool_template_config(tool_name):
+    """Saved TemplateConfig for a tool, or the admin defaults if none is saved."""
+    from app.models import TemplateConfig
+    from app.admin.routes import get_default_template_config
+    config = TemplateConfig.query.filter_by(tool_name=tool_name).first()
+    return (config.get_config() if config else None) or get_default_template_config(tool_name)
+
+@bp.route('/render/image_creator', methods=['POST'])
+@login_required
+def render_image_creator():
+    """Render a post/story/website image on the server (WebP or JPEG).
+
+    Accepts either a JSON spec as the request body, or multipart form data
+    with the spec in a ``spec`` field and the photo in an ``image`` file.
+    ``budget_image`` in the spec selects a budget illustration instead of an
+    upload. Spec fields are documented in ``app.render.normalize_render_spec``.
+    """
+    if request.mimetype == 'multipart/form-data':
+        try:
+            spec = json.loads(request.form.get('spec') or '{}')
+        except ValueError:
+            return jsonify({'success': False, 'message': 'spec is not valid JSON'}), 400
+        upload = request.files.get('image')
+    else:
+        spec = request.get_json(silent=True)
+        upload = None
+    if spec is None:
+        return jsonify({'success': False, 'message': 'Expected a JSON render spec'}), 400
+
+    try:
+        render_spec = normalize_render_spec(spec, _tool_template_config('image_creator'))
+        image = None
+        if upload and upload.filename:
+            max_bytes = current_app.config.get('RENDER_MAX_UPLOAD_MB', 25) * 1024 * 1024
+            data = upload.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                return jsonify({'success': False, 'message': 'Image is too large'}), 413
+            image = load_source_image(data, render_spec.size)
+        elif spec.get('budget_image'):
+            entry = get_budget_media_entry(str(spec['budget_image']))
+            if entry is None:
+                return jsonify({'success': False, 'message': 'Unknown budget image'}), 404
+            image = load_source_image(
+                entry.path, render_spec.size, cache_key=(entry.sha256, render_spec.size)
+            )
+        data, mimetype, ext = render_to_bytes(render_spec, image, current_app.config.get('RENDER_FONT_DIR'))
+    except RenderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    log_usage('render_image_creator')
+
+    return send_file(
+        io.BytesIO(data),
+        mimetype=mimetype,
+        as_attachment=request.args.get('download') == '1',
+        download_name=f'{render_spec.format}-image.{ext}',
+        max_age=0,
+    )
+
+@bp.route('/render/carousel', methods=['POST'])
+@login_required
+def render_carousel():
+    """Render every slide of a carousel on the server: a ZIP or one PDF.
+
+    Multipart form data: ``spec`` (JSON, see
+    ``app.carousel_render.normalize_carousel_spec``) and one ``image_<n>``
+    file per slide that has a photo (``n`` is the 0-based slide index). A
+    JSON body works for text-only carousels. Slides render in parallel on
+    the render pool and are streamed in order as they finish; ``export=pdf``
+    gives a multi-page PDF for LinkedIn document posts.
+    """
+    if request.mimetype == 'multipart/form-data':
+        try:
+            spec = json.loads(request.form.get('spec') or '{}')
+        except ValueError:
+            return jsonify({'success': False, 'message': 'spec is not valid JSON'}), 400
+    else:
+        spec = request.get_json(silent=True)
+    if spec is None:
+        return jsonify({'success': False, 'message': 'Expected a JSON carousel spec'}), 400
+
+    try:
+        carousel = normalize_carousel_spec(spec, _tool_template_config('carousel_creator'))
+    except RenderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    max_bytes = current_app.config.get('RENDER_MAX_UPLOAD_MB', 25) * 1024 * 1024
+    images = []
+    for index in range(len(carousel.slides)):
+        upload = request.files.get(f'image_{index}')
+        if not upload or not upload.filename:
+            images.append(None)
+            continue
+        data = upload.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            return jsonify({'success': False, 'message': f'Image for slide {index + 1} is too large'}), 413
+        try:
+            # Header check only, so a bad upload is a 400 rather than a broken stream
+            with Image.open(io.BytesIO(data)):
+                pass
+        except (OSError, Image.DecompressionBombError):
+            return jsonify({'success': False, 'message': f'Image for slide {index + 1} is not a supported image'}), 400
+        images.append(data)
+
+    pool = get_pool(current_app.config.get('BULK_WORKERS', 2))
+    font_dir = current_app.config.get('RENDER_FONT_DIR')
+    futures = [
+        pool.submit(render_slide_bytes, carousel, index, data, font_dir)
+        for index, data in enumerate(images)
+    ]
+
+    def rendered():
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    if carousel.export == 'pdf':
+        width, height = CAROUSEL_SIZE
+        body = stream_pdf(((data, width, height) for data in rendered()), title='Carousel')
+        mimetype, filename = 'application/pdf', 'carousel.pdf'
+    else:
+        names = (slide_filename(carousel, index) for index in range(len(futures)))
+        body = stream_zip(zip(names, rendered()))
+        mimetype, filename = 'application/zip', 'carousel.zip'
+
+    log_usage('render_carousel')
+
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.no_store = True
+    return response
+
+@bp.route('/layout/text', methods=['POST'])
+@login_required
+def layout_text():
+    """Line breaks and bounding boxes for one or more text blocks (JSON).
+
+    Body: ``{"tool": "image_creator", "blocks": [{"text", "family", "weight",
+    "size", "max_width", ...}]}``; block fields are documented in
+    ``app.text_layout.normalize_block``. Families are checked against the
+    tool's ``available_families``. Not logged: editors call this on every
+    keystroke.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    tool = payload.get('tool') or 'image_creator'
+    if tool not in LAYOUT_TOOLS:
+        return jsonify({'success': False, 'message': f'Unknown tool {tool!r}'}), 400
+    families = (_tool_template_config(tool).get('fonts') or {}).get('available_families')
+    try:
+        blocks = layout_blocks(
+            payload['blocks'] if 'blocks' in payload else [payload],
+            families, current_app.config.get('RENDER_FONT_DIR'),
+        )
+    except RenderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'blocks': blocks})
+
+def _bulk_batch_dir():
+    return Path(current_app.config.get('BULK_BATCH_DIR') or os.path.join(
+        current_app.instance_path, 'bulk_batches'
+    ))
+
+def _owned_bulk_batch(batch_id):
+    """Batch metadata if it exists and belongs to the current user, else 404."""
+    meta = bulk_watermark.load_batch(_bulk_batch_dir(), batch_id)
+    if meta is None or meta.get('user_id') != current_user.id:
+        abort(404)
+    return meta
+
+@bp.route('/bulk/watermark', methods=['POST'])
+@login_required
+def bulk_watermark_upload():
+    """Queue a batch of photos for server-side watermarking.
+
+    Multipart form: ``images`` (one or more files) and ``output``
+    (``original`` or ``compressed``, as in the bulk mode radio buttons).
+    Returns the batch status; poll it and fetch each output as it finishes.
+    """
+    files = [f for f in request.files.getlist('images') if f and f.filename]
+    if not files:
+        return jsonify({'success': False, 'message': 'No images uploaded'}), 400
+    max_files = current_app.config.get('BULK_MAX_FILES', 200)
+    if len(files) > max_files:
+        return jsonify({'success': False, 'message': f'At most {max_files} images per batch'}), 400
+    output = request.form.get('output', 'original')
+    if output not in bulk_watermark.OUTPUT_SETTINGS:
+        return jsonify({'success': False, 'message': 'output must be original or compressed'}), 400
+
+    settings = bulk_watermark.settings_from_config(_tool_template_config('bulk'), output)
+    root = _bulk_batch_dir()
+    bulk_watermark.cleanup_batches(root, current_app.config.get('BULK_BATCH_TTL_HOURS', 24))
+    meta = bulk_watermark.create_batch(root, current_user.id, files, settings)
+    if current_app.config.get('JOBS_ENABLED'):
+        job_id = jobs.enqueue(
+            jobs.db_path_for(current_app), 'bulk_watermark',
+            {'root': str(root), 'batch_id': meta['id']},
+            user_id=current_user.id, total=len(meta['items']),
+        )
+        bulk_watermark.set_batch_job(root, meta['id'], job_id)
+    else:
+        bulk_watermark.submit_batch(root, meta['id'], current_app.config.get('BULK_WORKERS', 2))
+
+    log_usage('bulk_watermark')
+
+    return jsonify(_bulk_status_payload(bulk_watermark.batch_status(root, meta['id']))), 202
+
+def _bulk_status_payload(status):
+    for item in status['items']:
+        item['url'] = url_for(
+            'main.bulk_watermark_output', batch_id=status['id'], index=item['index']
+        ) if item['status'] == 'done' else None
+    status.pop('user_id', None)
+    if status.get('job_id'):
+        status['events_url'] = url_for('main.job_events', job_id=status['job_id'])
+    return status
+
+@bp.route('/bulk/watermark/<batch_id>')
+@login_required
+def bulk_watermark_status(batch_id):
+    """Per-image progress of a watermark batch (JSON)."""
+    _owned_bulk_batch(batch_id)
+    return jsonify(_bulk_status_payload(bulk_watermark.batch_status(_bulk_batch_dir(), batch_id)))
+
+@bp.route('/bulk/watermark/<batch_id>/<int:index>')
+@login_required
+def bulk_watermark_output(batch_id, index):
+    """Download one watermarked image as soon as it is ready (404 until then)."""
+    meta = _owned_bulk_batch(batch_id)
+    path = bulk_watermark.batch_output(_bulk_batch_dir(), batch_id, index)
+    if path is None or index >= len(meta['items']):
+        abort(404)
+    return send_file(
+        path,
+        mimetype='image/webp',
+        as_attachment=True,
+        download_name=bulk_watermark.download_name(meta['items'][index]['name']),
+    )
+
+@bp.route('/bulk/watermark/<batch_id>/archive.zip')
+@login_required
+def bulk_watermark_archive(batch_id):
+    """Stream every finished image of a batch as one ZIP download.
+
+    Entries are stored (not deflated) and read from disk chunk by chunk while
+    the response is sent, so memory stays flat whatever the batch size.
+    Images still being processed are left out; fetch again once the batch
+    reports ``complete``.
+    """
+    meta = _owned_bulk_batch(batch_id)
+    root = _bulk_batch_dir()
+    ready = [
+        (item, path) for item, path in (
+            (item, bulk_watermark.batch_output(root, batch_id, item['index'])) for item in meta['items']
+        ) if path is not None
+    ]
+    if not ready:
+        abort(404)
+    names = unique_names(bulk_watermark.download_name(item['name']) for item, _ in ready)
+    response = current_app.response_class(
+        stream_zip(zip(names, (path for _, path in ready))),
+        mimetype='application/zip',
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="watermarked-{batch_id[:8]}.zip"'
+    # Let nginx pass chunks straight through instead of buffering the archive
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.no_store = True
+    return response
+
+def _owned_job(job_id):
+    job = jobs.get_job(jobs.db_path_for(current_app), job_id) if job_id.isalnum() else None
+    if job is None or job['user_id'] != current_user.id:
+        abort(404)
+    return job
+
+@bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Current state and progress counters of a background job (JSON)."""
+    return jsonify(jobs.public_job(_owned_job(job_id)))
+
+_sse_slots = None
+_sse_slots_lock = threading.Lock()
+
+
+def _sse_stream_slots(limit):
+    """Per-process semaphore bounding the gthread threads held by open streams."""
+    global _sse_slots
+    with _sse_slots_lock:
+        if _sse_slots is None:
+            _sse_slots = threading.BoundedSemaphore(max(1, limit))
+        return _sse_slots
+
+@bp.route('/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress.
+
+    Sends a ``progress`` event whenever the counters change and a final
+    ``done``/``failed`` event. Each connection is closed after
+    JOBS_SSE_MAX_SECONDS so it never runs into the gunicorn timeout;
+    EventSource reconnects by itself and gets the current state straight away.
+    At most JOBS_SSE_MAX_STREAMS streams stay open per process (each holds a
+    gunicorn thread); beyond that a connection gets the current state and is
+    closed, so those clients poll at the ``retry`` interval instead.
+    """
+    _owned_job(job_id)
+    db_path = jobs.db_path_for(current_app)
+    max_seconds = current_app.config.get('JOBS_SSE_MAX_SECONDS', 20)
+    poll = current_app.config.get('JOBS_SSE_POLL_INTERVAL', 0.5)
+    slots = _sse_stream_slots(current_app.config.get('JOBS_SSE_MAX_STREAMS', 2))
+
+    def events():
+        streaming = slots.acquire(blocking=False)
+        try:
+            yield from stream(max_seconds if streaming else 0)
+        finally:
+            if streaming:
+                slots.release()
+
+    def stream(seconds):
+        started = last_sent = time.monotonic()
+        last = None
+        yield 'retry: 1000\n\n' if seconds else 'retry: 2000\n\n'
+        while True:
+            job = jobs.get_job(db_path, job_id)
+            if job is None:
+                yield 'event: failed\ndata: {"error": "Job no longer exists"}\n\n'
+                return
+            state = (job['status'], job['done'], job['failed'], job['total'])
+            if state != last:
+                last, last_sent = state, time.monotonic()
+                event = job['status'] if job['status'] in jobs.FINISHED else 'progress'
+                yield f'event: {event}\ndata: {json.dumps(jobs.public_job(job))}\n\n'
+                if event != 'progress':
+                    return
+            elif time.monotonic() - last_sent > 15:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.monotonic()
+                yield ': keep-alive\n\n'
+            if time.monotonic() - started >= seconds:
+                return
+            time.sleep(poll)
+
+    response = current_app.response_class(events(), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.no_cache = True
+    return response
 
 @bp.route('/layout_creator')
 @login_required
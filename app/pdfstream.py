@@ -0,0 +1,71 @@
+"""Stream a multi-page PDF of JPEG pages while the pages are being rendered.
+
+Each page is one full-bleed image. JPEG data is embedded as is (``DCTDecode``),
+so nothing is re-encoded, and objects are written in order with their offsets
+recorded for the cross-reference table at the end. Only one page is held in
+memory at a time.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+# Pages are sized 1px = 1pt, so a 1000x1250 slide is a 1000x1250pt page
+# (LinkedIn and PDF viewers scale pages to fit anyway).
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.offset = 0
+        self.offsets: dict[int, int] = {}
+
+    def chunk(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def obj(self, num: int, body: bytes) -> bytes:
+        self.offsets[num] = self.offset
+        return self.chunk(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+
+def stream_pdf(pages: Iterable[tuple[bytes, int, int]], title: str | None = None) -> Iterator[bytes]:
+    """Yield a PDF with one page per ``(jpeg bytes, width, height)``.
+
+    ``pages`` may be a generator; the page count is only needed for the page
+    tree, which is written last.
+    """
+    w = _Writer()
+    yield w.chunk(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # 1 = catalog, 2 = page tree, 3 = info; each page uses three objects
+    page_ids = []
+    num = 4
+    for jpeg, width, height in pages:
+        image_id, content_id, page_id = num, num + 1, num + 2
+        num += 3
+        yield w.obj(image_id, (
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB"
+            b" /BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n" % (width, height, len(jpeg))
+        ) + jpeg + b"\nendstream")
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height)
+        yield w.obj(content_id, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        yield w.obj(page_id, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R"
+            b" /Resources << /XObject << /Im0 %d 0 R >> >> >>" % (width, height, content_id, image_id)
+        ))
+        page_ids.append(page_id)
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    yield w.obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    yield w.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    info = b"<< /Producer (Image Creator)"
+    if title:
+        info += b" /Title <FEFF" + title.encode("utf-16-be").hex().upper().encode() + b">"
+    yield w.obj(3, info + b" >>")
+
+    xref_offset = w.offset
+    lines = [b"xref\n0 %d\n" % num, b"0000000000 65535 f \n"]
+    for i in range(1, num):
+        lines.append(b"%010d 00000 n \n" % w.offsets[i])
+    lines.append(b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (num, xref_offset))
+    yield w.chunk(b"".join(lines))
@@ -0,0 +1,1124 @@
+"""Server-side rendering of image_creator post/story/website images.
+
+Reproduces the canvas layout of ``drawCanvas`` in
+``templates/tools/image_creator.html`` with Pillow so images can be produced
+without a browser. A render is described by a JSON spec (see
+``normalize_render_spec``); defaults come from the ``image_creator``
+TemplateConfig and, failing that, from the same values the editor starts with.
+
+Quote mode, the Post-Quote/Nom_Bio_Titre presets, portraits and overlay layers
+are still browser-only.
+
+Fonts are loaded from ``font_dir`` using Google Fonts' static file names
+(``FiraSans-ExtraBold.ttf``, ``Inter-Regular.ttf``, ...). A missing family falls
+back to DejaVu Sans, then Pillow's bundled font, so renders never fail on a
+bare server.
+"""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+from app import asset_registry
+from app.asset_registry import decode_asset, get_registry, scale_asset
+
+ASSETS_DIR = Path(__file__).resolve().parent / "static" / "assets"
+FONT_DIR = Path(__file__).resolve().parent / "static" / "fonts"
+
+FORMATS = {
+    "post": (1000, 1250),
+    "story": (1080, 1920),
+    "website": (1000, 500),
+}
+FORMAT_ALIASES = {"social": "post"}
+
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "avif": ("AVIF", "image/avif", "avif"),  # only if this Pillow can write AVIF
+}
+# downloadImage(): 100% for post/story, 80% for website
+DEFAULT_QUALITY = {"post": 100, "story": 100, "website": 80}
+# Byte-budget encoding (TemplateConfig layout.byte_budgets / budget_formats)
+DEFAULT_BUDGET_FORMATS = ("webp", "avif", "jpeg")
+DEFAULT_BUDGET_MIN_QUALITY = 50
+MIN_BYTE_BUDGET = 1000
+# libavif speed 8 encodes ~5x faster than the default 6 for ~1% larger files
+AVIF_SPEED = 8
+
+BLEND_MODES = ("source-over", "multiply", "screen", "overlay", "darken", "lighten")
+ALIGNMENTS = ("left", "center", "right")
+
+# Subtitle weight per main font, as in drawCanvas()
+SUBTITLE_WEIGHTS = {
+    "Noto Serif": "200",
+    "Parkinsans": "600",
+    "Hanken Grotesk": "600",
+    "Inter": "600",
+    "IBM Plex Sans": "600",
+    "Geom": "600",
+    "Fira Sans": "700",
+}
+WEIGHT_NAMES = {
+    100: "Thin",
+    200: "ExtraLight",
+    300: "Light",
+    400: "Regular",
+    500: "Medium",
+    600: "SemiBold",
+    700: "Bold",
+    800: "ExtraBold",
+    900: "Black",
+}
+
+FRENCH_DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+FRENCH_MONTHS = [
+    "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+    "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre",
+]
+MONOSYLLABIC_WORDS = (
+    "a", "à", "aux", "au", "dans", "de", "des", "du", "dès", "en", "et", "le", "la", "les",
+    "ou", "où", "par", "pour", "que", "qui", "sa", "se", "ses", "son", "sous", "sur", "un", "une", "vers",
+)
+_MONOSYLLABIC_RE = re.compile(r"\b(" + "|".join(MONOSYLLABIC_WORDS) + r")\s", re.IGNORECASE)
+_ELIDED_RE = re.compile(r"(\b\w)'\s")
+
+SOURCE_CACHE_SIZE = 8
+ASSET_CACHE_SIZE = 32
+FALLBACK_FONTS = {
+    "regular": ("DejaVuSans.ttf",),
+    "bold": ("DejaVuSans-Bold.ttf", "DejaVuSans.ttf"),
+}
+
+
+class RenderError(ValueError):
+    """Raised when a render spec cannot be honoured."""
+
+
+def apply_french_typography_rules(text: str) -> str:
+    """Glue short French words to the next word with non-breaking spaces.
+
+    Mirrors ``applyFrenchTypographyRules`` in image_creator.html.
+    """
+    text = _MONOSYLLABIC_RE.sub(lambda m: m.group(1) + " ", text)
+
+    def elided(match: re.Match) -> str:
+        if match.group(1).lower() == "l":
+            return "l "
+        return match.group(1) + "' "
+
+    return _ELIDED_RE.sub(elided, text)
+
+
+def french_date_stamp(today: date | None = None) -> str:
+    """Date stamp drawn top-left on post and story images."""
+    today = today or date.today()
+    day_name = FRENCH_DAYS[today.weekday()]
+    month_name = FRENCH_MONTHS[today.month - 1]
+    return f"LEMAURICIEN.COM  › {day_name} {today.day} {month_name} {today.year}"
+
+
+# --- Spec --------------------------------------------------------------------
+
+@dataclass
+class RenderSpec:
+    format: str = "post"
+    title: str = ""
+    subtitle: str = ""
+    excerpt: str = ""
+    font_family: str = "Fira Sans"
+    title_weight: str = "800"
+    subtitle_weight: str | None = None
+    title_size: int = 120
+    title_size_min: int = 36
+    subtitle_size: int = 50
+    excerpt_size: int = 28
+    kerning: float = -2.0
+    align: str = "left"
+    vertical_position: float = 180
+    subtitle_all_caps: bool = True
+    subtitle_color: str = "#FFFFFF"
+    subtitle_bg: str | None = None
+    title_color: str = "#FFFFFF"
+    title_bg: str | None = None
+    gradient_color: str | None = "#000000"
+    gradient_position: str = "bottom"
+    blend_mode: str = "source-over"
+    image_fit: str = "cover"
+    image_zoom: float = 100
+    image_offset_x: float = 0
+    image_offset_y: float = 0
+    image_bg: str | None = "#FFFFFF"
+    show_date: bool = True
+    date_text: str | None = None
+    weekend_tag: bool = False
+    turf_logo: bool = False
+    turf_top_right: bool = False
+    budget: bool = False
+    output: str = "webp"
+    quality: int | None = None
+    byte_budget: int | None = None
+    budget_outputs: tuple[str, ...] = ("webp",)
+    budget_min_quality: int = DEFAULT_BUDGET_MIN_QUALITY
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return FORMATS[self.format]
+
+    @property
+    def is_budget_post(self) -> bool:
+        return self.budget and self.format == "post"
+
+
+def _as_int(value, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int(float(value))
+    except (TypeError, ValueError):
+        return default
+    return max(lo, min(hi, value))
+
+
+def _as_float(value, default: float, lo: float, hi: float) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    return max(lo, min(hi, value))
+
+
+def text_field(data: dict, key: str, default: str | None = None, numbers: bool = False) -> str | None:
+    """A JSON string field; anything else is a RenderError (numbers too, unless ``numbers``).
+
+    Shared by the render and text layout endpoints so both reject the same input.
+    """
+    value = data.get(key)
+    if value is None or value == "":
+        return default
+    if isinstance(value, str):
+        return value
+    if numbers and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise RenderError(f"{key} must be a string")
+
+
+def _as_color(spec: dict, key: str, default: str | None = None) -> str | None:
+    """A colour field, parsed now so a bad value fails before rendering starts."""
+    value = spec.get(key, default) or None
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise RenderError(f"{key} must be a colour string")
+    try:
+        parse_color(value)
+    except RenderError as exc:
+        raise RenderError(f"Invalid {key} {value!r}") from exc
+    return value
+
+
+def _size_range(fonts: dict, key: str, lo: int, hi: int, default: int) -> tuple[int, int, int]:
+    rng = fonts.get(key) or {}
+    lo = _as_int(rng.get("min"), lo, 1, 1000)
+    hi = _as_int(rng.get("max"), hi, lo, 1000)
+    return lo, hi, _as_int(rng.get("default"), default, lo, hi)
+
+
+def output_available(output: str) -> bool:
+    """True if Pillow has an encoder for ``output`` (AVIF needs Pillow 11.2+ or a plugin)."""
+    Image.init()
+    return output in OUTPUT_FORMATS and OUTPUT_FORMATS[output][0] in Image.SAVE
+
+
+def parse_output(value) -> str:
+    """Normalise an ``output`` field (``jpg`` -> ``jpeg``) and check it can be encoded."""
+    output = str(value or "webp").lower()
+    output = "jpeg" if output == "jpg" else output
+    if not output_available(output):
+        expected = ", ".join(o for o in OUTPUT_FORMATS if output_available(o))
+        raise RenderError(f"Unknown output {output!r}; expected one of {expected}")
+    return output
+
+
+def _budget_settings(spec: dict, layout: dict, fmt: str, quality) -> tuple[int | None, tuple[str, ...], int]:
+    """Byte budget, candidate outputs and quality floor for a render spec.
+
+    An explicit ``byte_budget`` in the spec wins (0 or null turns it off);
+    otherwise ``layout.byte_budgets[format]`` applies unless the spec asks
+    for a fixed ``quality``.
+    """
+    if "byte_budget" in spec:
+        raw = spec["byte_budget"]
+    elif quality is None:
+        raw = (layout.get("byte_budgets") or {}).get(fmt)
+    else:
+        raw = None
+    budget = _as_int(raw, 0, 0, 50 * 1024 * 1024) if raw else 0
+    if budget and budget < MIN_BYTE_BUDGET:
+        raise RenderError(f"byte_budget must be at least {MIN_BYTE_BUDGET} bytes")
+    outputs = tuple(
+        o for o in (layout.get("budget_formats") or DEFAULT_BUDGET_FORMATS)
+        if isinstance(o, str) and output_available(o)
+    )
+    min_quality = _as_int(layout.get("budget_min_quality"), DEFAULT_BUDGET_MIN_QUALITY, 1, 100)
+    return budget or None, outputs or ("webp",), min_quality
+
+
+def normalize_render_spec(spec: dict, template_config: dict | None = None) -> RenderSpec:
+    """Validate a JSON render spec against the image_creator TemplateConfig."""
+    if not isinstance(spec, dict):
+        raise RenderError("Render spec must be a JSON object")
+    fonts = (template_config or {}).get("fonts") or {}
+    layout = (template_config or {}).get("layout") or {}
+
+    fmt = str(spec.get("format") or "post").lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise RenderError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+    quality = spec.get("quality")
+    byte_budget, budget_outputs, budget_min_quality = _budget_settings(spec, layout, fmt, quality)
+    if str(spec.get("output") or "").lower() == "auto":
+        # First budget format that fits; without a budget, the first one available
+        output = budget_outputs[0]
+    else:
+        output = parse_output(spec.get("output"))
+        budget_outputs = (output,)
+
+    family = text_field(spec, "font_family") or fonts.get("default_family") or "Fira Sans"
+    available = fonts.get("available_families")
+    if available and family not in available and family not in SUBTITLE_WEIGHTS:
+        raise RenderError(f"Font family {family!r} is not enabled for image_creator")
+
+    title_min, title_max, title_default = _size_range(fonts, "title_size", 36, 140, 120)
+    sub_min, sub_max, sub_default = _size_range(fonts, "subtitle_size", 20, 80, 50)
+
+    align = str(spec.get("align") or "left").lower()
+    if align not in ALIGNMENTS:
+        raise RenderError(f"Unknown align {align!r}")
+    blend_mode = str(spec.get("blend_mode") or "source-over").lower()
+    if blend_mode not in BLEND_MODES:
+        raise RenderError(f"Unknown blend_mode {blend_mode!r}")
+    gradient_position = str(spec.get("gradient_position") or "bottom").lower()
+    if gradient_position not in ("top", "bottom", "off"):
+        raise RenderError(f"Unknown gradient_position {gradient_position!r}")
+    image_fit = str(spec.get("image_fit") or "cover").lower()
+    if image_fit not in ("cover", "contain"):
+        raise RenderError(f"Unknown image_fit {image_fit!r}")
+
+    budget = bool(spec.get("budget"))
+    default_image_bg = None if budget and fmt == "post" else "#FFFFFF"
+
+    return RenderSpec(
+        format=fmt,
+        title=text_field(spec, "title", "")[:400],
+        subtitle=text_field(spec, "subtitle", "")[:200],
+        excerpt=text_field(spec, "excerpt", "")[:600],
+        font_family=family,
+        title_weight=text_field(spec, "title_weight", numbers=True) or str(fonts.get("title_weight") or "800"),
+        subtitle_weight=text_field(spec, "subtitle_weight", numbers=True),
+        title_size=_as_int(spec.get("title_size"), title_default, title_min, title_max),
+        title_size_min=title_min,
+        subtitle_size=_as_int(spec.get("subtitle_size"), sub_default, sub_min, sub_max),
+        excerpt_size=_as_int(spec.get("excerpt_size"), 28, 14, 48),
+        kerning=_as_float(spec.get("kerning"), -2.0, -10.0, 10.0),
+        align=align,
+        vertical_position=_as_float(spec.get("vertical_position"), 180, 15, 180),
+        subtitle_all_caps=bool(spec.get("subtitle_all_caps", True)),
+        subtitle_color=_as_color(spec, "subtitle_color") or _as_color(
+            (template_config or {}).get("colors") or {}, "subtitle_default", "#FFFFFF"
+        ),
+        subtitle_bg=_as_color(spec, "subtitle_bg"),
+        title_color=_as_color(spec, "title_color") or "#FFFFFF",
+        title_bg=_as_color(spec, "title_bg"),
+        gradient_color=_as_color(spec, "gradient_color", "#000000"),
+        gradient_position=gradient_position,
+        blend_mode=blend_mode,
+        image_fit=image_fit,
+        image_zoom=_as_float(spec.get("image_zoom"), 100, 10, 500),
+        image_offset_x=_as_float(spec.get("image_offset_x"), 0, -5000, 5000),
+        image_offset_y=_as_float(spec.get("image_offset_y"), 0, -5000, 5000),
+        image_bg=_as_color(spec, "image_bg", default_image_bg),
+        show_date=bool(spec.get("show_date", True)),
+        date_text=text_field(spec, "date_text"),
+        weekend_tag=bool(spec.get("weekend_tag")),
+        turf_logo=bool(spec.get("turf_logo")),
+        turf_top_right=bool(spec.get("turf_top_right")),
+        budget=budget,
+        output=output,
+        quality=_as_int(quality, DEFAULT_QUALITY[fmt], 1, 100) if quality is not None else None,
+        byte_budget=byte_budget,
+        budget_outputs=budget_outputs,
+        budget_min_quality=budget_min_quality,
+    )
+
+
+# --- Colours -----------------------------------------------------------------
+
+_RGBA_RE = re.compile(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)")
+
+
+@lru_cache(maxsize=256)
+def parse_color(value: str) -> tuple[int, int, int, int]:
+    """Parse a CSS colour (hex, rgb(), rgba() with 0-1 alpha, names) to RGBA."""
+    value = (value or "").strip().lower()
+    match = _RGBA_RE.fullmatch(value)
+    if match:
+        r, g, b = (int(float(v)) for v in match.groups()[:3])
+        a = float(match.group(4)) if match.group(4) is not None else 1.0
+        return r, g, b, round(max(0.0, min(1.0, a)) * 255)
+    try:
+        rgb = ImageColor.getrgb(value)
+    except ValueError as exc:
+        raise RenderError(f"Invalid colour {value!r}") from exc
+    return rgb if len(rgb) == 4 else (*rgb, 255)
+
+
+# --- Warm caches -------------------------------------------------------------
+
+_assets_lock = threading.Lock()
+_assets: OrderedDict[tuple[str, int, int], tuple[int, Image.Image]] = OrderedDict()
+_sources_lock = threading.Lock()
+_sources: OrderedDict[tuple, Image.Image] = OrderedDict()
+
+
+def load_asset(name: str, width: int | None = None, height: int | None = None) -> Image.Image | None:
+    """Decoded RGBA brand asset from static/assets, optionally pre-scaled.
+
+    Assets and sizes listed in ``app.asset_registry.ASSET_SIZES`` come from
+    the memory-mapped registry shared by all processes (read-only images).
+    Other sizes are scaled once per process and kept in a small LRU until
+    the file's mtime changes. Returns None if the asset is missing, like a
+    failed ``Image.onload`` in the browser.
+    """
+    path = ASSETS_DIR / name
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    registry = get_registry(ASSETS_DIR)
+    if registry is not None and not registry.fresh(name, stat):
+        # A changed file marks the registry stale; map (or build) the new one
+        registry = get_registry(ASSETS_DIR) if registry.stale else None
+    if registry is not None and registry.fresh(name, stat):
+        img = registry.get(name, width, height)
+        if img is not None:
+            return img
+
+    key = (name, width or 0, height or 0)
+    with _assets_lock:
+        cached = _assets.get(key)
+        if cached and cached[0] == stat.st_mtime_ns:
+            _assets.move_to_end(key)
+            return cached[1]
+    if width or height:
+        base = load_asset(name)
+        if base is None:
+            return None
+        img = scale_asset(base, width, height)
+    else:
+        img = decode_asset(path)
+    with _assets_lock:
+        _assets[key] = (stat.st_mtime_ns, img)
+        while len(_assets) > ASSET_CACHE_SIZE:
+            _assets.popitem(last=False)
+    return img
+
+
+def asset_height(name: str, width: int) -> float | None:
+    """Height of an asset drawn at ``width`` px (aspect preserved)."""
+    base = load_asset(name)
+    if base is None:
+        return None
+    return base.height * (width / base.width)
+
+
+def load_source_image(source, target: tuple[int, int], cache_key: tuple | None = None) -> Image.Image:
+    """Decode a photo (path, bytes or file object) for a canvas of ``target`` size.
+
+    JPEGs are decoded at a reduced scale via draft mode; EXIF orientation is
+    applied. Passing ``cache_key`` keeps the decoded image in a small
+    per-process LRU (used for budget illustrations, which are re-rendered often).
+    """
+    if cache_key is not None:
+        with _sources_lock:
+            img = _sources.get(cache_key)
+            if img is not None:
+                _sources.move_to_end(cache_key)
+                return img
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as src:
+            src.draft("RGB", target)
+            img = ImageOps.exif_transpose(src).convert("RGB")
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise RenderError(f"Could not decode image: {exc}") from exc
+    if cache_key is not None:
+        with _sources_lock:
+            _sources[cache_key] = img
+            while len(_sources) > SOURCE_CACHE_SIZE:
+                _sources.popitem(last=False)
+    return img
+
+
+def _font_candidates(family: str, weight: int, italic: bool) -> list[str]:
+    stem = family.replace(" ", "")
+    name = WEIGHT_NAMES.get(weight, "Regular")
+    if italic:
+        style = "Italic" if name == "Regular" else f"{name}Italic"
+    else:
+        style = name
+    return [f"{stem}-{style}.ttf", f"{stem}-{style}.otf", f"{family}-{style}.ttf"]
+
+
+@lru_cache(maxsize=256)
+def load_font(family: str, weight: str | int, size: int, italic: bool = False,
+              font_dir: str | None = None) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """Font for (family, weight, size), falling back to the nearest weight."""
+    directory = Path(font_dir) if font_dir else FONT_DIR
+    try:
+        wanted = int(weight)
+    except (TypeError, ValueError):
+        wanted = 400
+    for candidate in sorted(WEIGHT_NAMES, key=lambda w: (abs(w - wanted), -w)):
+        for name in _font_candidates(family, candidate, italic):
+            path = directory / name
+            if path.is_file():
+                return ImageFont.truetype(str(path), size)
+    if italic:
+        return load_font(family, weight, size, False, font_dir)
+    # Pillow's bundled font has no accents or non-breaking spaces; DejaVu
+    # ships with most Linux distributions and covers French.
+    for name in (FALLBACK_FONTS["bold"] if wanted >= 600 else FALLBACK_FONTS["regular"]):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+# --- Drawing helpers -----------------------------------------------------------
+
+def _cover_contain(img_w, img_h, target_w, target_h, mode):
+    """Port of ``calcCoverContain``."""
+    img_ratio = img_w / img_h
+    target_ratio = target_w / target_h
+    if (mode == "cover") == (img_ratio > target_ratio):
+        h = target_h
+        w = h * img_ratio
+    else:
+        w = target_w
+        h = w / img_ratio
+    return w, h
+
+
+def _draw_image(canvas: Image.Image, img: Image.Image, x: float, y: float, w: float, h: float) -> None:
+    """``ctx.drawImage(img, x, y, w, h)``, resampling only the visible part."""
+    cw, ch = canvas.size
+    left, top = max(0.0, x), max(0.0, y)
+    right, bottom = min(float(cw), x + w), min(float(ch), y + h)
+    if right <= left or bottom <= top:
+        return
+    sx, sy = img.width / w, img.height / h
+    box = ((left - x) * sx, (top - y) * sy, (right - x) * sx, (bottom - y) * sy)
+    size = (max(1, round(right - left)), max(1, round(bottom - top)))
+    part = img.resize(size, Image.Resampling.BILINEAR, box=box, reducing_gap=2.0)
+    if part.mode == "RGBA":
+        canvas.alpha_composite(part, (round(left), round(top)))
+    else:
+        canvas.paste(part, (round(left), round(top)))
+
+
+def _blurred_cover(canvas: Image.Image, img: Image.Image, zoom: float, dx: float, dy: float,
+                   radius: float = 30) -> None:
+    """Cover-fit ``img`` behind everything with a CSS ``blur(radius px)``.
+
+    Blurring at quarter resolution keeps this cheap; the upscaled result is
+    indistinguishable at a 30px radius.
+    """
+    scale = 4
+    cw, ch = canvas.size
+    small = Image.new("RGBA", (max(1, cw // scale), max(1, ch // scale)), (0, 0, 0, 0))
+    w, h = _cover_contain(img.width, img.height, cw, ch, "cover")
+    w, h = w * zoom, h * zoom
+    x, y = (cw - w) / 2 + dx, (ch - h) / 2 + dy
+    _draw_image(small, img, x / scale, y / scale, w / scale, h / scale)
+    small = small.filter(ImageFilter.GaussianBlur(radius / scale))
+    canvas.alpha_composite(small.resize((cw, ch), Image.Resampling.BILINEAR))
+
+
+def _fill(canvas: Image.Image, box, color) -> None:
+    r, g, b, a = parse_color(color) if isinstance(color, str) else color
+    x0, y0, x1, y1 = (round(v) for v in box)
+    x0, y0 = max(0, x0), max(0, y0)
+    x1, y1 = min(canvas.width, x1), min(canvas.height, y1)
+    if x1 <= x0 or y1 <= y0:
+        return
+    layer = Image.new("RGBA", (x1 - x0, y1 - y0), (r, g, b, a))
+    canvas.alpha_composite(layer, (x0, y0))
+
+
+def _gradient_mask(width: int, height: int, stops: list[tuple[float, float]]) -> Image.Image:
+    """Vertical 'L' mask interpolated between (offset, alpha) colour stops."""
+    column = []
+    for i in range(height):
+        t = i / max(1, height - 1)
+        for (t0, a0), (t1, a1) in zip(stops, stops[1:]):
+            if t <= t1:
+                f = 0.0 if t1 == t0 else (t - t0) / (t1 - t0)
+                column.append(round((a0 + (a1 - a0) * f) * 255))
+                break
+        else:
+            column.append(round(stops[-1][1] * 255))
+    mask = Image.new("L", (1, height))
+    mask.putdata(column)
+    return mask.resize((width, height), Image.Resampling.NEAREST)
+
+
+_BLEND_OPS = {
+    "multiply": ImageChops.multiply,
+    "screen": ImageChops.screen,
+    "overlay": ImageChops.overlay,
+    "darken": ImageChops.darker,
+    "lighten": ImageChops.lighter,
+}
+
+
+def _gradient(canvas: Image.Image, y0: float, y1: float, rgb, stops, mode: str) -> None:
+    top, bottom = max(0, round(y0)), min(canvas.height, round(y1))
+    if bottom <= top:
+        return
+    full = _gradient_mask(canvas.width, round(y1) - round(y0), stops)
+    mask = full.crop((0, top - round(y0), canvas.width, bottom - round(y0)))
+    box = (0, top, canvas.width, bottom)
+    solid = Image.new("RGB", mask.size, rgb[:3])
+    if mode == "source-over":
+        layer = solid.convert("RGBA")
+        layer.putalpha(mask)
+        canvas.alpha_composite(layer, (0, top))
+        return
+    region = canvas.crop(box)
+    blended = _BLEND_OPS[mode](region.convert("RGB"), solid).convert("RGBA")
+    region.paste(blended, (0, 0), mask)
+    canvas.paste(region, (0, top))
+
+
+class _Shadow:
+    """Accumulates shapes for one blurred drop shadow (canvas ``shadow*``)."""
+
+    def __init__(self, size, color, blur, offset=(0, 0)):
+        self.mask = Image.new("L", size, 0)
+        self.draw = ImageDraw.Draw(self.mask)
+        self.color = parse_color(color)
+        self.blur = blur
+        self.offset = offset
+        self.empty = True
+
+    def text(self, xy, text, font, anchor, kerning=0.0):
+        x, y = xy[0] + self.offset[0], xy[1] + self.offset[1]
+        _draw_text(self.draw, (x, y), text, font, 255, anchor, kerning)
+        self.empty = False
+
+    def image(self, img: Image.Image, xy):
+        alpha = img.getchannel("A")
+        self.mask.paste(alpha, (round(xy[0] + self.offset[0]), round(xy[1] + self.offset[1])), alpha)
+        self.empty = False
+
+    def apply(self, canvas: Image.Image) -> None:
+        if self.empty or self.color[3] == 0:
+            return
+        bbox = self.mask.getbbox()
+        if bbox is None:
+            return
+        # canvas shadowBlur is twice the Gaussian standard deviation; only the
+        # region around the shapes (plus three sigma) is blurred
+        sigma = self.blur / 2
+        pad = int(sigma * 3) + 2
+        box = (
+            max(0, bbox[0] - pad), max(0, bbox[1] - pad),
+            min(canvas.width, bbox[2] + pad), min(canvas.height, bbox[3] + pad),
+        )
+        mask = self.mask.crop(box)
+        if sigma > 6:
+            scale = int(sigma // 3)
+            small = mask.resize((max(1, mask.width // scale), max(1, mask.height // scale)), Image.Resampling.BOX)
+            mask = small.filter(ImageFilter.GaussianBlur(sigma / scale)).resize(mask.size, Image.Resampling.BILINEAR)
+        elif sigma > 0:
+            mask = mask.filter(ImageFilter.GaussianBlur(sigma))
+        if self.color[3] < 255:
+            mask = mask.point(lambda v, a=self.color[3]: v * a // 255)
+        layer = Image.new("RGBA", mask.size, self.color[:3] + (0,))
+        layer.putalpha(mask)
+        canvas.alpha_composite(layer, box[:2])
+
+
+def _text_width(font, text: str) -> float:
+    return font.getlength(text)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, xy, text: str, font, fill, anchor: str, kerning: float = 0.0) -> None:
+    """``fillText`` with textBaseline 'top'; kerning spaces glyphs like the canvas fallback."""
+    if not kerning:
+        draw.text(xy, text, font=font, fill=fill, anchor=anchor)
+        return
+    x, y = xy
+    # Letter spacing is applied left to right; shift the start for centre/right
+    total = sum(font.getlength(ch) + kerning for ch in text)
+    if anchor[0] == "m":
+        x -= total / 2
+    elif anchor[0] == "r":
+        x -= total
+    for ch in text:
+        draw.text((x, y), ch, font=font, fill=fill, anchor="la")
+        x += font.getlength(ch) + kerning
+
+
+def wrap_lines(text: str, font, max_width: float) -> list[str]:
+    """Greedy word wrap on regular spaces (non-breaking spaces never split).
+
+    Like the canvas code, empty text yields one empty line.
+    """
+    lines: list[str] = []
+    line = ""
+    for word in text.split(" "):
+        test = line + word + " "
+        if _text_width(font, test) > max_width and line != "":
+            lines.append(line.strip())
+            line = word + " "
+        else:
+            line = test
+    if line:
+        lines.append(line.strip())
+    return lines
+
+
+# --- Layout -------------------------------------------------------------------
+
+def _budget_logo_layout(spec: RenderSpec) -> dict:
+    width, x = 300, 30
+    y = 50 + 28 + 10 if spec.show_date else 50
+    height = asset_height("budget_logo.png", width) or width
+    return {"x": x, "y": y, "width": width, "height": height, "bottom": y + height}
+
+
+def _post_top_right_logo_layout(spec: RenderSpec, canvas_width: int) -> dict:
+    logo_width = 100
+    name = "turf_logo.png" if spec.turf_top_right else "mlinfo.png"
+    height = asset_height(name, logo_width) or 80
+    return {"x": canvas_width - logo_width - 50, "y": 50, "width": logo_width, "height": height}
+
+
+def _draw_budget_top_gradient(canvas: Image.Image, spec: RenderSpec) -> None:
+    content_bottom = 50 + 80
+    if spec.show_date:
+        content_bottom = max(content_bottom, 78)
+    if load_asset("budget_logo.png") is not None:
+        content_bottom = max(content_bottom, _budget_logo_layout(spec)["bottom"])
+    end_y = min(canvas.height, max(240, content_bottom + 60))
+    _gradient(canvas, 0, end_y, (0, 0, 0), [(0, 0.8), (0.55, 0.4), (1, 0)], "source-over")
+
+
+def _draw_budget_background(canvas: Image.Image) -> None:
+    bg = load_asset("budget_speech_bg.png", canvas.width)
+    if bg is None:
+        _fill(canvas, (0, 0, canvas.width, canvas.height), "#0b1a2e")
+        return
+    y = 0 if bg.height >= canvas.height else canvas.height - bg.height
+    canvas.alpha_composite(bg, (0, y))
+
+
+def _paste_asset(canvas: Image.Image, img: Image.Image, x: float, y: float, alpha: float = 1.0) -> None:
+    if alpha < 1.0:
+        img = img.copy()
+        img.putalpha(img.getchannel("A").point(lambda v: round(v * alpha)))
+    x, y = round(x), round(y)
+    if x >= 0 and y >= 0 and x + img.width <= canvas.width and y + img.height <= canvas.height:
+        canvas.alpha_composite(img, (x, y))
+    else:
+        layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        layer.paste(img, (x, y))
+        canvas.alpha_composite(layer)
+
+
+def render_image(spec: RenderSpec, image: Image.Image | None = None,
+                 font_dir: str | None = None) -> Image.Image:
+    """Render ``spec`` over the decoded ``image`` and return an RGBA canvas."""
+    width, height = spec.size
+    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    budget_post = spec.is_budget_post
+    fmt = spec.format
+
+    if budget_post:
+        _draw_budget_background(canvas)
+    if spec.image_bg:
+        _fill(canvas, (0, 0, width, height), spec.image_bg)
+
+    if image is not None:
+        zoom = spec.image_zoom / 100
+        w, h = _cover_contain(image.width, image.height, width, height, spec.image_fit)
+        w, h = w * zoom, h * zoom
+        x = (width - w) / 2 + spec.image_offset_x
+        y = (height - h) / 2 + spec.image_offset_y
+        if spec.image_fit == "contain":
+            _blurred_cover(canvas, image, zoom, spec.image_offset_x, spec.image_offset_y)
+        _draw_image(canvas, image, x, y, w, h)
+        if fmt == "website":
+            _fill(canvas, (0, 0, width, height), (0, 0, 0, 26))
+    else:
+        if not spec.image_bg and not budget_post:
+            _fill(canvas, (0, 0, width, height), "#4a5568")
+        if not budget_post:
+            return canvas
+
+    if budget_post:
+        _draw_budget_top_gradient(canvas, spec)
+
+    draw = ImageDraw.Draw(canvas)
+    if fmt in ("post", "story"):
+        _draw_text_block(canvas, draw, spec, font_dir)
+
+    _draw_logos(canvas, draw, spec, font_dir)
+    return canvas
+
+
+def _draw_text_block(canvas: Image.Image, draw: ImageDraw.ImageDraw, spec: RenderSpec,
+                     font_dir: str | None) -> None:
+    width, height = canvas.size
+    budget_post = spec.is_budget_post
+    family = spec.font_family
+    italic = family == "Noto Serif"
+    title_weight = "400" if italic else spec.title_weight
+    subtitle_weight = spec.subtitle_weight or SUBTITLE_WEIGHTS.get(family, "700")
+    if family == "Hanken Grotesk" and spec.budget and not spec.subtitle_weight:
+        subtitle_weight = "800"
+
+    title_raw = apply_french_typography_rules(spec.title.strip())
+    excerpt_raw = apply_french_typography_rules(spec.excerpt.strip())
+    subtitle_text = spec.subtitle.strip()
+    if spec.subtitle_all_caps:
+        subtitle_text = subtitle_text.upper()
+    subtitle_raw = apply_french_typography_rules(subtitle_text)
+
+    padding_left, padding_right, padding_top, padding_bottom = 20, 20, 15, 8
+    border_radius = 4
+    subtitle_to_title_gap = 12 + (8 if spec.title_bg and not spec.subtitle_bg else 0)
+    title_to_excerpt_gap = 25 if budget_post else 15
+    block_bottom_padding = 20 if budget_post else 50
+    max_text_width = width - 100
+
+    subtitle_font = load_font(family, subtitle_weight, spec.subtitle_size, italic, font_dir)
+    subtitle_lines = wrap_lines(subtitle_raw, subtitle_font, max_text_width)
+    if len(subtitle_lines) > 2:
+        subtitle_lines = subtitle_lines[:2]
+        if _text_width(subtitle_font, subtitle_lines[1] + "…") < max_text_width:
+            subtitle_lines[1] += "…"
+    subtitle_line_height = spec.subtitle_size * 1.05
+    total_subtitle_height = len(subtitle_lines) * subtitle_line_height
+
+    title_size = spec.title_size
+    title_font = load_font(family, title_weight, title_size, italic, font_dir)
+    title_lines = wrap_lines(title_raw, title_font, max_text_width)
+    while len(title_lines) > 8 and title_size > 36:
+        title_size -= 2
+        if title_size < spec.title_size_min:
+            title_size = spec.title_size_min
+            title_font = load_font(family, title_weight, title_size, italic, font_dir)
+            title_lines = wrap_lines(title_raw, title_font, max_text_width)
+            break
+        title_font = load_font(family, title_weight, title_size, italic, font_dir)
+        title_lines = wrap_lines(title_raw, title_font, max_text_width)
+    title_line_height = title_size * 1.05
+
+    excerpt_font = load_font(family, title_weight, spec.excerpt_size, italic, font_dir)
+    excerpt_lines = wrap_lines(excerpt_raw, excerpt_font, max_text_width)
+    excerpt_line_height = spec.excerpt_size * 1.2
+
+    block_height = 0.0
+    if subtitle_lines:
+        block_height += total_subtitle_height
+        if spec.subtitle_bg:
+            block_height += padding_top + padding_bottom
+        block_height += subtitle_to_title_gap
+    block_height += len(title_lines) * title_line_height
+    if excerpt_lines:
+        block_height += title_to_excerpt_gap + len(excerpt_lines) * excerpt_line_height
+    block_height += block_bottom_padding
+
+    if spec.align == "center":
+        pos_x, anchor = width / 2, "ma"
+    elif spec.align == "right":
+        pos_x, anchor = width - 50, "ra"
+    else:
+        pos_x, anchor = 50, "la"
+
+    extra_clearance = 0 if budget_post else min(30, max(0, (block_height - 100) * 0.12))
+    bottom_clearance = 5 + extra_clearance
+    if spec.turf_top_right:
+        top_right_bottom = 50 + 100
+    elif spec.turf_logo:
+        top_right_bottom = (170 if spec.show_date else 120) + 100
+    else:
+        top_right_bottom = 50 + 80
+    if spec.weekend_tag and spec.format == "post":
+        tag_h = asset_height("weekend_tag.png", 100)
+        if tag_h is not None:
+            logo = _post_top_right_logo_layout(spec, width)
+            top_right_bottom = max(top_right_bottom, logo["y"] + logo["height"] + 20 + tag_h)
+    min_y = top_right_bottom + 45
+    if budget_post:
+        min_y = max(min_y, _budget_logo_layout(spec)["bottom"] + 15)
+
+    bottom_padding = 60 + 50 + (30 if budget_post else 50)
+    max_y = height - bottom_padding - bottom_clearance - block_height
+    available = max(0, max_y - min_y)
+    t = (spec.vertical_position - 15) / (180 - 15)
+    pos_y = max(min_y, min(max_y, min_y + available * t))
+    if pos_y + block_height > height - bottom_padding - bottom_clearance:
+        pos_y = height - bottom_padding - bottom_clearance - block_height
+
+    if spec.gradient_color and spec.gradient_position != "off":
+        rgb = parse_color(spec.gradient_color)
+        if spec.gradient_position == "bottom":
+            _gradient(canvas, pos_y - 150, height, rgb, [(0, 0), (0.4, 0.4), (1, 0.8)], spec.blend_mode)
+        else:
+            _gradient(canvas, 0, pos_y + block_height + 150, rgb, [(0, 0.8), (0.6, 0.4), (1, 0)], spec.blend_mode)
+
+    if budget_post and (subtitle_lines or title_lines or excerpt_lines):
+        # multiply with rgba(0,0,0,0.6) == darken by 60%
+        _fill(canvas, (0, max(0, pos_y - 50), width, height), (0, 0, 0, 153))
+
+    shadow = _Shadow(canvas.size, "rgba(0,0,0,0.4)", 4, (2, 2))
+    text_ops = []
+    y = pos_y
+
+    if subtitle_lines:
+        subtitle_black = parse_color(spec.subtitle_color)[:3] == (0, 0, 0)
+        max_line = max(_text_width(subtitle_font, ln) for ln in subtitle_lines)
+        bg_pad_right = padding_left if spec.align == "right" else padding_right
+        bg_w = max_line + padding_left + bg_pad_right
+        bg_x = pos_x - (bg_w / 2 if spec.align == "center" else bg_w if spec.align == "right" else 0)
+        if spec.subtitle_bg:
+            bg_y = y - padding_top
+            bg_h = total_subtitle_height + padding_top + padding_bottom
+            draw.rounded_rectangle(
+                (bg_x, bg_y, bg_x + bg_w, bg_y + bg_h), radius=border_radius, fill=parse_color(spec.subtitle_bg)
+            )
+        text_x = pos_x
+        if spec.subtitle_bg and spec.align == "left":
+            text_x += padding_left
+        elif spec.subtitle_bg and spec.align == "right":
+            text_x -= padding_left
+        for i, line in enumerate(subtitle_lines):
+            xy = (text_x, y + i * subtitle_line_height)
+            if not subtitle_black:
+                shadow.text(xy, line, subtitle_font, anchor)
+            text_ops.append((xy, line, subtitle_font, spec.subtitle_color, 0.0))
+        y += total_subtitle_height
+        if spec.subtitle_bg:
+            y += padding_top + padding_bottom
+        y += subtitle_to_title_gap
+
+    if spec.title_bg and title_lines:
+        bg_pad_right = padding_left if spec.align == "right" else 8
+        for i, line in enumerate(title_lines):
+            bg_w = _text_width(title_font, line) + padding_left + bg_pad_right
+            bg_x = pos_x - (bg_w / 2 if spec.align == "center" else bg_w if spec.align == "right" else 0)
+            bg_y = y + i * title_line_height - padding_top
+            draw.rectangle(
+                (bg_x, bg_y, bg_x + bg_w, bg_y + title_line_height + padding_top + padding_bottom),
+                fill=parse_color(spec.title_bg),
+            )
+    title_x = pos_x
+    if spec.title_bg and spec.align == "left":
+        title_x += padding_left
+    elif spec.title_bg and spec.align == "right":
+        title_x -= padding_left
+    for i, line in enumerate(title_lines):
+        xy = (title_x, y + i * title_line_height)
+        if not spec.title_bg:
+            shadow.text(xy, line, title_font, anchor, spec.kerning)
+        text_ops.append((xy, line, title_font, spec.title_color, spec.kerning))
+    y += len(title_lines) * title_line_height
+
+    if excerpt_lines:
+        y += title_to_excerpt_gap
+        for i, line in enumerate(excerpt_lines):
+            xy = (pos_x, y + i * excerpt_line_height)
+            shadow.text(xy, line, excerpt_font, anchor)
+            text_ops.append((xy, line, excerpt_font, "#FFFFFF", 0.0))
+
+    # Shadows go under every glyph but above the subtitle/title backgrounds
+    shadow.apply(canvas)
+    draw = ImageDraw.Draw(canvas)
+    for xy, line, font, color, kerning in text_ops:
+        _draw_text(draw, xy, line, font, parse_color(color), anchor, kerning)
+
+
+def _draw_logos(canvas: Image.Image, draw: ImageDraw.ImageDraw, spec: RenderSpec,
+                font_dir: str | None) -> None:
+    width, height = canvas.size
+    fmt = spec.format
+
+    if spec.turf_top_right:
+        turf = load_asset("turf_logo.png", 100)
+        if turf is not None:
+            _paste_asset(canvas, turf, width - 100 - 50, 50)
+    elif spec.turf_logo:
+        turf = load_asset("turf_logo.png", None, 100)
+        if turf is not None:
+            _paste_asset(canvas, turf, width - turf.width - 50, 170 if spec.show_date else 120)
+
+    if fmt == "website":
+        logo = load_asset("mlinfo_lm.png", None, 49)
+        if logo is not None:
+            _paste_asset(canvas, logo, 50, height - 49 - 35)
+    else:
+        logo = load_asset("mlinfo_lm.png", None, 60)
+        if logo is not None:
+            x, y = (width - logo.width) / 2, height - 60 - 50
+            if fmt == "post":
+                shadow = _Shadow(canvas.size, "rgba(0,0,0,0.75)", 28, (0, 6))
+                shadow.image(logo, (x, y))
+                shadow.apply(canvas)
+            _paste_asset(canvas, logo, x, y)
+
+    draw = ImageDraw.Draw(canvas)
+    if spec.show_date and fmt in ("post", "story"):
+        font = load_font("Inter", 400, 24, False, font_dir)
+        text = spec.date_text or french_date_stamp()
+        shadow = _Shadow(canvas.size, "rgba(0,0,0,0.3)", 2, (1, 1))
+        shadow.text((50, 50), text, font, "la")
+        shadow.apply(canvas)
+        draw = ImageDraw.Draw(canvas)
+        _draw_text(draw, (50, 50), text, font, (255, 255, 255, 178), "la")
+
+    if spec.is_budget_post:
+        layout = _budget_logo_layout(spec)
+        budget_logo = load_asset("budget_logo.png", layout["width"])
+        if budget_logo is not None:
+            shadow = _Shadow(canvas.size, "rgba(0,0,0,0.35)", 8, (0, 3))
+            shadow.image(budget_logo, (layout["x"], layout["y"]))
+            shadow.apply(canvas)
+            _paste_asset(canvas, budget_logo, layout["x"], layout["y"])
+
+    if not spec.turf_top_right and fmt in ("post", "story"):
+        top_right = load_asset("mlinfo.png", 100)
+        if top_right is not None:
+            _paste_asset(canvas, top_right, width - 100 - 50, 50)
+
+    if spec.weekend_tag:
+        if fmt == "post":
+            logo = _post_top_right_logo_layout(spec, width)
+            tag = load_asset("weekend_tag.png", logo["width"])
+            if tag is not None:
+                _paste_asset(canvas, tag, logo["x"], logo["y"] + logo["height"] + 20)
+        elif fmt == "website":
+            tag = load_asset("weekend_tag.png", None, 49)
+            if tag is not None:
+                _paste_asset(canvas, tag, width - tag.width - 50, height - 49 - 35)
+
+
+def encode_image(canvas: Image.Image, output: str = "webp", quality: int = 100) -> bytes:
+    """Encode a rendered canvas as WebP, AVIF or progressive JPEG (flattened onto black)."""
+    pil_format = OUTPUT_FORMATS[output][0]
+    buf = io.BytesIO()
+    if pil_format == "JPEG":
+        flat = Image.new("RGB", canvas.size, (0, 0, 0))
+        flat.paste(canvas, mask=canvas.getchannel("A"))
+        flat.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif pil_format == "AVIF":
+        canvas.save(buf, "AVIF", quality=quality, speed=AVIF_SPEED)
+    else:
+        canvas.save(buf, "WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+def encode_to_budget(canvas: Image.Image, budget: int, outputs=("webp",),
+                     min_quality: int = DEFAULT_BUDGET_MIN_QUALITY,
+                     max_quality: int = 100) -> tuple[bytes, str, int]:
+    """Encode at the highest quality whose output fits in ``budget`` bytes.
+
+    Each of ``outputs`` is tried in order and the first that fits wins: it is
+    encoded at ``max_quality`` and, if too large, quality is binary-searched
+    down to ``min_quality`` (about log2(range) encodes). If no format fits,
+    the smallest encoding tried is returned. Returns ``(data, output, quality)``.
+    """
+    min_quality = min(min_quality, max_quality)
+    smallest: tuple[bytes, str, int] | None = None
+    for output in outputs:
+        if not output_available(output):
+            continue
+        data = encode_image(canvas, output, max_quality)
+        if len(data) <= budget:
+            return data, output, max_quality
+        if smallest is None or len(data) < len(smallest[0]):
+            smallest = (data, output, max_quality)
+        best = None
+        lo, hi = min_quality, max_quality - 1
+        while lo <= hi:
+            quality = (lo + hi) // 2
+            data = encode_image(canvas, output, quality)
+            if len(data) <= budget:
+                best = (data, output, quality)
+                lo = quality + 1
+            else:
+                hi = quality - 1
+                if smallest is None or len(data) < len(smallest[0]):
+                    smallest = (data, output, quality)
+        if best is not None:
+            return best
+    if smallest is None:
+        raise RenderError("None of the budget formats can be encoded here")
+    return smallest
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Per-process pool of ``max_workers`` spawn()ed renderers (created lazily).
+
+    Shared by bulk watermarking and carousel export so a web worker never
+    holds more than one set of render processes. A pool broken by a crashed
+    or OOM-killed child is replaced instead of failing every later submit.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and getattr(_pool, "_broken", False):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, max_workers),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=asset_registry.configure,
+                initargs=asset_registry.settings(),
+            )
+        return _pool
+
+
+def render_to_bytes(spec: RenderSpec, image: Image.Image | None = None,
+                    font_dir: str | None = None) -> tuple[bytes, str, str]:
+    """Render and encode; returns ``(data, mimetype, file extension)``."""
+    canvas = render_image(spec, image, font_dir)
+    quality = spec.quality if spec.quality is not None else DEFAULT_QUALITY[spec.format]
+    if spec.byte_budget:
+        data, output, _ = encode_to_budget(
+            canvas, spec.byte_budget, spec.budget_outputs, spec.budget_min_quality, quality
+        )
+    else:
+        output = spec.output
+        data = encode_image(canvas, output, quality)
+    _, mimetype, ext = OUTPUT_FORMATS[output]
+    return data, mimetype, ext
@@ -0,0 +1,194 @@
+// Bulk watermarking off the main thread. Loaded as a page script it defines
+// window.BulkWatermark; the same file is the worker script, so the drawing
+// code exists once. Each worker decodes a File with createImageBitmap, draws
+// on an OffscreenCanvas and posts back the encoded Blob, so the page only
+// ever holds compressed Blobs (never data-URL strings) and at most one
+// decoded photo per worker.
+(function (scope) {
+  'use strict';
+
+  const CENTER_LOGO_WIDTH_RATIO = 0.5;
+  const MAX_CENTER_LOGO_WIDTH = 800;
+  const CENTER_LOGO_ALPHA = 0.04;
+  const BOTTOM_LOGO_HEIGHT = 60;
+  const BOTTOM_LOGO_MARGIN = 50;
+  const BLUR_RADIUS = 30;
+  // The blurred fill is drawn at this fraction of the output size (radius
+  // scaled to match) and stretched back: same look, 1/16 of the pixels.
+  const BLUR_SCALE = 0.25;
+  // Each in-flight job holds a decoded photo plus its canvas (~60 MB for a
+  // 12 MP photo), so the pool stays small even on many-core machines.
+  const MAX_WORKERS = 4;
+
+  function makeCanvas(width, height) {
+    if (typeof OffscreenCanvas !== 'undefined') return new OffscreenCanvas(width, height);
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    return canvas;
+  }
+
+  function fitWithin(width, height, maxDimension) {
+    const scale = Math.min(1, maxDimension / width, maxDimension / height);
+    return { width: Math.max(1, Math.round(width * scale)), height: Math.max(1, Math.round(height * scale)) };
+  }
+
+  // Blurred cover fill, photo, 10% dim, faint centre logo, bottom-left logo.
+  function drawWatermarked(ctx, source, width, height, logos) {
+    const blurW = Math.max(1, Math.round(width * BLUR_SCALE));
+    const blurH = Math.max(1, Math.round(height * BLUR_SCALE));
+    const blur = makeCanvas(blurW, blurH);
+    const blurCtx = blur.getContext('2d');
+    const ratio = source.width / source.height;
+    const drawW = ratio < blurW / blurH ? blurW : blurH * ratio;
+    const drawH = ratio < blurW / blurH ? blurW / ratio : blurH;
+    blurCtx.filter = `blur(${BLUR_RADIUS * BLUR_SCALE}px)`;
+    blurCtx.drawImage(source, (blurW - drawW) / 2, (blurH - drawH) / 2, drawW, drawH);
+
+    ctx.imageSmoothingQuality = 'high';
+    ctx.drawImage(blur, 0, 0, width, height);
+    ctx.drawImage(source, 0, 0, width, height);
+    ctx.fillStyle = 'rgba(0,0,0,0.1)';
+    ctx.fillRect(0, 0, width, height);
+
+    if (logos.center) {
+      const logoW = Math.min(width * CENTER_LOGO_WIDTH_RATIO, MAX_CENTER_LOGO_WIDTH);
+      const logoH = logos.center.height * (logoW / logos.center.width);
+      ctx.globalAlpha = CENTER_LOGO_ALPHA;
+      ctx.drawImage(logos.center, (width - logoW) / 2, (height - logoH) / 2, logoW, logoH);
+      ctx.globalAlpha = 1;
+    }
+    if (logos.bottom) {
+      const logoW = logos.bottom.width * (BOTTOM_LOGO_HEIGHT / logos.bottom.height);
+      ctx.drawImage(logos.bottom, BOTTOM_LOGO_MARGIN, height - BOTTOM_LOGO_HEIGHT - BOTTOM_LOGO_MARGIN,
+        logoW, BOTTOM_LOGO_HEIGHT);
+    }
+  }
+
+  function decodeFile(file) {
+    if (typeof createImageBitmap !== 'undefined') return createImageBitmap(file);
+    return new Promise((resolve, reject) => {
+      const url = URL.createObjectURL(file);
+      const img = new Image();
+      img.onload = () => { URL.revokeObjectURL(url); resolve(img); };
+      img.onerror = () => { URL.revokeObjectURL(url); reject(new Error('Could not decode image')); };
+      img.src = url;
+    });
+  }
+
+  function encodeCanvas(canvas, type, quality) {
+    if (canvas.convertToBlob) return canvas.convertToBlob({ type, quality });
+    return new Promise((resolve, reject) => {
+      canvas.toBlob(blob => blob ? resolve(blob) : reject(new Error('Could not encode image')), type, quality);
+    });
+  }
+
+  // options: { maxDimension, type, quality }; resolves to { blob, width, height }.
+  async function watermarkFile(file, options, logos) {
+    const source = await decodeFile(file);
+    try {
+      const { width, height } = fitWithin(source.width, source.height, options.maxDimension);
+      const canvas = makeCanvas(width, height);
+      drawWatermarked(canvas.getContext('2d'), source, width, height, logos);
+      const blob = await encodeCanvas(canvas, options.type, options.quality);
+      return { blob, width, height };
+    } finally {
+      if (source.close) source.close();
+    }
+  }
+
+  function errorMessage(err) {
+    return String((err && err.message) || err);
+  }
+
+  if (typeof WorkerGlobalScope !== 'undefined' && scope instanceof WorkerGlobalScope) {
+    let logos = {};
+    scope.onmessage = async (event) => {
+      const message = event.data;
+      if (message.logos) {
+        logos = message.logos;
+        return;
+      }
+      try {
+        scope.postMessage({ id: message.id, ...(await watermarkFile(message.file, message.options, logos)) });
+      } catch (err) {
+        scope.postMessage({ id: message.id, error: errorMessage(err) });
+      }
+    };
+    return;
+  }
+
+  const SCRIPT_URL = document.currentScript && document.currentScript.src;
+
+  function workersSupported() {
+    if (!SCRIPT_URL || typeof Worker === 'undefined' || typeof createImageBitmap === 'undefined' ||
+        typeof OffscreenCanvas === 'undefined') {
+      return false;
+    }
+    try {
+      return !!new OffscreenCanvas(1, 1).getContext('2d');
+    } catch (err) {
+      return false;
+    }
+  }
+
+  function poolSize(jobs) {
+    const cores = navigator.hardwareConcurrency || 2;
+    return Math.max(1, Math.min(jobs, MAX_WORKERS, cores - 1));
+  }
+
+  function request(worker, id, file, options) {
+    return new Promise(resolve => {
+      worker.onmessage = (event) => resolve(event.data);
+      worker.onerror = (event) => {
+        event.preventDefault();
+        resolve({ id, error: event.message || 'Worker error' });
+      };
+      worker.postMessage({ id, file, options });
+    });
+  }
+
+  // Watermarks every file, calling onResult(index, { blob, width, height } or
+  // { error }) as each finishes. Each worker takes one file at a time, so at
+  // most poolSize() photos are decoded at once. Without worker/OffscreenCanvas
+  // support the files are processed one by one on the main thread.
+  async function run(files, options, logoImages, onResult) {
+    const logos = {};
+    for (const [key, img] of Object.entries(logoImages)) {
+      if (img) logos[key] = typeof createImageBitmap !== 'undefined' ? await createImageBitmap(img) : img;
+    }
+    const workers = [];
+    try {
+      if (workersSupported()) {
+        for (let i = 0; i < poolSize(files.length); i++) {
+          const worker = new Worker(SCRIPT_URL);
+          worker.postMessage({ logos });
+          workers.push(worker);
+        }
+      }
+      if (workers.length === 0) {
+        for (let i = 0; i < files.length; i++) {
+          try {
+            onResult(i, await watermarkFile(files[i], options, logos));
+          } catch (err) {
+            onResult(i, { error: errorMessage(err) });
+          }
+          await new Promise(resolve => setTimeout(resolve, 0));  // let the page repaint
+        }
+        return;
+      }
+      let next = 0;
+      await Promise.all(workers.map(async (worker) => {
+        while (next < files.length) {
+          const index = next++;
+          onResult(index, await request(worker, index, files[index], options));
+        }
+      }));
+    } finally {
+      workers.forEach(worker => worker.terminate());
+      Object.values(logos).forEach(logo => logo.close && logo.close());
+    }
+  }
+
+  scope.BulkWatermark = { run, poolSize, workersSupported };
+})(self);
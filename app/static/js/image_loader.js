@@ -0,0 +1,68 @@
+// Shared photo loader for the editors. An uploaded photo is decoded once,
+// already scaled down to what the tool can show (cover of its largest output
+// format, with headroom for zooming in), and only that copy is kept: draws
+// no longer rescale a full camera-resolution image and tab memory no longer
+// grows with camera resolution. EXIF orientation is applied.
+(function (global) {
+  'use strict';
+
+  // Extra resolution over "just covers the largest format" for the zoom sliders
+  const ZOOM_HEADROOM = 1.5;
+
+  // Largest scale (at most 1) a width x height photo needs to cover every
+  // target ({width, height}) at zoom 100, times headroom.
+  function coverScale(width, height, targets, headroom = ZOOM_HEADROOM) {
+    let scale = 0;
+    for (const target of targets) scale = Math.max(scale, target.width / width, target.height / height);
+    return Math.min(1, scale * headroom);
+  }
+
+  // <img> load: gives the oriented size from the header; pixels are only
+  // decoded if the element is drawn (the canvas fallback below)
+  function loadElement(url) {
+    return new Promise((resolve, reject) => {
+      const img = new Image();
+      img.onload = () => resolve(img);
+      img.onerror = () => reject(new Error('Could not load image'));
+      img.src = url;
+    });
+  }
+
+  // Resolves to an ImageBitmap, or a canvas where createImageBitmap cannot
+  // resize; both have width/height and can be passed to drawImage().
+  async function loadPhoto(file, targets, options = {}) {
+    const url = URL.createObjectURL(file);
+    try {
+      const img = await loadElement(url);
+      const scale = coverScale(img.naturalWidth, img.naturalHeight, targets, options.headroom);
+      const width = Math.max(1, Math.round(img.naturalWidth * scale));
+      const height = Math.max(1, Math.round(img.naturalHeight * scale));
+      if (typeof global.createImageBitmap === 'function') {
+        try {
+          const bitmap = await global.createImageBitmap(file, {
+            resizeWidth: width,
+            resizeHeight: height,
+            resizeQuality: 'high',
+            imageOrientation: 'from-image'
+          });
+          // Browsers that ignore the resize or orientation options fall through
+          if (bitmap.width === width && bitmap.height === height) return bitmap;
+          bitmap.close();
+        } catch (err) {
+          // Unsupported option value or format: draw the element instead
+        }
+      }
+      const canvas = document.createElement('canvas');
+      canvas.width = width;
+      canvas.height = height;
+      const ctx = canvas.getContext('2d');
+      ctx.imageSmoothingQuality = 'high';
+      ctx.drawImage(img, 0, 0, width, height);
+      return canvas;
+    } finally {
+      URL.revokeObjectURL(url);
+    }
+  }
+
+  global.ImageLoader = { loadPhoto, coverScale };
+})(window);
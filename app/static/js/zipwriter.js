@@ -0,0 +1,157 @@
+// Minimal ZIP writer for in-page downloads (stored entries, no compression:
+// the entries are already WebP/JPEG). Each entry is written as
+// local header + data + data descriptor, so the CRC is computed while the
+// Blob is read and entries can be appended as soon as they are encoded.
+// With a sink (a FileSystemWritableFileStream, see ZipWriter.open) every
+// part is written to disk as it is added; otherwise the archive is assembled
+// from Blob parts, which reference the entry data instead of copying it.
+(function (global) {
+  'use strict';
+
+  const CRC_TABLE = (() => {
+    const table = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+      table[n] = c >>> 0;
+    }
+    return table;
+  })();
+
+  function crc32(bytes, crc = 0) {
+    crc = ~crc >>> 0;
+    for (let i = 0; i < bytes.length; i++) crc = CRC_TABLE[(crc ^ bytes[i]) & 0xff] ^ (crc >>> 8);
+    return ~crc >>> 0;
+  }
+
+  function dosDateTime(date) {
+    const time = (date.getHours() << 11) | (date.getMinutes() << 5) | (date.getSeconds() >> 1);
+    const day = ((date.getFullYear() - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate();
+    return { time, day };
+  }
+
+  class ZipWriter {
+    constructor(sink = null, filename = 'archive.zip') {
+      this.sink = sink;
+      this.filename = filename;
+      this.parts = [];
+      this.entries = [];
+      this.offset = 0;
+      this.names = new Set();
+    }
+
+    // Writer for a download named `filename`: streamed into a file the user
+    // picks where the File System Access API exists, else Blob-backed.
+    // Must be called from a click handler; resolves to null if the user
+    // cancels the file picker.
+    static async open(filename) {
+      if (typeof global.showSaveFilePicker === 'function') {
+        try {
+          const handle = await global.showSaveFilePicker({
+            suggestedName: filename,
+            types: [{ description: 'ZIP archive', accept: { 'application/zip': ['.zip'] } }]
+          });
+          return new ZipWriter(await handle.createWritable(), filename);
+        } catch (err) {
+          if (err && err.name === 'AbortError') return null;
+          // SecurityError (no user activation, sandboxed frame): use a Blob
+        }
+      }
+      return new ZipWriter(null, filename);
+    }
+
+    async _push(part) {
+      if (this.sink) await this.sink.write(part);
+      else this.parts.push(part);
+      this.offset += part.size !== undefined ? part.size : part.byteLength;
+    }
+
+    // Append one file; duplicate names get a " (2)" suffix before the extension.
+    async add(name, blob, date = new Date()) {
+      let unique = name;
+      for (let i = 2; this.names.has(unique); i++) unique = name.replace(/(\.[^.]*)?$/, ` (${i})$1`);
+      this.names.add(unique);
+
+      const nameBytes = new TextEncoder().encode(unique);
+      const { time, day } = dosDateTime(date);
+      const header = new DataView(new ArrayBuffer(30));
+      header.setUint32(0, 0x04034b50, true);
+      header.setUint16(4, 20, true);
+      header.setUint16(6, 0x0808, true); // data descriptor follows, UTF-8 names
+      header.setUint16(8, 0, true); // stored
+      header.setUint16(10, time, true);
+      header.setUint16(12, day, true);
+      header.setUint16(26, nameBytes.length, true);
+      const localOffset = this.offset;
+      await this._push(header.buffer);
+      await this._push(nameBytes);
+
+      const crc = crc32(new Uint8Array(await blob.arrayBuffer()));
+      await this._push(blob);
+
+      const descriptor = new DataView(new ArrayBuffer(16));
+      descriptor.setUint32(0, 0x08074b50, true);
+      descriptor.setUint32(4, crc, true);
+      descriptor.setUint32(8, blob.size, true);
+      descriptor.setUint32(12, blob.size, true);
+      await this._push(descriptor.buffer);
+
+      this.entries.push({ nameBytes, crc, size: blob.size, time, day, offset: localOffset });
+    }
+
+    // Central directory + end record. Closes the sink and resolves to null,
+    // or resolves to the archive as one Blob.
+    async finish() {
+      const start = this.offset;
+      for (const e of this.entries) {
+        const central = new DataView(new ArrayBuffer(46));
+        central.setUint32(0, 0x02014b50, true);
+        central.setUint16(4, 20, true);
+        central.setUint16(6, 20, true);
+        central.setUint16(8, 0x0808, true);
+        central.setUint16(12, e.time, true);
+        central.setUint16(14, e.day, true);
+        central.setUint32(16, e.crc, true);
+        central.setUint32(20, e.size, true);
+        central.setUint32(24, e.size, true);
+        central.setUint16(28, e.nameBytes.length, true);
+        central.setUint32(42, e.offset, true);
+        await this._push(central.buffer);
+        await this._push(e.nameBytes);
+      }
+      const end = new DataView(new ArrayBuffer(22));
+      end.setUint32(0, 0x06054b50, true);
+      end.setUint16(8, this.entries.length, true);
+      end.setUint16(10, this.entries.length, true);
+      end.setUint32(12, this.offset - start, true);
+      end.setUint32(16, start, true);
+      await this._push(end.buffer);
+      if (this.sink) {
+        await this.sink.close();
+        return null;
+      }
+      return new Blob(this.parts, { type: 'application/zip' });
+    }
+
+    // finish(), then download a Blob-backed archive as `filename`.
+    async save() {
+      const blob = await this.finish();
+      if (!blob) return;
+      const link = document.createElement('a');
+      link.download = this.filename;
+      link.href = URL.createObjectURL(blob);
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      setTimeout(() => URL.revokeObjectURL(link.href), 10000);
+    }
+
+    // Give up on an unfinished archive (removes the partial streamed file).
+    async abort() {
+      if (this.sink) await this.sink.abort();
+      this.parts = [];
+    }
+  }
+
+  global.ZipWriter = ZipWriter;
+})(window);
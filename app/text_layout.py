@@ -0,0 +1,263 @@
+"""Cached text layout: line breaks and bounding boxes for editor text blocks.
+
+Wraps text the way ``wrapTitleLines``/``wrapExcerptLines`` do in
+``image_creator.html`` (greedy, regular spaces only, so the French
+non-breaking spaces added by ``apply_french_typography_rules`` never split),
+but without re-measuring whole lines for every word. Each font, keyed by
+(family, weight, size, italic), gets a ``FontMetrics`` object that caches
+glyph advances, kerning pairs and word widths; a line's width is then a sum
+of cached numbers:
+
+    width("a b") = word("a") + kern(a, " ") + advance(" ") + kern(" ", b) + word("b")
+
+Widths match ``ImageFont.getlength`` for text without ligatures (Pillow's
+basic layout applies only pair kerning).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.render import ALIGNMENTS, RenderError, apply_french_typography_rules, load_font, text_field
+
+WORD_CACHE_SIZE = 4096
+METRICS_CACHE_SIZE = 64
+MAX_TEXT_LENGTH = 2000
+
+
+class FontMetrics:
+    """Advance, kerning and word-width cache for one font."""
+
+    def __init__(self, font) -> None:
+        self.font = font
+        self.ascent, self.descent = font.getmetrics()
+        self._advances: dict[str, float] = {}
+        self._kerning: dict[str, float] = {}
+        self._words: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def advance(self, ch: str) -> float:
+        value = self._advances.get(ch)
+        if value is None:
+            value = self._advances[ch] = self.font.getlength(ch)
+        return value
+
+    def kern(self, left: str, right: str) -> float:
+        """Pair adjustment between two characters (usually 0 or negative)."""
+        pair = left + right
+        value = self._kerning.get(pair)
+        if value is None:
+            value = self._kerning[pair] = self.font.getlength(pair) - self.advance(left) - self.advance(right)
+        return value
+
+    def word_width(self, word: str) -> float:
+        with self._lock:
+            value = self._words.get(word)
+            if value is not None:
+                self._words.move_to_end(word)
+                return value
+        value = 0.0
+        prev = None
+        for ch in word:
+            value += self.advance(ch)
+            if prev is not None:
+                value += self.kern(prev, ch)
+            prev = ch
+        with self._lock:
+            self._words[word] = value
+            if len(self._words) > WORD_CACHE_SIZE:
+                self._words.popitem(last=False)
+        return value
+
+    def join_width(self, left: str, right: str) -> float:
+        """Width added by a space between two words (kerning on both sides)."""
+        if not left or not right:
+            return self.advance(" ") + (self.kern(left[-1], " ") if left else 0) + (
+                self.kern(" ", right[0]) if right else 0)
+        return self.kern(left[-1], " ") + self.advance(" ") + self.kern(" ", right[0])
+
+    def text_width(self, text: str, letter_spacing: float = 0.0) -> float:
+        """Width of ``text``; ``letter_spacing`` is added after every character."""
+        width = 0.0
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            width += self.word_width(word)
+            if i:
+                width += self.join_width(words[i - 1], word)
+        return width + letter_spacing * len(text)
+
+
+_metrics_lock = threading.Lock()
+_metrics: OrderedDict[tuple, FontMetrics] = OrderedDict()
+
+
+def get_metrics(family: str, weight: str | int, size: int, italic: bool = False,
+                font_dir: str | None = None) -> FontMetrics:
+    """Shared ``FontMetrics`` for (family, weight, size, italic)."""
+    key = (family, str(weight), int(size), bool(italic), font_dir)
+    with _metrics_lock:
+        metrics = _metrics.get(key)
+        if metrics is not None:
+            _metrics.move_to_end(key)
+            return metrics
+    metrics = FontMetrics(load_font(family, weight, size, italic, font_dir))
+    with _metrics_lock:
+        metrics = _metrics.setdefault(key, metrics)
+        while len(_metrics) > METRICS_CACHE_SIZE:
+            _metrics.popitem(last=False)
+    return metrics
+
+
+def wrap(text: str, metrics: FontMetrics, max_width: float, letter_spacing: float = 0.0) -> list[str]:
+    """Greedy wrap, identical in result to ``app.render.wrap_lines``.
+
+    Like the editor, each candidate line is measured with a trailing space.
+    """
+    lines: list[str] = []
+    words = text.split(" ")
+    line: list[str] = []
+    width = 0.0  # width of " ".join(line)
+    chars = 0
+    for word in words:
+        if line:
+            test_width = width + metrics.join_width(line[-1], word) + metrics.word_width(word)
+        else:
+            test_width = metrics.word_width(word)
+        test_chars = chars + (1 if line else 0) + len(word)
+        # trailing space of the candidate line, as in ``line + word + " "``
+        trailing = metrics.advance(" ") + (metrics.kern(word[-1], " ") if word else 0.0)
+        if test_width + trailing + letter_spacing * (test_chars + 1) > max_width and line:
+            lines.append(" ".join(line).strip())
+            line, width, chars = [word], metrics.word_width(word), len(word)
+        else:
+            line.append(word)
+            width, chars = test_width, test_chars
+    if line:
+        lines.append(" ".join(line).strip())
+    return lines
+
+
+@dataclass
+class TextBlock:
+    text: str
+    family: str = "Fira Sans"
+    weight: str = "800"
+    size: int = 120
+    max_width: float = 900
+    line_height: float = 1.05
+    letter_spacing: float = 0.0
+    italic: bool = False
+    align: str = "left"
+    x: float = 50
+    y: float = 0
+    french: bool = True
+    uppercase: bool = False
+    max_lines: int | None = None
+    min_size: int | None = None
+    step: int = 2
+
+
+def _as_number(value, default, lo, hi, cast=float):
+    try:
+        value = cast(float(value))
+    except (TypeError, ValueError):
+        return default
+    return max(lo, min(hi, value))
+
+
+def normalize_block(data: dict, families=None) -> TextBlock:
+    """Validate one JSON text block."""
+    if not isinstance(data, dict):
+        raise RenderError("Each text block must be a JSON object")
+    family = text_field(data, "family", "Fira Sans")
+    if families and family not in families:
+        raise RenderError(f"Font family {family!r} is not enabled")
+    align = str(data.get("align") or "left").lower()
+    if align not in ALIGNMENTS:
+        raise RenderError(f"Unknown align {align!r}")
+    size = _as_number(data.get("size"), 120, 4, 400, int)
+    max_lines = data.get("max_lines")
+    return TextBlock(
+        text=text_field(data, "text", "")[:MAX_TEXT_LENGTH],
+        family=family,
+        weight=text_field(data, "weight", "800", numbers=True),
+        size=size,
+        max_width=_as_number(data.get("max_width"), 900, 1, 10000),
+        line_height=_as_number(data.get("line_height"), 1.05, 0.5, 3.0),
+        letter_spacing=_as_number(data.get("letter_spacing"), 0.0, -20.0, 20.0),
+        italic=bool(data.get("italic")),
+        align=align,
+        x=_as_number(data.get("x"), 50, -10000, 10000),
+        y=_as_number(data.get("y"), 0, -10000, 10000),
+        french=bool(data.get("french", True)),
+        uppercase=bool(data.get("uppercase")),
+        max_lines=_as_number(max_lines, None, 1, 100, int) if max_lines is not None else None,
+        min_size=_as_number(data.get("min_size"), None, 4, size, int) if data.get("min_size") is not None else None,
+        step=_as_number(data.get("step"), 2, 1, 20, int),
+    )
+
+
+def layout_block(block: TextBlock, font_dir: str | None = None) -> dict:
+    """Lines and bounding boxes of a text block at ``(x, y)``.
+
+    ``y`` is the top of the first line (canvas ``textBaseline = 'top'``) and
+    ``x`` the anchor for ``align``. With ``max_lines`` the size shrinks by
+    ``step`` until the text fits or ``min_size`` is reached, like the title
+    auto-fit in ``drawCanvas``. Boxes use advance widths and the font's
+    ascent/descent: ``[left, top, right, bottom]``.
+    """
+    text = block.text.strip()
+    if block.uppercase:
+        text = text.upper()
+    if block.french:
+        text = apply_french_typography_rules(text)
+
+    size = block.size
+    min_size = block.min_size or size
+    while True:
+        metrics = get_metrics(block.family, block.weight, size, block.italic, font_dir)
+        lines = wrap(text, metrics, block.max_width, block.letter_spacing) if text else []
+        if block.max_lines is None or len(lines) <= block.max_lines or size <= min_size:
+            break
+        size = max(min_size, size - block.step)
+
+    line_height = size * block.line_height
+    result_lines = []
+    left_edge = right_edge = None
+    for i, line in enumerate(lines):
+        width = metrics.text_width(line, block.letter_spacing)
+        if block.align == "center":
+            x0 = block.x - width / 2
+        elif block.align == "right":
+            x0 = block.x - width
+        else:
+            x0 = block.x
+        top = block.y + i * line_height
+        box = [round(x0, 2), round(top, 2), round(x0 + width, 2), round(top + metrics.ascent + metrics.descent, 2)]
+        result_lines.append({"text": line, "width": round(width, 2), "bbox": box})
+        left_edge = box[0] if left_edge is None else min(left_edge, box[0])
+        right_edge = box[2] if right_edge is None else max(right_edge, box[2])
+
+    height = len(lines) * line_height
+    bbox = [left_edge, round(block.y, 2), right_edge, round(block.y + height, 2)] if lines else None
+    return {
+        "text": text,
+        "size": size,
+        "line_height": round(line_height, 2),
+        "ascent": metrics.ascent,
+        "descent": metrics.descent,
+        "height": round(height, 2),
+        "lines": result_lines,
+        "bbox": bbox,
+    }
+
+
+def layout_blocks(blocks: list[dict], families=None, font_dir: str | None = None) -> list[dict]:
+    """JSON API entry point: lay out several blocks (title, subtitle, excerpt) at once."""
+    if not isinstance(blocks, list) or not blocks:
+        raise RenderError("blocks must be a non-empty list")
+    if len(blocks) > 20:
+        raise RenderError("At most 20 text blocks per request")
+    return [layout_block(normalize_block(b, families), font_dir) for b in blocks]
@@ -0,0 +1,93 @@
+"""Stream ZIP archives to the client while they are being built.
+
+``zipfile`` writes to any non-seekable file object by emitting a data
+descriptor after each entry, so a sink that hands its bytes back after every
+write is enough to stream an archive chunk by chunk. Memory use is bounded by
+``CHUNK_SIZE`` no matter how many entries the archive has.
+"""
+
+from __future__ import annotations
+
+import io
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer drained after every zipfile write."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def unique_names(names: Iterable[str]) -> list[str]:
+    """Make archive member names unique: ``a.webp``, ``a-2.webp``, ..."""
+    seen: set[str] = set()
+    result = []
+    for name in names:
+        candidate, n = name, 1
+        while candidate in seen:
+            n += 1
+            candidate = f"{Path(name).stem}-{n}{Path(name).suffix}"
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def _pending(sink: _Sink) -> Iterator[bytes]:
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_zip(entries: Iterable[tuple[str, Path | bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``(name, path or bytes)`` entries, stored (no deflate).
+
+    WebP/JPEG/PDF payloads are already compressed, so entries are stored as is;
+    the archive costs little more than the files themselves and no CPU.
+    Entries are read lazily, so ``entries`` may be a generator.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for name, source in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            if isinstance(source, (bytes, bytearray)):
+                info.file_size = len(source)
+                with zf.open(info, "w", force_zip64=len(source) >= zipfile.ZIP64_LIMIT) as dest:
+                    dest.write(source)
+                yield from _pending(sink)
+                continue
+            size = Path(source).stat().st_size
+            info.file_size = size
+            with open(source, "rb") as src, zf.open(info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as dest:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    yield from _pending(sink)
+            yield from _pending(sink)
+    yield from _pending(sink)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Compare cold (rebuild) and warm (cached) budget catalog load times.
+
+A cold load starts with no catalog and no media index, so it rescans and
+rehashes images/standardized/ as a fresh worker process would.
+
+Usage: python benchmarks/bench_budget_catalog.py [--iterations 200] [--cold-iterations 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.budget_catalog import invalidate_budget_catalog, load_budget_catalog  # noqa: E402
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark budget catalog loading")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--cold-iterations", type=int, default=20, help="cold loads rehash every file")
+    args = parser.parse_args()
+
+    def cold() -> None:
+        invalidate_budget_catalog(media=True)
+        load_budget_catalog()
+
+    load_budget_catalog()
+    cold_s = _time_per_call(cold, args.cold_iterations)
+    load_budget_catalog()
+    warm_s = _time_per_call(load_budget_catalog, args.iterations)
+
+    themes = load_budget_catalog()
+    alternates = sum(len(t["alternates"]) for t in themes)
+    print(f"Catalog: {len(themes)} themes, {alternates} alternates")
+    print(f"  cold: {cold_s * 1000:8.3f} ms/load")
+    print(f"  warm: {warm_s * 1000:8.3f} ms/load")
+    if warm_s > 0:
+        print(f"  speedup: {cold_s / warm_s:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
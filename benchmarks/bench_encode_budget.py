@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Byte-budget encoding: encode time vs. achieved size, per output format.
+
+Renders each format once from a photo (a synthetic, noisy one unless --image
+is given), then for every encoder Pillow has (WebP, AVIF, progressive JPEG)
+compares:
+
+  fixed    one encode at the editor's old quality (100 post/story, 80 website)
+  budget   app.render.encode_to_budget with only that format, using the
+           image_creator default ``layout.byte_budgets`` (off by default, so
+           EXAMPLE_BUDGETS stand in for formats it leaves unset)
+
+and finally the configured ``budget_formats`` order, as the Download button
+and ``output: "auto"`` use it.
+
+Usage: python benchmarks/bench_encode_budget.py [--image photo.jpg] [--budget website=150000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from app.admin.routes import get_default_template_config  # noqa: E402
+from app.render import (  # noqa: E402
+    DEFAULT_QUALITY,
+    FORMATS,
+    OUTPUT_FORMATS,
+    encode_image,
+    encode_to_budget,
+    load_source_image,
+    normalize_render_spec,
+    output_available,
+    render_image,
+)
+
+# Suggested starting points for layout.byte_budgets, in bytes
+EXAMPLE_BUDGETS = {"post": 500000, "story": 700000, "website": 200000}
+
+SPEC = {
+    "title": "Le budget de l'État pour la santé et l'éducation à l'horizon 2027",
+    "subtitle": "Budget 2026-2027",
+    "excerpt": "Un extrait du discours prononcé à l'Assemblée nationale",
+    "date_text": "LEMAURICIEN.COM  › Jeudi 15 Janvier 2026",
+}
+
+
+def _photo() -> bytes:
+    # Smooth shapes plus sensor-like noise, so sizes resemble a real photo
+    base = Image.effect_mandelbrot((2400, 1600), (-2.0, -1.2, 1.0, 1.2), 64).convert("RGB")
+    noise = Image.effect_noise((2400, 1600), 24).convert("RGB")
+    img = Image.blend(base, noise, 0.25)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark byte-budget encoding")
+    parser.add_argument("--image", help="photo to render (default: synthetic)")
+    parser.add_argument("--budget", action="append", default=[], metavar="FORMAT=BYTES",
+                        help="override a format's budget, e.g. website=150000")
+    args = parser.parse_args()
+
+    layout = get_default_template_config("image_creator")["layout"]
+    budgets = dict(EXAMPLE_BUDGETS, **(layout.get("byte_budgets") or {}))
+    for item in args.budget:
+        fmt, _, value = item.partition("=")
+        budgets[fmt] = int(value)
+    outputs = [o for o in OUTPUT_FORMATS if output_available(o)]
+    order = [o for o in layout["budget_formats"] if output_available(o)]
+    min_quality = layout["budget_min_quality"]
+    photo = Path(args.image).read_bytes() if args.image else _photo()
+    print(f"encoders: {', '.join(outputs)}; budget order: {', '.join(order)}; min quality {min_quality}")
+
+    for fmt in FORMATS:
+        budget = budgets.get(fmt)
+        if not budget:
+            continue
+        spec = normalize_render_spec(dict(SPEC, format=fmt))
+        canvas = render_image(spec, load_source_image(photo, spec.size))
+        max_quality = DEFAULT_QUALITY[fmt]
+        print(f"\n{fmt} {canvas.width}x{canvas.height}, budget {budget / 1000:.0f} KB")
+        print(f"  {'output':8s} {'fixed KB':>9s} {'ms':>7s}   {'budget KB':>9s} {'quality':>7s} {'ms':>7s}")
+        for output in outputs:
+            fixed, fixed_ms = _timed(lambda: encode_image(canvas, output, max_quality))
+            (data, _, quality), ms = _timed(
+                lambda: encode_to_budget(canvas, budget, (output,), min_quality, max_quality)
+            )
+            fits = "" if len(data) <= budget else "  over budget"
+            print(f"  {output:8s} {len(fixed) / 1000:9.1f} {fixed_ms:7.0f}   "
+                  f"{len(data) / 1000:9.1f} {quality:7d} {ms:7.0f}{fits}")
+        (data, output, quality), ms = _timed(
+            lambda: encode_to_budget(canvas, budget, order, min_quality, max_quality)
+        )
+        print(f"  configured order -> {output} q{quality}, {len(data) / 1000:.1f} KB in {ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
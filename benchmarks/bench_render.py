@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Throughput of the server-side image_creator renderer (renders/sec/core).
+
+Renders a synthetic photo into each format with a typical title, subtitle and
+excerpt. The first render per process warms the asset and font caches and is
+not timed. With --processes N the same work is spread over N worker processes
+to show how throughput scales across cores.
+
+Usage: python benchmarks/bench_render.py [--iterations 20] [--processes 1] [--no-encode]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from app.render import (  # noqa: E402
+    FORMATS,
+    load_source_image,
+    normalize_render_spec,
+    render_image,
+    render_to_bytes,
+)
+
+SPEC = {
+    "title": "Le budget de l'État pour la santé et l'éducation à l'horizon 2027",
+    "subtitle": "Budget 2026-2027",
+    "excerpt": "Un extrait du discours prononcé à l'Assemblée nationale",
+    "date_text": "LEMAURICIEN.COM  › Jeudi 15 Janvier 2026",
+    "weekend_tag": True,
+}
+
+
+def _photo() -> bytes:
+    img = Image.effect_mandelbrot((2400, 1600), (-2.0, -1.2, 1.0, 1.2), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _run(fmt: str, iterations: int, encode: bool, photo: bytes) -> tuple[str, float]:
+    spec = normalize_render_spec(dict(SPEC, format=fmt))
+    image = load_source_image(photo, spec.size)
+    render = render_to_bytes if encode else render_image
+    render(spec, image)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render(spec, image)
+    return fmt, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark server-side rendering")
+    parser.add_argument("--iterations", type=int, default=20, help="renders per format per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--no-encode", action="store_true", help="time compositing only, skip WebP encoding")
+    args = parser.parse_args()
+
+    photo = _photo()
+    encode = not args.no_encode
+    print(f"CPU cores: {os.cpu_count()}  processes: {args.processes}  encode: {encode}")
+    for fmt in FORMATS:
+        if args.processes <= 1:
+            _, elapsed = _run(fmt, args.iterations, encode, photo)
+            wall = elapsed
+        else:
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                start = time.perf_counter()
+                futures = [pool.submit(_run, fmt, args.iterations, encode, photo) for _ in range(args.processes)]
+                elapsed = sum(f.result()[1] for f in futures)
+                wall = time.perf_counter() - start
+        total = args.iterations * max(1, args.processes)
+        per_core = total / elapsed
+        print(
+            f"  {fmt:8s} {elapsed / total * 1000:8.1f} ms/render  "
+            f"{per_core:6.1f} renders/s/core  {total / wall:6.1f} renders/s wall"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Peak-memory regression check for budget image standardization.
+
+Writes a large synthetic JPEG original, standardizes it in a fresh
+process and fails (exit 1) if peak RSS growth exceeds the bound. This is
+the pre-release check for standardization memory (see README, "Pre-release
+Checks"); the repository has no test suite to host it.
+
+Usage: python benchmarks/bench_standardize_memory.py [--megapixels 24] [--max-mb 96]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SETUP_SCRIPT = Path(__file__).resolve().parent.parent / "budget 2026-2027" / "scripts" / "setup_database.py"
+
+
+def _load_setup_module():
+    sys.path.insert(0, str(SETUP_SCRIPT.parent))
+    spec = importlib.util.spec_from_file_location("setup_database", SETUP_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _current_rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _child(source: str, dest: str) -> None:
+    setup = _load_setup_module()
+    baseline_kb = _current_rss_kb()
+    started = time.perf_counter()
+    meta = setup.standardize_image(Path(source), Path(dest), 1920, 1080, 85)
+    meta["baseline_rss_kb"] = baseline_kb
+    meta["seconds"] = time.perf_counter() - started
+    print(json.dumps(meta))
+
+
+def _write_original(path: Path, megapixels: float) -> tuple[int, int]:
+    from PIL import Image
+
+    height = int((megapixels * 1_000_000 * 3 / 4) ** 0.5)
+    width = height * 4 // 3
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(
+        path, "JPEG", quality=90
+    )
+    return width, height
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bound peak RSS of standardize_image()")
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--max-mb", type=float, default=96, help="Allowed peak RSS growth over baseline")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "original.jpg"
+        width, height = _write_original(source, args.megapixels)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(source), str(Path(tmp) / "out.jpg")],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    meta = json.loads(out.stdout.strip().splitlines()[-1])
+    growth_mb = (meta["peak_rss_kb"] - meta["baseline_rss_kb"]) / 1024
+    print(f"Original: {width}x{height} ({args.megapixels:g} MP)")
+    print(f"  decoded at {meta['decoded_width']}x{meta['decoded_height']} in {meta['seconds']:.2f}s")
+    print(f"  peak RSS growth: {growth_mb:.1f} MB (bound {args.max_mb:g} MB)")
+    if growth_mb > args.max_mb:
+        print("FAIL: standardize_image() exceeded the memory bound")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
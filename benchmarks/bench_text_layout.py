@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cached text layout vs. re-measuring every candidate line, per font family.
+
+Replays typing a 400-character French title one keystroke at a time and wraps
+the text after each keystroke, as the editors do. For every family in the
+``available_families`` of the image_creator, carousel_creator and
+quote_creator template configs it compares:
+
+  measure   app.render.wrap_lines (one getlength() per candidate line)
+  cold      app.text_layout.wrap with empty glyph/word caches
+  warm      app.text_layout.wrap once the caches are filled
+
+Families without a TTF in the font folder fall back to DejaVu Sans, so the
+numbers are only comparable between families that are installed.
+
+Usage: python benchmarks/bench_text_layout.py [--size 120] [--width 900] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.admin.routes import get_default_template_config  # noqa: E402
+from app.render import apply_french_typography_rules, load_font, wrap_lines  # noqa: E402
+from app.text_layout import FontMetrics, get_metrics, wrap  # noqa: E402
+
+TITLE = (
+    "Le budget de l'État pour la santé et l'éducation : quelles priorités pour 2026-2027 ? "
+    "Le ministre des Finances a présenté jeudi à l'Assemblée nationale un « budget de "
+    "transition » qui mise sur l'investissement public, la réforme des pensions et la "
+    "lutte contre la vie chère ; l'opposition dénonce un texte « sans vision » pour le pays."
+)
+TOOLS = ("image_creator", "carousel_creator", "quote_creator")
+
+
+def _families() -> list[str]:
+    families: list[str] = []
+    for tool in TOOLS:
+        for family in (get_default_template_config(tool).get("fonts") or {}).get("available_families") or []:
+            if family not in families:
+                families.append(family)
+    return families
+
+
+def _keystrokes() -> list[str]:
+    return [apply_french_typography_rules(TITLE[:i]) for i in range(1, len(TITLE) + 1)]
+
+
+def _time(fn, texts) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return (time.perf_counter() - start) / len(texts) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the cached text layout engine")
+    parser.add_argument("--size", type=int, default=120)
+    parser.add_argument("--weight", default="800")
+    parser.add_argument("--width", type=float, default=900)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--font-dir", default=None)
+    args = parser.parse_args()
+
+    texts = _keystrokes()
+    print(f"{len(texts)} keystrokes, {args.size}px, weight {args.weight}, max width {args.width:g}px")
+    print(f"  {'family':18s} {'measure':>9s} {'cold':>9s} {'warm':>9s} {'speedup':>8s}  (ms per keystroke)")
+    for family in _families():
+        font = load_font(family, args.weight, args.size, False, args.font_dir)
+        measure = min(_time(lambda t: wrap_lines(t, font, args.width), texts) for _ in range(args.repeat))
+        cold = min(
+            _time(lambda t, m=FontMetrics(font): wrap(t, m, args.width), texts) for _ in range(args.repeat)
+        )
+        metrics = get_metrics(family, args.weight, args.size, False, args.font_dir)
+        wrap(TITLE, metrics, args.width)
+        warm = min(_time(lambda t: wrap(t, metrics, args.width), texts) for _ in range(args.repeat))
+        assert all(wrap(t, metrics, args.width) == wrap_lines(t, font, args.width) for t in texts[::25])
+        print(f"  {family:18s} {measure:9.3f} {cold:9.3f} {warm:9.3f} {measure / warm:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
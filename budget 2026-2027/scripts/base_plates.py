@@ -0,0 +1,120 @@
+"""Pre-composited base plates: the text-independent layers of a budget image.
+
+In budget mode the Image Creator draws, for every edit, the same layers
+under the text: ``drawBudgetSpeechBackground`` (post), the theme photo
+cover-fitted at zoom 100, the 10% dim (website) and ``drawBudgetTopGradient``
+(post). They only depend on the theme image and the output format, so they
+are rendered once here, per format, and the editor draws its text over the
+plate.
+
+Plates assume the editor defaults: cover fit, no zoom or offset, no overlay
+image, and (for the post gradient) the date stamp shown. The budget overlay
+frame is not included: its position follows the text panel.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from PIL import Image
+
+ASSETS_DIR = Path(__file__).resolve().parents[2] / "app" / "static" / "assets"
+SPEECH_BG = ASSETS_DIR / "budget_speech_bg.png"
+BUDGET_LOGO = ASSETS_DIR / "budget_logo.png"
+
+# Editor canvas sizes (setCanvasSize); "post" is the editor's "social" format
+PLATE_FORMATS = {
+    "post": (1000, 1250),
+    "story": (1080, 1920),
+    "website": (1000, 500),
+}
+PLATE_QUALITY = 90
+# Part of every plate key: bump after changing render_plate()
+PLATE_VERSION = 1
+
+SPEECH_BG_FILL = (11, 26, 46, 255)  # #0b1a2e when the background asset is missing
+WEBSITE_DIM = (0, 0, 0, 26)  # rgba(0,0,0,0.1)
+TOP_GRADIENT_STOPS = [(0, 0.8), (0.55, 0.4), (1, 0)]
+
+
+def assets_signature() -> str:
+    """Hash of the assets a plate depends on (background, and the logo sizing the gradient)."""
+    digest = hashlib.sha256(f"v{PLATE_VERSION}:".encode())
+    for path in (SPEECH_BG, BUDGET_LOGO):
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"-")
+    return digest.hexdigest()[:16]
+
+
+def _cover(img: Image.Image, width: int, height: int) -> Image.Image:
+    """Scale to cover ``width`` x ``height`` and crop the centre (drawImage in cover mode)."""
+    scale = max(width / img.width, height / img.height)
+    w, h = img.width * scale, img.height * scale
+    left, top = (w - width) / 2 / scale, (h - height) / 2 / scale
+    box = (left, top, left + width / scale, top + height / scale)
+    return img.resize((width, height), Image.Resampling.BILINEAR, box=box, reducing_gap=2.0)
+
+
+def _speech_background(canvas: Image.Image) -> None:
+    try:
+        with Image.open(SPEECH_BG) as src:
+            bg = src.convert("RGBA")
+    except OSError:
+        canvas.alpha_composite(Image.new("RGBA", canvas.size, SPEECH_BG_FILL))
+        return
+    height = round(bg.height * canvas.width / bg.width)
+    bg = bg.resize((canvas.width, height), Image.Resampling.LANCZOS)
+    canvas.alpha_composite(bg, (0, 0 if height >= canvas.height else canvas.height - height))
+
+
+def _top_gradient(canvas: Image.Image) -> None:
+    """``drawBudgetTopGradient`` with the date stamp shown (logo at y = 88)."""
+    content_bottom = 50 + 80
+    try:
+        with Image.open(BUDGET_LOGO) as logo:
+            content_bottom = max(content_bottom, 88 + logo.height * 300 / logo.width)
+    except OSError:
+        pass
+    end_y = min(canvas.height, round(max(240, content_bottom + 60)))
+    column = []
+    for i in range(end_y):
+        t = i / max(1, end_y - 1)
+        for (t0, a0), (t1, a1) in zip(TOP_GRADIENT_STOPS, TOP_GRADIENT_STOPS[1:]):
+            if t <= t1:
+                column.append(round((a0 + (a1 - a0) * (t - t0) / (t1 - t0)) * 255))
+                break
+    mask = Image.new("L", (1, end_y))
+    mask.putdata(column)
+    layer = Image.new("RGBA", (canvas.width, end_y), (0, 0, 0, 255))
+    layer.putalpha(mask.resize((canvas.width, end_y), Image.Resampling.NEAREST))
+    canvas.alpha_composite(layer)
+
+
+def render_plate(photo: Image.Image, fmt: str) -> Image.Image:
+    """Background, photo, dim and gradient for ``fmt``, as an RGB image."""
+    width, height = PLATE_FORMATS[fmt]
+    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    if fmt == "post":
+        _speech_background(canvas)
+    canvas.alpha_composite(_cover(photo.convert("RGBA"), width, height))
+    if fmt == "website":
+        canvas.alpha_composite(Image.new("RGBA", canvas.size, WEBSITE_DIM))
+    if fmt == "post":
+        _top_gradient(canvas)
+    return canvas.convert("RGB")
+
+
+def render_plates(source: Path, dests: dict[str, Path], quality: int = PLATE_QUALITY) -> dict[str, dict]:
+    """Decode ``source`` once and write one JPEG plate per format in ``dests``."""
+    with Image.open(source) as img:
+        photo = img.convert("RGB")
+    meta = {}
+    for fmt, dest in dests.items():
+        plate = render_plate(photo, fmt)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        plate.save(dest, "JPEG", quality=quality, optimize=True, progressive=True)
+        meta[fmt] = {"width": plate.width, "height": plate.height, "file_size_bytes": dest.stat().st_size}
+    return meta
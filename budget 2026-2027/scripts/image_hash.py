@@ -0,0 +1,118 @@
+"""Perceptual hashing and near-duplicate lookup for budget originals."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Generic, Iterator, TypeVar
+
+from PIL import Image
+
+T = TypeVar("T")
+
+HASH_SIZE = 8
+# Hamming distance (out of 64 bits) at or below which two images are near-duplicates
+DEFAULT_THRESHOLD = 6
+
+
+def dhash(source: Path, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: compare adjacent pixels of a tiny grayscale thumbnail.
+
+    Robust to resizing and recompression, which is what distinguishes
+    ``images (1).jpeg`` from ``images.jpeg`` in the originals folder.
+    """
+    with Image.open(source) as img:
+        img.draft("L", (hash_size * 8, hash_size * 8))
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+        pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def hash_to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hash_from_hex(text: str) -> int:
+    return int(text, 16)
+
+
+class BKTree(Generic[T]):
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance.
+
+    Radius queries only descend into children whose edge distance lies in
+    ``[d - radius, d + radius]``, so lookups touch a small fraction of the
+    tree for tight thresholds.
+    """
+
+    def __init__(self) -> None:
+        self._root: list | None = None  # [hash, items, {distance: child}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item: T) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def find(self, value: int, radius: int) -> Iterator[tuple[int, T]]:
+        """Yield ``(distance, item)`` for every entry within ``radius``."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                for item in node[1]:
+                    yield distance, item
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+
+
+def group_duplicates(hashes: dict[str, int], threshold: int = DEFAULT_THRESHOLD) -> list[list[str]]:
+    """Cluster keys whose hashes are within ``threshold`` of each other."""
+    tree: BKTree[str] = BKTree()
+    for key, value in hashes.items():
+        tree.add(value, key)
+
+    parent = {key: key for key in hashes}
+
+    def root(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, value in hashes.items():
+        for _, other in tree.find(value, threshold):
+            a, b = root(key), root(other)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    groups: dict[str, list[str]] = {}
+    for key in hashes:
+        groups.setdefault(root(key), []).append(key)
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: g[0])
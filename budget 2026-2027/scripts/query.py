@@ -5,6 +5,8 @@ import argparse
 import sqlite3
 from pathlib import Path
 
+from image_hash import DEFAULT_THRESHOLD, group_duplicates, hamming, hash_from_hex
+
 DB = Path(__file__).resolve().parent.parent / "database" / "budget_2026_2027.db"
 
 
@@ -51,11 +53,71 @@ def show_theme(conn: sqlite3.Connection, slug: str) -> None:
         print(f"         → {img[2]} ({size})")
 
 
+def search_themes(conn: sqlite3.Connection, text: str) -> None:
+    terms = [t for t in "".join(c if c.isalnum() else " " for c in text).split() if t]
+    if not terms:
+        print("Empty search")
+        return
+    try:
+        rows = conn.execute(
+            """
+            SELECT t.id, t.title_fr, t.status
+            FROM themes_fts f JOIN themes t ON t.id = f.rowid
+            WHERE themes_fts MATCH ?
+            ORDER BY f.rank
+            """,
+            (" ".join(f'"{t}"*' for t in terms),),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        print("Search index missing. Run: python scripts/setup_database.py")
+        return
+    for row in rows:
+        print(f"{row[0]:2d}. [{row[2]:12s}] {row[1]}")
+    if not rows:
+        print("No match")
+
+
+def report_duplicates(conn: sqlite3.Connection, threshold: int) -> None:
+    try:
+        rows = conn.execute("SELECT original_path, dhash FROM original_hashes").fetchall()
+    except sqlite3.OperationalError:
+        print("Hash index missing. Run: python scripts/setup_database.py")
+        return
+    hashes = {row[0]: hash_from_hex(row[1]) for row in rows}
+
+    usage: dict[str, list[str]] = {}
+    for path, slug, role in conn.execute(
+        """
+        SELECT i.original_path, t.slug, i.role
+        FROM images i JOIN themes t ON t.id = i.theme_id
+        """
+    ):
+        usage.setdefault(path, []).append(f"{slug} ({role})")
+
+    groups = group_duplicates(hashes, threshold)
+    print(f"{len(hashes)} originals, {len(groups)} near-duplicate groups (threshold {threshold})\n")
+    for number, group in enumerate(groups, 1):
+        anchor = hashes[group[0]]
+        print(f"Group {number}:")
+        for path in group:
+            used = ", ".join(usage.get(path, [])) or "unused"
+            print(f"   d={hamming(anchor, hashes[path]):2d}  {path}")
+            print(f"         → {used}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Query budget speech database")
     parser.add_argument("--list", action="store_true", help="List all themes")
     parser.add_argument("--missing", action="store_true", help="List themes without images")
     parser.add_argument("--theme", help="Show details for a theme slug")
+    parser.add_argument("--search", help="Full-text search on titles and slugs")
+    parser.add_argument("--duplicates", action="store_true", help="Report near-duplicate originals")
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=DEFAULT_THRESHOLD,
+        help=f"Max perceptual hash distance for --duplicates (default: {DEFAULT_THRESHOLD})",
+    )
     args = parser.parse_args()
 
     if not DB.exists():
@@ -66,6 +128,10 @@ def main() -> None:
     try:
         if args.theme:
             show_theme(conn, args.theme)
+        elif args.search:
+            search_themes(conn, args.search)
+        elif args.duplicates:
+            report_duplicates(conn, args.threshold)
         elif args.missing:
             list_themes(conn, status="missing")
         else:
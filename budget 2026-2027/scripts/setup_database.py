@@ -3,19 +3,44 @@
 
 from __future__ import annotations
 
+import argparse
+import base64
+import hashlib
+import io
 import json
+import os
 import shutil
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
-from PIL import Image
+from PIL import Image, ImageOps
+
+from base_plates import PLATE_FORMATS, PLATE_QUALITY, assets_signature, render_plates
+from image_hash import DEFAULT_THRESHOLD, dhash, group_duplicates, hamming, hash_from_hex, hash_to_hex
 
 ROOT = Path(__file__).resolve().parent.parent
 DATA_FILE = ROOT / "data" / "themes.json"
 ORIGINALS_DIR = ROOT / "images" / "originals"
 STANDARDIZED_DIR = ROOT / "images" / "standardized"
 DB_PATH = ROOT / "database" / "budget_2026_2027.db"
+MANIFEST_PATH = ROOT / "data" / "standardize-manifest.json"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif"}
+PLACEHOLDER_WIDTH = 32
+PLACEHOLDER_QUALITY = 40
+SPRITE_PATH = STANDARDIZED_DIR / "sprites" / "picker.webp"
+SPRITE_MAP_PATH = ROOT / "data" / "picker-sprite.json"
+SPRITE_TILE = (160, 90)
+SPRITE_COLUMNS = 10
+SPRITE_QUALITY = 70
+PLATES_DIR = STANDARDIZED_DIR / "plates"
+PLATES_MANIFEST_PATH = ROOT / "data" / "base-plates.json"
+# Part of every manifest key: bump to force re-encoding after changing standardize_image()
+STANDARDIZE_VERSION = 2
 
 
 def load_config() -> dict:
@@ -23,6 +48,63 @@ def load_config() -> dict:
         return json.load(f)
 
 
+def _reset_peak_rss() -> None:
+    """Reset the kernel's RSS high-water mark for this process (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KB, if the platform reports it."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        return None
+
+
+def _center_crop_box(src_w: int, src_h: int, target_ratio: float) -> tuple[int, int, int, int]:
+    if src_w / src_h > target_ratio:
+        new_w = int(src_h * target_ratio)
+        left = (src_w - new_w) // 2
+        return (left, 0, left + new_w, src_h)
+    new_h = int(src_w / target_ratio)
+    top = (src_h - new_h) // 2
+    return (0, top, src_w, top + new_h)
+
+
+def image_placeholder(img: Image.Image) -> dict:
+    """Tiny base64 WebP preview (LQIP) and dominant color for an RGB image."""
+    height = max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))
+    small = img.resize((PLACEHOLDER_WIDTH, height), Image.Resampling.BOX, reducing_gap=2.0)
+    buffer = io.BytesIO()
+    small.save(buffer, "WEBP", quality=PLACEHOLDER_QUALITY, method=6)
+    palette = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette.getcolors())
+    r, g, b = palette.getpalette()[index * 3:index * 3 + 3]
+    return {
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+        "dominant_color": f"#{r:02x}{g:02x}{b:02x}",
+    }
+
+
+def placeholder_for_file(path: Path) -> dict:
+    with Image.open(path) as img:
+        img.draft("RGB", (PLACEHOLDER_WIDTH * 8, PLACEHOLDER_WIDTH * 8))
+        return image_placeholder(img.convert("RGB"))
+
+
 def standardize_image(
     source: Path,
     dest: Path,
@@ -30,33 +112,58 @@ def standardize_image(
     height: int,
     quality: int,
 ) -> dict:
-    """Crop to 16:9 (center) and resize to target dimensions."""
+    """Crop to 16:9 (center) and resize to target dimensions.
+
+    JPEG sources are decoded in draft mode at the smallest DCT scale that
+    still covers the crop at output size, so a 24 MP photo never exists
+    in memory at full resolution. Other formats are cropped before the
+    RGB conversion, and the final resize uses ``reducing_gap``.
+    """
+    _reset_peak_rss()
+    target_ratio = width / height
     with Image.open(source) as img:
-        img = img.convert("RGB")
         src_w, src_h = img.size
-        target_ratio = width / height
-        src_ratio = src_w / src_h
+        crop = _center_crop_box(src_w, src_h, target_ratio)
+        crop_w, crop_h = crop[2] - crop[0], crop[3] - crop[1]
 
-        if src_ratio > target_ratio:
-            new_w = int(src_h * target_ratio)
-            left = (src_w - new_w) // 2
-            box = (left, 0, left + new_w, src_h)
+        if img.format == "JPEG":
+            # Ask for the full frame size at which the crop is still >= output size
+            img.draft(
+                "RGB",
+                (-(-width * src_w // crop_w), -(-height * src_h // crop_h)),
+            )
+        decoded_w, decoded_h = img.size
+        scale_x, scale_y = decoded_w / src_w, decoded_h / src_h
+        box = (
+            crop[0] * scale_x,
+            crop[1] * scale_y,
+            crop[2] * scale_x,
+            crop[3] * scale_y,
+        )
+
+        if img.mode in ("RGB", "L"):
+            resized = img.resize(
+                (width, height), Image.Resampling.LANCZOS, box=box, reducing_gap=3.0
+            ).convert("RGB")
         else:
-            new_h = int(src_w / target_ratio)
-            top = (src_h - new_h) // 2
-            box = (0, top, src_w, top + new_h)
+            region = img.crop(tuple(round(v) for v in box)).convert("RGB")
+            resized = region.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            del region
 
-        cropped = img.crop(box)
-        resized = cropped.resize((width, height), Image.Resampling.LANCZOS)
         dest.parent.mkdir(parents=True, exist_ok=True)
         resized.save(dest, "JPEG", quality=quality, optimize=True)
+        preview = image_placeholder(resized)
 
         return {
             "source_width": src_w,
             "source_height": src_h,
+            "decoded_width": decoded_w,
+            "decoded_height": decoded_h,
             "output_width": width,
             "output_height": height,
             "file_size_bytes": dest.stat().st_size,
+            "peak_rss_kb": _peak_rss_kb(),
+            **preview,
         }
 
 
@@ -86,14 +193,65 @@ def init_database(conn: sqlite3.Connection) -> None:
             output_width INTEGER,
             output_height INTEGER,
             file_size_bytes INTEGER,
+            placeholder TEXT,
+            dominant_color TEXT,
             created_at TEXT NOT NULL,
             FOREIGN KEY (theme_id) REFERENCES themes(id)
         );
 
         CREATE INDEX IF NOT EXISTS idx_images_theme ON images(theme_id);
         CREATE INDEX IF NOT EXISTS idx_images_role ON images(role);
+
+        CREATE TABLE IF NOT EXISTS plates (
+            theme_id INTEGER NOT NULL,
+            format TEXT NOT NULL CHECK(format IN ('post', 'story', 'website')),
+            image_path TEXT NOT NULL,
+            image_sha256 TEXT NOT NULL,
+            plate_path TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            file_size_bytes INTEGER,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (theme_id, format),
+            FOREIGN KEY (theme_id) REFERENCES themes(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS original_hashes (
+            original_path TEXT PRIMARY KEY,
+            file_sha256 TEXT NOT NULL,
+            dhash TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
         """
     )
+    # Columns added after the first release of the schema
+    image_columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+    for column in ("placeholder", "dominant_color"):
+        if column not in image_columns:
+            conn.execute(f"ALTER TABLE images ADD COLUMN {column} TEXT")
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS themes_fts USING fts5(
+                title_fr, title_en, slug,
+                content='themes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+            """
+        )
+    except sqlite3.OperationalError as exc:
+        print(f"  Warning: full-text search index unavailable ({exc})")
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    """Re-read the themes table into the FTS5 index (no-op without FTS5)."""
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'themes_fts'"
+    ).fetchone()
+    if has_fts:
+        with conn:
+            conn.execute("INSERT INTO themes_fts(themes_fts) VALUES ('rebuild')")
 
 
 def archive_originals() -> None:
@@ -107,17 +265,355 @@ def archive_originals() -> None:
               shutil.copy2(path, dest)
 
 
-def process_theme_images(config: dict, conn: sqlite3.Connection) -> dict:
+@dataclass
+class StandardizeJob:
+    """One source image to standardize into ``dest`` for a theme."""
+
+    theme_id: int
+    role: str
+    original_filename: str
+    source: Path
+    dest: Path
+    source_hash: str = ""
+    meta: dict | None = None
+    error: str | None = None
+
+
+def file_sha256(path: Path) -> str:
+    stat = path.stat()
+    return _file_sha256(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def _file_sha256(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def spec_signature(width: int, height: int, quality: int) -> str:
+    """Identify the output spec; bump STANDARDIZE_VERSION when the algorithm changes."""
+    return f"v{STANDARDIZE_VERSION}:{width}x{height}:q{quality}"
+
+
+def load_manifest() -> dict:
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        with MANIFEST_PATH.open(encoding="utf-8") as f:
+            return json.load(f).get("images", {})
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(entries: dict) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with MANIFEST_PATH.open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "images": entries,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+def _dhash_or_none(path: Path) -> int | None:
+    try:
+        return dhash(path)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def hash_originals(conn: sqlite3.Connection, jobs: int = 1) -> dict[str, int]:
+    """Store a perceptual hash per file in images/originals/.
+
+    Rows are keyed by path and reused while the file's SHA-256 is unchanged,
+    so only new or edited originals are decoded. Returns path -> dhash.
+    """
+    known = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute("SELECT original_path, file_sha256, dhash FROM original_hashes")
+    }
+    paths = sorted(
+        p for p in ORIGINALS_DIR.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+    ) if ORIGINALS_DIR.is_dir() else []
+
+    hashes: dict[str, int] = {}
+    changed: list[tuple[str, str, Path]] = []
+    for path in paths:
+        rel = str(path.relative_to(ROOT))
+        sha = file_sha256(path)
+        cached = known.get(rel)
+        if cached and cached[0] == sha:
+            hashes[rel] = hash_from_hex(cached[1])
+        else:
+            changed.append((rel, sha, path))
+
+    if jobs > 1 and len(changed) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(changed))) as pool:
+            values = list(pool.map(_dhash_or_none, [path for _, _, path in changed]))
+    else:
+        values = [_dhash_or_none(path) for _, _, path in changed]
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for (rel, sha, _), value in zip(changed, values):
+        if value is None:
+            continue
+        hashes[rel] = value
+        rows.append((rel, sha, hash_to_hex(value), now))
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO original_hashes (original_path, file_sha256, dhash, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(original_path) DO UPDATE SET
+                file_sha256 = excluded.file_sha256,
+                dhash = excluded.dhash,
+                updated_at = excluded.updated_at
+            """,
+            rows,
+        )
+        stale = [(rel,) for rel in known if rel not in hashes]
+        conn.executemany("DELETE FROM original_hashes WHERE original_path = ?", stale)
+    return hashes
+
+
+def drop_duplicate_alternates(
+    work: list[StandardizeJob],
+    hashes: dict[str, int],
+    threshold: int,
+    slugs: dict[int, str],
+) -> tuple[list[StandardizeJob], list[str]]:
+    """Remove alternates that look like an image already kept for the same theme."""
+    kept: list[StandardizeJob] = []
+    seen: dict[int, list[tuple[int, str]]] = {}
+    skipped: list[str] = []
+    for job in work:
+        value = hashes.get(str((ORIGINALS_DIR / job.source.name).relative_to(ROOT)))
+        if value is None:
+            value = _dhash_or_none(job.source)
+        theme_seen = seen.setdefault(job.theme_id, [])
+        if job.role == "alternate" and value is not None:
+            match = next((name for other, name in theme_seen if hamming(value, other) <= threshold), None)
+            if match is not None:
+                skipped.append(f"{_job_label(job, slugs)} ~ {match}")
+                continue
+        if value is not None:
+            theme_seen.append((value, job.original_filename))
+        kept.append(job)
+    return kept, skipped
+
+
+def prune_alternates(dropped: list[StandardizeJob]) -> list[str]:
+    """Delete outputs an earlier run wrote for alternates now skipped as duplicates."""
+    removed = []
+    for job in dropped:
+        if job.dest.exists():
+            job.dest.unlink()
+            removed.append(job.dest.name)
+    return removed
+
+
+def _find_source(name: str) -> Path | None:
+    return next((p for p in [ROOT / name, ORIGINALS_DIR / name] if p.exists()), None)
+
+
+def collect_jobs(config: dict, stats: dict) -> list[StandardizeJob]:
+    """Resolve primary and alternate sources for every theme, in catalog order."""
+    jobs: list[StandardizeJob] = []
+    for theme in config["themes"]:
+        primary = theme.get("primary_image")
+        if not primary:
+            stats["missing"] += 1
+            continue
+
+        source = _find_source(primary)
+        if source is None:
+            stats["errors"].append(f"{theme['slug']}: source not found ({primary})")
+            stats["missing"] += 1
+            continue
+
+        jobs.append(
+            StandardizeJob(
+                theme_id=theme["id"],
+                role="primary",
+                original_filename=primary,
+                source=source,
+                dest=STANDARDIZED_DIR / f"{theme['id']:02d}_{theme['slug']}.jpg",
+            )
+        )
+
+        for alt in theme.get("alternates", []):
+            alt_source = _find_source(alt)
+            if alt_source is None:
+                continue
+            jobs.append(
+                StandardizeJob(
+                    theme_id=theme["id"],
+                    role="alternate",
+                    original_filename=alt,
+                    source=alt_source,
+                    dest=STANDARDIZED_DIR
+                    / "alternates"
+                    / f"{theme['id']:02d}_{theme['slug']}_alt_{Path(alt).stem}.jpg",
+                )
+            )
+    return jobs
+
+
+def _job_label(job: StandardizeJob, slugs: dict[int, str]) -> str:
+    slug = slugs.get(job.theme_id, str(job.theme_id))
+    return slug if job.role == "primary" else f"{slug} alt ({job.original_filename})"
+
+
+def process_theme_images(
+    config: dict,
+    conn: sqlite3.Connection,
+    jobs: int = 1,
+    force: bool = False,
+    duplicate_hashes: dict[str, int] | None = None,
+    duplicate_threshold: int = DEFAULT_THRESHOLD,
+) -> dict:
+    """Standardize changed images and replace the catalog rows in one transaction.
+
+    Images whose source hash and output spec match the manifest (and whose
+    output still exists) are not re-encoded. When ``duplicate_hashes`` is
+    given, alternates that are near-duplicates of an image already kept for
+    the same theme are skipped, and their outputs from earlier runs are
+    deleted once the catalog is committed.
+    """
     spec = config["standard_image"]
     width = spec["width"]
     height = spec["height"]
     quality = spec["quality"]
+    signature = spec_signature(width, height, quality)
     now = datetime.now(timezone.utc).isoformat()
+    slugs = {theme["id"]: theme["slug"] for theme in config["themes"]}
 
-    stats = {"processed": 0, "skipped": 0, "missing": 0, "errors": []}
+    stats = {
+        "processed": 0,
+        "skipped": 0,
+        "missing": 0,
+        "encoded": 0,
+        "unchanged": 0,
+        "peak_rss": [],
+        "duplicates": [],
+        "pruned": [],
+        "errors": [],
+    }
 
-    for theme in config["themes"]:
-        conn.execute(
+    work = collect_jobs(config, stats)
+    dropped: list[StandardizeJob] = []
+    if duplicate_hashes is not None:
+        candidates = work
+        work, stats["duplicates"] = drop_duplicate_alternates(
+            candidates, duplicate_hashes, duplicate_threshold, slugs
+        )
+        kept = {id(job) for job in work}
+        dropped = [job for job in candidates if id(job) not in kept]
+    manifest = {} if force else load_manifest()
+    pending: list[StandardizeJob] = []
+    for job in work:
+        job.source_hash = file_sha256(job.source)
+        key = str(job.dest.relative_to(ROOT))
+        cached = manifest.get(key)
+        if (
+            cached
+            and cached.get("source_sha256") == job.source_hash
+            and cached.get("spec") == signature
+            and job.dest.exists()
+        ):
+            job.meta = cached["meta"]
+            stats["unchanged"] += 1
+        else:
+            pending.append(job)
+
+    if pending:
+        if jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+                futures = {
+                    pool.submit(standardize_image, job.source, job.dest, width, height, quality): job
+                    for job in pending
+                }
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        job.meta = future.result()
+                    except Exception as exc:  # noqa: BLE001
+                        job.error = str(exc)
+        else:
+            for job in pending:
+                try:
+                    job.meta = standardize_image(job.source, job.dest, width, height, quality)
+                except Exception as exc:  # noqa: BLE001
+                    job.error = str(exc)
+        stats["encoded"] = sum(1 for job in pending if job.meta is not None)
+        stats["peak_rss"] = sorted(
+            (
+                (job.dest.name, job.meta["peak_rss_kb"])
+                for job in pending
+                if job.meta is not None and job.meta.get("peak_rss_kb") is not None
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    image_rows = []
+    new_manifest = {}
+    for job in work:
+        if job.meta is None:
+            stats["errors"].append(f"{_job_label(job, slugs)}: {job.error}")
+            if job.role == "primary":
+                stats["skipped"] += 1
+            continue
+        if job.role == "primary":
+            stats["processed"] += 1
+        if "placeholder" not in job.meta:
+            # Manifest entries from before placeholders existed
+            try:
+                job.meta.update(placeholder_for_file(job.dest))
+            except OSError:
+                pass
+        dest_rel = str(job.dest.relative_to(ROOT))
+        new_manifest[dest_rel] = {
+            "source": str(job.source.relative_to(ROOT)),
+            "source_sha256": job.source_hash,
+            "spec": signature,
+            "meta": job.meta,
+        }
+        image_rows.append(
+            (
+                job.theme_id,
+                job.role,
+                job.original_filename,
+                str(job.source.relative_to(ROOT)),
+                job.dest.name,
+                dest_rel,
+                job.meta["source_width"],
+                job.meta["source_height"],
+                job.meta["output_width"],
+                job.meta["output_height"],
+                job.meta["file_size_bytes"],
+                job.meta.get("placeholder"),
+                job.meta.get("dominant_color"),
+                now,
+            )
+        )
+
+    # The old catalog is replaced in the same transaction, so it stays
+    # readable (and intact if the run fails) until the new rows are ready
+    with conn:
+        conn.execute("DELETE FROM images")
+        conn.execute("DELETE FROM themes")
+        conn.executemany(
             """
             INSERT INTO themes (id, slug, title_fr, title_en, sort_order, status, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -129,103 +625,222 @@ def process_theme_images(config: dict, conn: sqlite3.Connection) -> dict:
                 status = excluded.status,
                 notes = excluded.notes
             """,
-            (
-                theme["id"],
-                theme["slug"],
-                theme["title_fr"],
-                theme.get("title_en"),
-                theme["id"],
-                theme["status"],
-                None,
-            ),
+            [
+                (
+                    theme["id"],
+                    theme["slug"],
+                    theme["title_fr"],
+                    theme.get("title_en"),
+                    theme["id"],
+                    theme["status"],
+                    None,
+                )
+                for theme in config["themes"]
+            ],
+        )
+        conn.executemany(
+            """
+            INSERT INTO images (
+                theme_id, role, original_filename, original_path,
+                standardized_filename, standardized_path,
+                source_width, source_height, output_width, output_height,
+                file_size_bytes, placeholder, dominant_color, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            image_rows,
         )
 
-        primary = theme.get("primary_image")
-        if not primary:
-            stats["missing"] += 1
-            continue
-
-        source_candidates = [
-            ROOT / primary,
-            ORIGINALS_DIR / primary,
+    save_manifest(new_manifest)
+    stats["pruned"] = prune_alternates(dropped)
+    stats["sprite"] = build_picker_sprite(
+        [
+            (path, f"{entry['source_sha256']}:{entry['spec']}")
+            for path, entry in new_manifest.items()
         ]
-        source = next((p for p in source_candidates if p.exists()), None)
-        if source is None:
-            stats["errors"].append(f"{theme['slug']}: source not found ({primary})")
-            stats["missing"] += 1
-            continue
+    )
+    return stats
+
+
+def _load_sprite_map() -> dict:
+    if not SPRITE_MAP_PATH.exists() or not SPRITE_PATH.exists():
+        return {}
+    try:
+        with SPRITE_MAP_PATH.open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def build_picker_sprite(images: list[tuple[str, str]]) -> dict:
+    """Pack a thumbnail of every standardized image into one WebP contact sheet.
 
-        dest_name = f"{theme['id']:02d}_{theme['slug']}.jpg"
-        dest = STANDARDIZED_DIR / dest_name
+    ``images`` is ``[(standardized_path, content_key), ...]`` in picker order.
+    Nothing is written when the list is unchanged; otherwise tiles whose
+    content key is unchanged are copied from the previous sheet and only
+    new or changed images are decoded.
+    """
+    tile_w, tile_h = SPRITE_TILE
+    signature = hashlib.sha256(
+        json.dumps([images, SPRITE_TILE, SPRITE_COLUMNS, SPRITE_QUALITY]).encode("utf-8")
+    ).hexdigest()
+    previous = _load_sprite_map()
+    if previous.get("signature") == signature:
+        return {"status": "unchanged", "decoded": 0, "reused": len(images)}
 
+    old_tiles = {
+        path: tile for path, tile in previous.get("tiles", {}).items() if "key" in tile
+    }
+    old_sheet = None
+    if old_tiles and tuple(previous.get("tile_size", ())) == SPRITE_TILE:
         try:
-            meta = standardize_image(source, dest, width, height, quality)
-            conn.execute(
-                """
-                INSERT INTO images (
-                    theme_id, role, original_filename, original_path,
-                    standardized_filename, standardized_path,
-                    source_width, source_height, output_width, output_height,
-                    file_size_bytes, created_at
-                ) VALUES (?, 'primary', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    theme["id"],
-                    primary,
-                    str(source.relative_to(ROOT)),
-                    dest_name,
-                    str(dest.relative_to(ROOT)),
-                    meta["source_width"],
-                    meta["source_height"],
-                    meta["output_width"],
-                    meta["output_height"],
-                    meta["file_size_bytes"],
-                    now,
-                ),
-            )
-            stats["processed"] += 1
-        except Exception as exc:  # noqa: BLE001
-            stats["errors"].append(f"{theme['slug']}: {exc}")
-            stats["skipped"] += 1
+            old_sheet = Image.open(SPRITE_PATH).convert("RGB")
+        except OSError:
+            old_sheet = None
 
-        for alt in theme.get("alternates", []):
-            alt_source = next(
-                (p for p in [ROOT / alt, ORIGINALS_DIR / alt] if p.exists()),
-                None,
-            )
-            if alt_source is None:
+    rows = max(1, -(-len(images) // SPRITE_COLUMNS))
+    sheet = Image.new("RGB", (tile_w * SPRITE_COLUMNS, tile_h * rows), (0, 0, 0))
+    tiles: dict[str, dict] = {}
+    decoded = reused = 0
+    for index, (path, key) in enumerate(images):
+        x = (index % SPRITE_COLUMNS) * tile_w
+        y = (index // SPRITE_COLUMNS) * tile_h
+        old = old_tiles.get(path)
+        if old_sheet is not None and old and old["key"] == key:
+            thumb = old_sheet.crop((old["x"], old["y"], old["x"] + tile_w, old["y"] + tile_h))
+            reused += 1
+        else:
+            try:
+                with Image.open(ROOT / path) as img:
+                    img.draft("RGB", (tile_w, tile_h))
+                    thumb = ImageOps.fit(img.convert("RGB"), SPRITE_TILE, Image.Resampling.LANCZOS)
+            except OSError:
                 continue
-            alt_dest_name = f"{theme['id']:02d}_{theme['slug']}_alt_{Path(alt).stem}.jpg"
-            alt_dest = STANDARDIZED_DIR / "alternates" / alt_dest_name
+            decoded += 1
+        sheet.paste(thumb, (x, y))
+        tiles[path] = {"x": x, "y": y, "w": tile_w, "h": tile_h, "key": key}
+
+    SPRITE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    sheet.save(SPRITE_PATH, "WEBP", quality=SPRITE_QUALITY, method=6)
+    with SPRITE_MAP_PATH.open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "signature": signature,
+                "sheet": str(SPRITE_PATH.relative_to(ROOT)),
+                "width": sheet.width,
+                "height": sheet.height,
+                "tile_size": list(SPRITE_TILE),
+                "tiles": tiles,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    return {"status": "rebuilt", "decoded": decoded, "reused": reused}
+
+
+def _load_plates_manifest() -> dict:
+    if not PLATES_MANIFEST_PATH.exists():
+        return {}
+    try:
+        with PLATES_MANIFEST_PATH.open(encoding="utf-8") as f:
+            return json.load(f).get("plates", {})
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def build_base_plates(conn: sqlite3.Connection, jobs: int = 1, force: bool = False) -> dict:
+    """Render a base plate per format for every primary image and register them.
+
+    A plate is re-rendered only when its standardized image, the budget
+    assets or the plate version changed (keys in ``data/base-plates.json``).
+    Plates of removed themes are deleted. The ``plates`` table is rewritten.
+    """
+    signature = assets_signature()
+    previous = {} if force else _load_plates_manifest()
+    primaries = conn.execute(
+        "SELECT theme_id, standardized_path FROM images WHERE role = 'primary' ORDER BY theme_id"
+    ).fetchall()
+
+    stats = {"rendered": 0, "unchanged": 0, "errors": []}
+    entries: dict[str, dict] = {}
+    pending: list[tuple[int, str, str, dict[str, Path]]] = []
+    for theme_id, image_path in primaries:
+        source = ROOT / image_path
+        sha = file_sha256(source)
+        key = f"{sha}:{signature}:q{PLATE_QUALITY}"
+        stale: dict[str, Path] = {}
+        for fmt in PLATE_FORMATS:
+            dest = PLATES_DIR / f"{Path(image_path).stem}_{fmt}.jpg"
+            rel = str(dest.relative_to(ROOT))
+            cached = previous.get(rel)
+            if cached and cached.get("key") == key and dest.exists():
+                entries[rel] = cached
+                stats["unchanged"] += 1
+            else:
+                stale[fmt] = dest
+                entries[rel] = {"theme_id": theme_id, "format": fmt, "image_path": image_path,
+                                "image_sha256": sha, "key": key}
+        if stale:
+            pending.append((theme_id, image_path, sha, stale))
+
+    def record(item, meta: dict[str, dict]) -> None:
+        for fmt, dest in item[3].items():
+            entries[str(dest.relative_to(ROOT))].update(meta[fmt])
+        stats["rendered"] += len(meta)
+
+    def fail(item, exc: Exception) -> None:
+        for dest in item[3].values():
+            entries.pop(str(dest.relative_to(ROOT)), None)
+        stats["errors"].append(f"{item[1]}: {exc}")
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            futures = {pool.submit(render_plates, ROOT / item[1], item[3]): item for item in pending}
+            for future in as_completed(futures):
+                try:
+                    record(futures[future], future.result())
+                except Exception as exc:  # noqa: BLE001
+                    fail(futures[future], exc)
+    else:
+        for item in pending:
             try:
-                meta = standardize_image(alt_source, alt_dest, width, height, quality)
-                conn.execute(
-                    """
-                    INSERT INTO images (
-                        theme_id, role, original_filename, original_path,
-                        standardized_filename, standardized_path,
-                        source_width, source_height, output_width, output_height,
-                        file_size_bytes, created_at
-                    ) VALUES (?, 'alternate', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        theme["id"],
-                        alt,
-                        str(alt_source.relative_to(ROOT)),
-                        alt_dest_name,
-                        str(alt_dest.relative_to(ROOT)),
-                        meta["source_width"],
-                        meta["source_height"],
-                        meta["output_width"],
-                        meta["output_height"],
-                        meta["file_size_bytes"],
-                        now,
-                    ),
-                )
+                record(item, render_plates(ROOT / item[1], item[3]))
             except Exception as exc:  # noqa: BLE001
-                stats["errors"].append(f"{theme['slug']} alt ({alt}): {exc}")
+                fail(item, exc)
+
+    if PLATES_DIR.is_dir():
+        for path in PLATES_DIR.glob("*.jpg"):
+            if str(path.relative_to(ROOT)) not in entries:
+                path.unlink()
 
-    conn.commit()
+    now = datetime.now(timezone.utc).isoformat()
+    with conn:
+        conn.execute("DELETE FROM plates")
+        conn.executemany(
+            """
+            INSERT INTO plates (
+                theme_id, format, image_path, image_sha256, plate_path,
+                width, height, file_size_bytes, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    entry["theme_id"], entry["format"], entry["image_path"], entry["image_sha256"], rel,
+                    entry.get("width"), entry.get("height"), entry.get("file_size_bytes"), now,
+                )
+                for rel, entry in sorted(entries.items())
+            ],
+        )
+    PLATES_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with PLATES_MANIFEST_PATH.open("w", encoding="utf-8") as f:
+        json.dump(
+            {"generated_at": now, "assets": signature, "plates": entries},
+            f,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
     return stats
 
 
@@ -274,12 +889,30 @@ def export_api(conn: sqlite3.Connection, config: dict) -> None:
         SELECT t.id, t.slug, t.title_fr, t.title_en, t.status, t.sort_order,
                i.standardized_path AS image_path,
                i.standardized_filename AS image_filename,
-               i.file_size_bytes
+               i.file_size_bytes,
+               i.placeholder,
+               i.dominant_color
         FROM themes t
         LEFT JOIN images i ON i.theme_id = t.id AND i.role = 'primary'
         ORDER BY t.sort_order
         """
     ).fetchall()
+    alternates: dict[int, list[dict]] = {}
+    for alt in conn.execute(
+        """
+        SELECT theme_id, standardized_path AS image_path, placeholder, dominant_color
+        FROM images WHERE role = 'alternate'
+        ORDER BY standardized_path
+        """
+    ):
+        alt = dict(alt)
+        alternates.setdefault(alt.pop("theme_id"), []).append(alt)
+    plates: dict[int, dict] = {}
+    for plate in conn.execute(
+        "SELECT theme_id, format, plate_path, image_sha256, width, height FROM plates ORDER BY theme_id"
+    ):
+        plate = dict(plate)
+        plates.setdefault(plate.pop("theme_id"), {})[plate.pop("format")] = plate
 
     out = ROOT / "data" / "api-export.json"
     with out.open("w", encoding="utf-8") as f:
@@ -288,7 +921,14 @@ def export_api(conn: sqlite3.Connection, config: dict) -> None:
                 "generated_at": datetime.now(timezone.utc).isoformat(),
                 "budget_year": config.get("budget_year", "2026-2027"),
                 "image_spec": config.get("standard_image", {}),
-                "themes": [dict(row) for row in rows],
+                "themes": [
+                    {
+                        **dict(row),
+                        "alternates": alternates.get(row["id"], []),
+                        "plates": plates.get(row["id"], {}),
+                    }
+                    for row in rows
+                ],
             },
             f,
             ensure_ascii=False,
@@ -296,9 +936,44 @@ def export_api(conn: sqlite3.Connection, config: dict) -> None:
         )
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Standardize budget images and rebuild the database")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for image standardization (default: CPU count)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-encode every image, ignoring the manifest",
+    )
+    parser.add_argument(
+        "--skip-duplicates",
+        action="store_true",
+        help="Skip alternates that are near-duplicates of another image of the same theme",
+    )
+    parser.add_argument(
+        "--duplicate-threshold",
+        type=int,
+        default=DEFAULT_THRESHOLD,
+        help=f"Max Hamming distance between perceptual hashes (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--plates",
+        action="store_true",
+        help="Render text-free base plates (post/story/website) for every primary image",
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
+    args = parse_args()
     config = load_config()
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
 
     print("Archiving originals...")
     archive_originals()
@@ -306,20 +981,67 @@ def main() -> None:
     conn = sqlite3.connect(DB_PATH)
     try:
         init_database(conn)
-        conn.execute("DELETE FROM images")
-        conn.execute("DELETE FROM themes")
 
-        print("Standardizing images...")
-        stats = process_theme_images(config, conn)
+        jobs = max(args.jobs, 1)
+        print("Hashing originals...")
+        step = time.perf_counter()
+        hashes = hash_originals(conn, jobs=jobs)
+        groups = group_duplicates(hashes, args.duplicate_threshold)
+        hash_s = time.perf_counter() - step
+        print(f"  {len(hashes)} originals, {len(groups)} near-duplicate groups "
+              f"(python scripts/query.py --duplicates)")
+
+        print(f"Standardizing images ({jobs} jobs)...")
+        step = time.perf_counter()
+        stats = process_theme_images(
+            config,
+            conn,
+            jobs=jobs,
+            force=args.force,
+            duplicate_hashes=hashes if args.skip_duplicates else None,
+            duplicate_threshold=args.duplicate_threshold,
+        )
+        standardize_s = time.perf_counter() - step
+        rebuild_search_index(conn)
+
+        plates = None
+        if args.plates:
+            print("Rendering base plates...")
+            step = time.perf_counter()
+            plates = build_base_plates(conn, jobs=jobs, force=args.force)
+            plates["seconds"] = time.perf_counter() - step
+
+        step = time.perf_counter()
         export_summary(conn)
         export_api(conn, config)
+        export_s = time.perf_counter() - step
 
         print(f"\nDone — {stats['processed']} primary images processed")
+        print(f"  Encoded: {stats['encoded']}, unchanged: {stats['unchanged']}")
+        if stats["peak_rss"]:
+            print("  Peak RSS per encoded image (top 10):")
+            for name, peak_kb in stats["peak_rss"][:10]:
+                print(f"    {peak_kb / 1024:7.1f} MB  {name}")
+        sprite = stats["sprite"]
+        print(f"  Picker sprite: {sprite['status']} "
+              f"({sprite['decoded']} decoded, {sprite['reused']} reused)")
+        if plates is not None:
+            print(f"  Base plates: {plates['rendered']} rendered, {plates['unchanged']} unchanged "
+                  f"({plates['seconds']:.2f}s)")
+            stats["errors"].extend(plates["errors"])
         print(f"  Missing themes: {stats['missing']}")
+        if stats["duplicates"]:
+            print(f"  Skipped near-duplicate alternates: {len(stats['duplicates'])}")
+            for dup in stats["duplicates"]:
+                print(f"    - {dup}")
+        if stats["pruned"]:
+            print(f"  Removed their earlier outputs: {len(stats['pruned'])}")
         if stats["errors"]:
             print("  Errors:")
             for err in stats["errors"]:
                 print(f"    - {err}")
+        print(f"\nTiming: hash {hash_s:.2f}s, standardize {standardize_s:.2f}s, export {export_s:.2f}s, "
+              f"total {time.perf_counter() - started:.2f}s")
         print(f"\nDatabase: {DB_PATH}")
         print(f"Standardized images: {STANDARDIZED_DIR}")
         print(f"Summary: {ROOT / 'data' / 'summary.json'}")
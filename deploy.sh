@@ -20,4 +20,9 @@ flask db upgrade
 # Restart Gunicorn
 sudo systemctl restart image-creator
 
+# Restart the background job worker, if installed
+if systemctl cat image-creator-worker >/dev/null 2>&1; then
+    sudo systemctl restart image-creator-worker
+fi
+
 echo "Deployment complete!"
@@ -8,7 +8,11 @@ backlog = 2048
 # Worker processes (reduced for low-memory servers)
 # For 512MB RAM server, use 1 worker to prevent OOM kills
 workers = 1
-worker_class = "sync"
+# Threads let job progress streams (SSE) stay open without blocking other
+# requests. Keep this well above JOBS_SSE_MAX_STREAMS (default 2), the most
+# threads open streams may hold per worker.
+worker_class = "gthread"
+threads = 8
 worker_connections = 1000
 timeout = 60
 keepalive = 2
@@ -0,0 +1,25 @@
+"""Background job worker, run next to Gunicorn (see systemd-worker.service.example)
+
+Usage: python worker.py [--once]
+"""
+import argparse
+import logging
+import os
+
+from app import create_app, jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued background jobs')
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app = create_app(os.environ.get('FLASK_ENV', 'production'))
+    with app.app_context():
+        jobs.run_worker(jobs.db_path_for(app), app.config, once=args.once)
+
+
+# Pool processes are spawn()ed and re-import this module, so nothing runs at import
+if __name__ == '__main__':
+    main()